@@ -27,6 +27,16 @@ def print_env_checklist():
         "🔑 API KEYS": [
             ("GEMINI_API_KEY", "Google Gemini API Key for AI analysis", "⚠️  Optional but recommended", "Get from: https://aistudio.google.com/apikey"),
             ("GEMINI_MODEL", "Gemini Model Version", "Optional", "Default: gemini-2.0-flash"),
+            ("LEAK_RULE_SCORING", "Score obvious patterns (subscriptions, utilities) without the AI model", "Optional", "Default: true"),
+            ("GEMINI_BASE_URL", "Alternative Gemini API endpoint, e.g. backend/fake_gemini_server.py for offline testing", "Optional", "Default: Google API"),
+            ("LEAK_MODEL_WINDOW", "Recent calls per model used for routing and circuit breaking", "Optional", "Default: 20"),
+            ("LEAK_MODEL_MIN_CALLS", "Calls before a failing model's circuit may open", "Optional", "Default: 4"),
+            ("LEAK_MODEL_FAILURE_RATE", "Failure fraction that opens a model's circuit", "Optional", "Default: 0.5"),
+            ("LEAK_MODEL_COOLDOWN_SECONDS", "Seconds a failing model is skipped (doubles per failed probe)", "Optional", "Default: 30"),
+            ("LEAK_MODEL_MAX_COOLDOWN_SECONDS", "Longest time a failing model is skipped", "Optional", "Default: 300"),
+            ("GEMINI_TIMEOUT_SECONDS", "Timeout of one Gemini request before falling back to the next model", "Optional", "Default: 60"),
+            ("LEAK_ANALYSIS_CHUNK_TOKENS", "Approximate evidence tokens per leak analysis request", "Optional", "Default: 4000"),
+            ("LEAK_ANALYSIS_CONCURRENCY", "Leak analysis requests in flight at once", "Optional", "Default: 4"),
             ("GROQ_API_KEY", "Groq API Key (fallback LLM)", "Optional", "Get from: https://console.groq.com"),
         ],
         "🔐 GOOGLE OAUTH": [
@@ -49,6 +59,20 @@ def print_env_checklist():
             ("API_PORT", "API Server Port", "Optional", "Default: 8000"),
             ("FRONTEND_URL", "Frontend URL for CORS", "Optional", "Default: http://localhost:5173"),
         ],
+        "⚙️  UPLOAD PIPELINE": [
+            ("UPLOAD_JOB_WORKERS", "Background upload job worker threads", "Optional", "Default: 2"),
+            ("PIPELINE_IO_WORKERS", "Threads for parsing/cleaning uploads", "Optional", "Default: 4"),
+            ("PIPELINE_CPU_EXECUTOR", "Where enrichment runs", "Optional", "Options: process (default), thread, inline"),
+            ("PIPELINE_CPU_WORKERS", "Enrichment worker count", "Optional", "Default: CPU count"),
+            ("PIPELINE_CPU_MIN_ROWS", "Uploads smaller than this are enriched inline", "Optional", "Default: 5000"),
+            ("PIPELINE_MP_START_METHOD", "Multiprocessing start method for enrichment workers", "Optional", "Default: spawn"),
+            ("STREAMING_INGESTION", "Stream CSV uploads in row chunks", "Optional", "Default: true"),
+            ("CSV_ENGINE", "CSV parser for uploads", "Optional", "Options: pyarrow (default, when installed), c"),
+            ("INPLACE_PIPELINE", "Clean and enrich the parsed frame in place (no per-stage copies)", "Optional", "Default: true"),
+            ("UPLOAD_ARCHIVE", "Keep a Parquet copy of each upload's stored rows for pattern rebuilds", "Optional", "Default: true (needs pyarrow)"),
+            ("UPLOAD_ARCHIVE_DIR", "Directory of the Parquet upload archive", "Optional", "Default: ./upload_archive"),
+            ("UPLOAD_ARCHIVE_COMPRESSION", "Parquet compression codec of the upload archive", "Optional", "Default: zstd"),
+        ],
         "📧 EMAIL SYNC": [
             ("EMAIL_SYNC_BATCH_SIZE", "Batch size for email sync", "Optional", "Default: 50"),
             ("EMAIL_SYNC_DAYS", "Days to sync emails back", "Optional", "Default: 30"),
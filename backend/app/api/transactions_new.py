@@ -5,11 +5,16 @@ Endpoints for uploading and processing transaction files
 
 from fastapi import APIRouter, UploadFile, File, Depends, status, HTTPException
 from sqlalchemy.orm import Session
+from typing import List
+import asyncio
 import logging
 
 from app.database import get_db
 from app.api.auth import get_current_user
-from app.core.transaction_processor import TransactionUploadProcessor
+from app.core.transaction_processor import (
+    FileParser, TransactionPersistence, TransactionUploadProcessor, UploadLimitExceeded
+)
+from app.core.upload_jobs import UploadJobQueue
 from app.models import User
 
 logger = logging.getLogger(__name__)
@@ -46,7 +51,10 @@ async def upload_transactions(
         if result.get("status") == "error":
             logger.warning(f"Upload failed: {result.get('detail')}")
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
+                status_code=(
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if result.get("limit_exceeded")
+                    else status.HTTP_400_BAD_REQUEST
+                ),
                 detail=result.get("detail")
             )
         
@@ -65,6 +73,124 @@ async def upload_transactions(
         )
 
 
+@router.post("/upload-batch", status_code=status.HTTP_200_OK)
+async def upload_transactions_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload several transaction files at once (e.g. one per account or month) and process them as one upload
+    
+    - **files**: CSV or Excel files (.csv, .xlsx, .xls), and/or ZIP archives containing them
+    - Returns: Batch statistics, per-file statistics (files that could not be used are listed with their error)
+    """
+    try:
+        logger.info(f"Received batch upload of {len(files)} files from user {current_user.id}")
+        
+        result = await TransactionUploadProcessor.process_batch_upload(
+            files=files,
+            user_id=current_user.id,
+            db=db
+        )
+        
+        if result.get("status") == "error":
+            logger.warning(f"Batch upload failed: {result.get('detail')}")
+            raise HTTPException(
+                status_code=(
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if result.get("limit_exceeded")
+                    else status.HTTP_400_BAD_REQUEST
+                ),
+                detail=result.get("detail")
+            )
+        
+        statistics = result['statistics']
+        logger.info(
+            f"Batch upload successful: {statistics['files_processed']}/{statistics['files']} files, "
+            f"{statistics['transactions_stored']} transactions stored, {statistics['pattern_stats_stored']} patterns aggregated"
+        )
+        return result
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in batch upload endpoint: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to process transaction files"
+        )
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_upload_job(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a transaction file (CSV/Excel) for background processing
+    
+    - **file**: CSV or Excel file (.csv, .xlsx, .xls)
+    - Returns: job_id immediately; poll GET /api/transactions/jobs/{job_id} for progress
+    """
+    is_valid, error_msg = FileParser.validate_filename(file.filename)
+    if not is_valid:
+        logger.warning(f"Upload job rejected: {error_msg}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_msg
+        )
+    
+    try:
+        size_error = FileParser.size_error(file.size)
+        if size_error:
+            raise UploadLimitExceeded(size_error)
+        content = await FileParser.read_limited(file)
+    except UploadLimitExceeded as e:
+        logger.warning(f"Upload job rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    
+    try:
+        # Blocking insert/commit of a payload of up to MAX_FILE_SIZE_MB: keep it off the event loop
+        job = await asyncio.to_thread(UploadJobQueue.enqueue, db, current_user.id, file.filename, content)
+        return {
+            "status": "queued",
+            "job_id": job["job_id"],
+            "job": job
+        }
+        
+    except Exception as e:
+        logger.error(f"Error queueing upload job: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to queue transaction file"
+        )
+
+
+@router.get("/jobs/{job_id}")
+async def get_upload_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get status, per-stage progress (rows, seconds) and result of an upload job
+    """
+    job = UploadJobQueue.get_job(db, job_id, current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload job not found"
+        )
+    return {
+        "status": "success",
+        "job": job
+    }
+
+
 @router.get("/patterns")
 async def get_user_patterns(
     current_user: User = Depends(get_current_user),
@@ -118,6 +244,33 @@ async def get_user_patterns(
         )
 
 
+@router.post("/patterns/rebuild")
+async def rebuild_user_patterns(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Recompute all spending pattern statistics of the current user from the full transaction history
+    
+    - Reads the Parquet upload archive when it covers every upload (uploads missing from it are archived first)
+    - Returns: patterns aggregated/stored and the history source ('archive' or 'database')
+    """
+    try:
+        result = await asyncio.to_thread(TransactionPersistence.rebuild_pattern_stats, db, current_user.id)
+        logger.info(f"Rebuilt {result['pattern_stats_stored']} pattern statistics for user {current_user.id} from the {result['source']}")
+        return {
+            "status": "success",
+            "statistics": result
+        }
+    
+    except Exception as e:
+        logger.error(f"Error rebuilding patterns: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to rebuild patterns"
+        )
+
+
 @router.get("/raw-transactions")
 async def get_user_raw_transactions(
     current_user: User = Depends(get_current_user),
@@ -0,0 +1,222 @@
+"""
+Bank Statement Profiles
+Registry of bank export layouts (column aliases, date formats, amount sign
+conventions) and header detection, so other banks' statements are mapped onto
+the PatternConfig column names before they reach the upload pipeline
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Roles a header cell can map to: the four PatternConfig columns, plus the
+# single-amount layouts' columns that FileParser folds into withdrawal/deposit
+DATE = 'Date'
+NARRATION = 'Narration'
+WITHDRAWAL = 'Withdrawal Amt.'
+DEPOSIT = 'Deposit Amt.'
+AMOUNT = 'Amount'
+DIRECTION = 'Dr/Cr'
+
+AMOUNT_STYLES = {
+    # Separate withdrawal and deposit columns
+    "split": (DATE, NARRATION, WITHDRAWAL, DEPOSIT),
+    # One amount column, negative = withdrawal
+    "signed": (DATE, NARRATION, AMOUNT),
+    # One unsigned amount column plus a debit/credit marker column
+    "indicator": (DATE, NARRATION, AMOUNT, DIRECTION),
+}
+
+
+def normalize_header(cell) -> str:
+    """Case/whitespace-insensitive form of a header cell"""
+    if cell is None:
+        return ""
+    return re.sub(r"\s+", " ", str(cell)).strip().lower()
+
+
+class BankProfile:
+    """Column layout of one bank's statement export
+
+    columns: role -> header spellings used by the bank (matched case- and
+    whitespace-insensitively). date_formats are strptime formats tried in order;
+    dayfirst applies when none of them fits.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        columns: Dict[str, List[str]],
+        amount_style: str = "split",
+        date_formats: Sequence[str] = (),
+        dayfirst: bool = True,
+        debit_markers: Sequence[str] = ("DR", "D", "DEBIT"),
+    ):
+        if amount_style not in AMOUNT_STYLES:
+            raise ValueError(f"Unknown amount style: {amount_style}")
+        missing = [role for role in AMOUNT_STYLES[amount_style] if role not in columns]
+        if missing:
+            raise ValueError(f"Profile {name} has no aliases for {missing}")
+
+        self.name = name
+        self.columns = columns
+        self.amount_style = amount_style
+        self.date_formats = list(date_formats)
+        self.dayfirst = dayfirst
+        self.debit_markers = {marker.upper() for marker in debit_markers}
+        self._aliases = {
+            normalize_header(alias): role
+            for role, aliases in columns.items()
+            for alias in aliases
+        }
+
+    @property
+    def required_roles(self) -> Tuple[str, ...]:
+        return AMOUNT_STYLES[self.amount_style]
+
+    def match(self, cells: Sequence) -> Optional[Dict[str, str]]:
+        """
+        Map a candidate header row onto roles
+        Returns: {header cell as written: role}, or None unless every required role is present
+        """
+        mapping: Dict[str, str] = {}
+        for cell in cells:
+            role = self._aliases.get(normalize_header(cell))
+            if role and role not in mapping.values():
+                mapping[cell] = role
+        if all(role in mapping.values() for role in self.required_roles):
+            return mapping
+        return None
+
+
+class ProfileMatch:
+    """A detected profile: where its header is and which cells map to which role"""
+
+    def __init__(self, profile: BankProfile, header_row: int, columns: Dict[str, str], header: Sequence = ()):
+        self.profile = profile
+        # Rows (lines) above the header, i.e. preamble to skip
+        self.header_row = header_row
+        self.columns = columns
+        self.header = list(header)
+
+    @property
+    def source_columns(self) -> List[str]:
+        return list(self.columns)
+
+    def __repr__(self):
+        return f"ProfileMatch({self.profile.name}, header_row={self.header_row})"
+
+
+# ==================== REGISTRY ====================
+class BankProfileRegistry:
+    """Known statement layouts, tried in registration order (most specific first)
+
+    Detection only looks at candidate header rows (the first few KB of a CSV, or
+    the first rows of a sheet), so it costs next to nothing per upload.
+    """
+
+    PROFILES: Dict[str, BankProfile] = {}
+
+    # CSV detection reads this much of the file
+    DETECT_BYTES = 8 * 1024
+
+    @classmethod
+    def register(cls, profile: BankProfile):
+        cls.PROFILES[profile.name] = profile
+
+    @classmethod
+    def get(cls, name: str) -> Optional[BankProfile]:
+        return cls.PROFILES.get(name)
+
+    @classmethod
+    def match_header(cls, cells: Sequence, header_row: int = 0) -> Optional[ProfileMatch]:
+        """First profile whose required columns all appear in this row"""
+        for profile in cls.PROFILES.values():
+            columns = profile.match(cells)
+            if columns:
+                return ProfileMatch(profile, header_row, columns, cells)
+        return None
+
+    @classmethod
+    def detect(cls, rows: Iterable[Sequence], max_rows: int) -> Optional[ProfileMatch]:
+        """
+        Scan up to max_rows rows for a known header
+        Returns: ProfileMatch, or None if no profile matches
+        """
+        for index, cells in enumerate(rows):
+            if index >= max_rows:
+                break
+            match = cls.match_header(cells, index)
+            if match:
+                logger.info(f"Detected statement format '{match.profile.name}' (header on row {index + 1})")
+                return match
+        return None
+
+
+# ==================== BUILT-IN PROFILES ====================
+for _profile in (
+    BankProfile(
+        "hdfc",
+        {
+            DATE: ["Date"],
+            NARRATION: ["Narration"],
+            WITHDRAWAL: ["Withdrawal Amt."],
+            DEPOSIT: ["Deposit Amt."],
+        },
+        date_formats=["%d/%m/%y", "%d/%m/%Y"],
+    ),
+    BankProfile(
+        "icici",
+        {
+            DATE: ["Transaction Date", "Value Date"],
+            NARRATION: ["Transaction Remarks", "Remarks"],
+            WITHDRAWAL: ["Withdrawal Amount (INR )", "Withdrawal Amount (INR)", "Withdrawal Amount"],
+            DEPOSIT: ["Deposit Amount (INR )", "Deposit Amount (INR)", "Deposit Amount"],
+        },
+        date_formats=["%d/%m/%Y", "%d-%m-%Y"],
+    ),
+    BankProfile(
+        "sbi",
+        {
+            DATE: ["Txn Date", "Transaction Date"],
+            NARRATION: ["Description"],
+            WITHDRAWAL: ["Debit"],
+            DEPOSIT: ["Credit"],
+        },
+        date_formats=["%d %b %Y", "%d/%m/%Y"],
+    ),
+    BankProfile(
+        "axis",
+        {
+            DATE: ["Tran Date", "Transaction Date"],
+            NARRATION: ["PARTICULARS"],
+            WITHDRAWAL: ["DR", "Debit"],
+            DEPOSIT: ["CR", "Credit"],
+        },
+        date_formats=["%d-%m-%Y", "%d/%m/%Y"],
+    ),
+    BankProfile(
+        "kotak",
+        {
+            DATE: ["Transaction Date", "Date"],
+            NARRATION: ["Description", "Narration"],
+            AMOUNT: ["Amount"],
+            DIRECTION: ["Dr / Cr", "Dr/Cr", "Cr/Dr", "Type"],
+        },
+        amount_style="indicator",
+        date_formats=["%d-%m-%Y", "%d/%m/%Y"],
+    ),
+    BankProfile(
+        "generic_signed",
+        {
+            DATE: ["Date", "Transaction Date", "Posting Date", "Booking Date"],
+            NARRATION: ["Description", "Narration", "Details", "Particulars", "Memo"],
+            AMOUNT: ["Amount"],
+        },
+        amount_style="signed",
+        date_formats=["%Y-%m-%d", "%d/%m/%Y"],
+    ),
+):
+    BankProfileRegistry.register(_profile)
@@ -1,183 +1,146 @@
-# COMMENTED OUT - Leak Detection Engine (used by disabled Leaks API)
-# All functionality depends on Transaction, Leak, and Subscription models which are now disabled
-
-# import pandas as pd
-# from sqlalchemy.orm import Session
-# from datetime import datetime, timedelta
-# from app.models import Transaction, Leak, Subscription, LeakType, TransactionType
-# from typing import List
-
-# class LeakDetector:
-#     def __init__(self, db: Session, user_id: int):
-#         self.db = db
-#         self.user_id = user_id
-
-#     def run_all(self):
-#         """Run all detection algorithms"""
-#         # Fetch transactions
-#         transactions = self.db.query(Transaction).filter(
-#             Transaction.user_id == self.user_id,
-#             Transaction.trans_type == TransactionType.DEBIT
-#         ).all()
-#         
-#         if not transactions:
-#             return
-
-#         # Convert to DataFrame
-#         data = [{
-#             "id": t.id,
-#             "date": t.date,
-#             "amount": t.amount,
-#             "merchant": t.merchant,
-#             "description": t.description,
-#             "category": t.category.name if t.category else "Uncategorized"
-#         } for t in transactions]
-#         
-#         df = pd.DataFrame(data)
-#         df['date'] = pd.to_datetime(df['date'])
-
-#         self.detect_subscriptions(df)
-#         self.detect_small_leaks(df)
-#         self.detect_irregular_spending(df)
-#         self.detect_price_creep(df)
-
-#     def detect_subscriptions(self, df: pd.DataFrame):
-#         """
-#         Logic: Group by merchant + amount. 
-#         If same transaction appears >= 3 times AND interval approx 30/7/365 days.
-#         """
-#         # Group by merchant and amount
-#         groups = df.groupby(['merchant', 'amount'])
-#         
-#         for (merchant, amount), group in groups:
-#             if len(group) >= 3:
-#                 # Calculate intervals
-#                 dates = group['date'].sort_values()
-#                 intervals = dates.diff().dt.days.dropna()
-#                 
-#                 # Check if intervals are consistent (approx 30 days)
-#                 mean_interval = intervals.mean()
-#                 std_interval = intervals.std()
-#                 
-#                 if std_interval < 5 and (25 <= mean_interval <= 35):
-#                     # Found a monthly subscription
-#                     self._save_subscription(merchant, amount, 30, dates.iloc[-1])
-#                 elif std_interval < 2 and (6 <= mean_interval <= 8):
-#                      # Found a weekly subscription
-#                     self._save_subscription(merchant, amount, 7, dates.iloc[-1])
-
-#     def detect_small_leaks(self, df: pd.DataFrame):
-#         """
-#         Logic: Amount < 300 AND frequency > 8 per month.
-#         """
-#         # Filter small transactions
-#         small_txns = df[df['amount'] < 300]
-#         
-#         if small_txns.empty:
-#             return
-
-#         # Group by month and merchant
-#         small_txns['month'] = small_txns['date'].dt.to_period('M')
-#         monthly_counts = small_txns.groupby(['month', 'merchant']).size()
-#         
-#         for (month, merchant), count in monthly_counts.items():
-#             if count > 8:
-#                 total_spent = small_txns[(small_txns['month'] == month) & (small_txns['merchant'] == merchant)]['amount'].sum()
-#                 self._save_leak(
-#                     LeakType.SMALL_RECURRING,
-#                     f"High frequency spending at {merchant}",
-#                     f"You spent ₹{total_spent} at {merchant} this month across {count} transactions.",
-#                     "medium",
-#                     total_spent,
-#                     f"{count} times/month"
-#                 )
-
-#     def detect_irregular_spending(self, df: pd.DataFrame):
-#         """
-#         Logic: Late night food orders or weekend party spends.
-#         Simple rule: Transactions > 500 after 10 PM or on weekends in 'Food'/'Entertainment' categories.
-#         """
-#         # Late night (after 10 PM)
-#         late_night = df[df['date'].dt.hour >= 22]
-#         food_entertainment = late_night[late_night['category'].isin(['Food', 'Entertainment', 'Dining'])]
-#         
-#         if not food_entertainment.empty:
-#             total = food_entertainment['amount'].sum()
-#             if total > 1000:
-#                  self._save_leak(
-#                     LeakType.IRREGULAR,
-#                     "Late Night Spending",
-#                     f"You spent ₹{total} on late-night food/entertainment recently.",
-#                     "low",
-#                     total,
-#                     "Irregular"
-#                 )
-
-#     def detect_price_creep(self, df: pd.DataFrame):
-#         """
-#         Logic: Same merchant, increasing amount over time.
-#         """
-#         # Group by merchant
-#         for merchant, group in df.groupby('merchant'):
-#             if len(group) < 4:
-#                 continue
-#                 
-#             # Sort by date
-#             group = group.sort_values('date')
-#             
-#             # Check if amount is increasing
-#             amounts = group['amount'].values
-#             if amounts[-1] > amounts[0] * 1.1: # 10% increase
-#                 # Check if it's strictly increasing or just a jump
-#                 if amounts[-1] > amounts[-2]:
-#                      self._save_leak(
-#                         LeakType.PRICE_CREEP,
-#                         f"Price increase at {merchant}",
-#                         f"Spending at {merchant} has increased from ₹{amounts[0]} to ₹{amounts[-1]}.",
-#                         "high",
-#                         amounts[-1] - amounts[0],
-#                         "Increasing"
-#                     )
-
-#     def _save_subscription(self, merchant, amount, interval, last_date):
-#         # Check if already exists
-#         existing = self.db.query(Subscription).filter(
-#             Subscription.user_id == self.user_id,
-#             Subscription.merchant == merchant,
-#             Subscription.amount == amount
-#         ).first()
-#         
-#         if not existing:
-#             sub = Subscription(
-#                 user_id=self.user_id,
-#                 name=merchant,
-#                 amount=amount,
-#                 interval_days=interval,
-#                 last_charged_date=last_date,
-#                 next_expected_date=last_date + timedelta(days=interval),
-#                 merchant=merchant
-#             )
-#             self.db.add(sub)
-#             self.db.commit()
-
-#     def _save_leak(self, leak_type, title, description, severity, amount, frequency):
-#         # Check if similar leak exists to avoid duplicates (simplified)
-#         existing = self.db.query(Leak).filter(
-#             Leak.user_id == self.user_id,
-#             Leak.leak_type == leak_type,
-#             Leak.title == title,
-#             Leak.is_resolved == False
-#         ).first()
-#         
-#         if not existing:
-#             leak = Leak(
-#                 user_id=self.user_id,
-#                 leak_type=leak_type,
-#                 title=title,
-#                 description=description,
-#                 severity=severity,
-#                 detected_amount=amount,
-#                 frequency=frequency
-#             )
-#             self.db.add(leak)
-#             self.db.commit()
+"""
+Rule-based Leak Pre-Scoring
+Scores spending patterns whose evidence leaves no doubt (a stable subscription
+charge, essential utilities) locally, so only the ambiguous patterns are sent
+to the AI analyzer.
+
+Revives the rules of the original transaction-level LeakDetector (fixed
+monthly/weekly cadence = subscription) on the aggregated SpendingPatternStats
+evidence.
+"""
+
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+import logging
+
+if TYPE_CHECKING:
+    from app.core.leak_analyzer import FinancialLeak
+
+logger = logging.getLogger(__name__)
+
+
+class LeakDetector:
+    """Deterministic scoring of pattern evidence dicts (the LeakAnalyzer input format)
+
+    Returns a FinancialLeak only when a rule matches with high certainty;
+    everything else is left to the model.
+    """
+
+    # Only trust the category when the merchant's transactions agree on it
+    MIN_CATEGORY_CONFIDENCE = 0.8
+
+    # Never a leak: paying these is not optional
+    ESSENTIAL_CATEGORIES = {"UTILITIES"}
+
+    # Recurring services that are cancellable
+    SUBSCRIPTION_CATEGORIES = {"OTT"}
+    # (cadence name, min avg gap, max avg gap, max gap std dev) in days
+    SUBSCRIPTION_CADENCES = [
+        ("monthly", 25, 35, 2.0),
+        ("weekly", 6, 8, 1.0),
+    ]
+    MIN_SUBSCRIPTION_CHARGES = 3
+    # Charge amount may vary by at most this fraction of its average (taxes, price rounding)
+    MAX_AMOUNT_VARIATION = 0.05
+
+    # ==================== RULES ====================
+    @staticmethod
+    def _category(pattern: Dict) -> Optional[str]:
+        confidence = pattern.get('level_3_confidence') or 0.0
+        return pattern.get('dominant_level_3_tag') if confidence >= LeakDetector.MIN_CATEGORY_CONFIDENCE else None
+
+    @staticmethod
+    def _leak(pattern: Dict, **fields) -> "FinancialLeak":
+        # Imported here: leak_analyzer imports this module
+        from app.core.leak_analyzer import FinancialLeak
+
+        return FinancialLeak(pattern_id=pattern['id'], merchant_hint=pattern['merchant_hint'], **fields)
+
+    @staticmethod
+    def score_essential(pattern: Dict) -> Optional["FinancialLeak"]:
+        """Essential bills (utilities): not a leak"""
+        category = LeakDetector._category(pattern)
+        if category not in LeakDetector.ESSENTIAL_CATEGORIES:
+            return None
+        return LeakDetector._leak(
+            pattern,
+            leak_category="essential_spending",
+            leak_probability=0.05,
+            reasoning=f"{category.title()} payments are essential recurring expenses rather than discretionary spending.",
+            actionable_step="No action needed. Compare providers or plans occasionally if the bills seem high.",
+            estimated_annual_saving=0.0,
+        )
+
+    @staticmethod
+    def score_subscription(pattern: Dict) -> Optional["FinancialLeak"]:
+        """
+        Active subscription: a subscription-category charge with a fixed
+        amount on a fixed monthly/weekly cadence
+
+        The cadence proves the charge recurs, not that the service is unused
+        (there is no usage evidence), so it is reported as a recurring
+        subscription to review, with moderate probability.
+        """
+        if LeakDetector._category(pattern) not in LeakDetector.SUBSCRIPTION_CATEGORIES:
+            return None
+        txn_count = pattern.get('txn_count') or 0
+        avg_amount = pattern.get('avg_amount') or 0.0
+        avg_gap = pattern.get('avg_gap_days') or 0.0
+        gap_std = pattern.get('gap_std_days') or 0.0
+        if txn_count < LeakDetector.MIN_SUBSCRIPTION_CHARGES or avg_amount <= 0:
+            return None
+        if (pattern.get('amount_std') or 0.0) > LeakDetector.MAX_AMOUNT_VARIATION * avg_amount:
+            return None
+
+        cadence = next(
+            (
+                name for name, min_gap, max_gap, max_std in LeakDetector.SUBSCRIPTION_CADENCES
+                if min_gap <= avg_gap <= max_gap and gap_std <= max_std
+            ),
+            None
+        )
+        if cadence is None:
+            return None
+
+        annual_cost = round(avg_amount * 365 / avg_gap, 2)
+        return LeakDetector._leak(
+            pattern,
+            leak_category="recurring_subscription",
+            leak_probability=0.4,
+            reasoning=(
+                f"A fixed {cadence} charge of {avg_amount:.2f} (gap {avg_gap:.0f} ± {gap_std:.1f} days) "
+                f"billed {txn_count} times: a recurring subscription that renews without any decision, "
+                f"costing about {annual_cost:.2f} per year. Whether it is still used cannot be told from the charges."
+            ),
+            actionable_step="Check whether you still use this subscription; cancel or downgrade it if not.",
+            estimated_annual_saving=annual_cost,
+        )
+
+    # Applied in order; the first rule that matches decides
+    RULES = ["score_essential", "score_subscription"]
+
+    # ==================== SCORING ====================
+    @staticmethod
+    def score(pattern: Dict) -> Optional["FinancialLeak"]:
+        """Score one pattern; None when no rule is certain"""
+        for rule in LeakDetector.RULES:
+            leak = getattr(LeakDetector, rule)(pattern)
+            if leak is not None:
+                return leak
+        return None
+
+    @staticmethod
+    def pre_score(patterns: List[Dict]) -> Tuple[List["FinancialLeak"], List[Dict]]:
+        """
+        Split patterns into locally scored ones and ambiguous ones
+
+        Returns: (leaks for the certain patterns, patterns still needing the model)
+        """
+        scored, ambiguous = [], []
+        for pattern in patterns:
+            leak = LeakDetector.score(pattern)
+            if leak is not None:
+                scored.append(leak)
+            else:
+                ambiguous.append(pattern)
+        logger.info(f"Rule pre-scoring: {len(scored)} patterns scored locally, {len(ambiguous)} left for the model")
+        return scored, ambiguous
@@ -0,0 +1,129 @@
+"""
+Pipeline Executors
+Shared pools that CPU-bound upload stages are dispatched through, so pandas
+work never runs on the event loop and heavy enrichment runs outside the GIL
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineExecutors:
+    """Thread pool for parsing/cleaning ("io") and process pool for enrichment ("cpu")
+
+    Configuration (environment):
+    - PIPELINE_IO_WORKERS: parse/clean threads (default 4)
+    - PIPELINE_CPU_EXECUTOR: 'process' | 'thread' | 'inline' (default 'process')
+    - PIPELINE_CPU_WORKERS: enrichment workers (default: CPU count)
+    - PIPELINE_CPU_MIN_ROWS: smaller frames are enriched inline, since pickling
+      them to a worker costs more than the work itself (default 5000)
+    - PIPELINE_MP_START_METHOD: multiprocessing start method (default 'spawn')
+
+    DataFrames cross the process boundary as pickles (protocol 5, numpy buffers).
+    Calls block the calling thread; async code should call from asyncio.to_thread.
+    """
+
+    IO_WORKERS = int(os.getenv("PIPELINE_IO_WORKERS", "4"))
+    CPU_EXECUTOR = os.getenv("PIPELINE_CPU_EXECUTOR", "process")
+    CPU_WORKERS = int(os.getenv("PIPELINE_CPU_WORKERS", "0")) or (os.cpu_count() or 1)
+    CPU_MIN_ROWS = int(os.getenv("PIPELINE_CPU_MIN_ROWS", "5000"))
+    MP_START_METHOD = os.getenv("PIPELINE_MP_START_METHOD", "spawn")
+
+    _io_pool: Optional[ThreadPoolExecutor] = None
+    _cpu_pool: Optional[Executor] = None
+    # Run in each new process worker, e.g. to replay runtime config changes
+    _cpu_initializer: Optional[Tuple[Callable, tuple]] = None
+    _lock = threading.Lock()
+
+    # ==================== CONFIGURATION ====================
+    @classmethod
+    def configure(
+        cls,
+        cpu_executor: Optional[str] = None,
+        cpu_workers: Optional[int] = None,
+        io_workers: Optional[int] = None,
+        cpu_min_rows: Optional[int] = None,
+    ):
+        """Change pool settings at runtime (existing pools are shut down and rebuilt lazily)"""
+        if cpu_executor is not None:
+            if cpu_executor not in ("process", "thread", "inline"):
+                raise ValueError(f"Unknown cpu executor: {cpu_executor}")
+            cls.CPU_EXECUTOR = cpu_executor
+        if cpu_workers is not None:
+            cls.CPU_WORKERS = cpu_workers
+        if io_workers is not None:
+            cls.IO_WORKERS = io_workers
+        if cpu_min_rows is not None:
+            cls.CPU_MIN_ROWS = cpu_min_rows
+        cls.shutdown()
+
+    @classmethod
+    def set_cpu_initializer(cls, initializer: Optional[Callable], *initargs):
+        """Register a function run in every process worker; restarts the process pool"""
+        with cls._lock:
+            cls._cpu_initializer = (initializer, initargs) if initializer else None
+            pool, cls._cpu_pool = cls._cpu_pool, None
+        if pool:
+            pool.shutdown(wait=False)
+
+    @classmethod
+    def shutdown(cls, wait: bool = False):
+        with cls._lock:
+            pools = (cls._io_pool, cls._cpu_pool)
+            cls._io_pool = cls._cpu_pool = None
+        for pool in pools:
+            if pool:
+                pool.shutdown(wait=wait)
+
+    # ==================== POOLS ====================
+    @classmethod
+    def _get_io_pool(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._io_pool is None:
+                cls._io_pool = ThreadPoolExecutor(max_workers=cls.IO_WORKERS, thread_name_prefix="pipeline-io")
+            return cls._io_pool
+
+    @classmethod
+    def _get_cpu_pool(cls) -> Executor:
+        with cls._lock:
+            if cls._cpu_pool is None:
+                if cls.CPU_EXECUTOR == "process":
+                    initializer, initargs = cls._cpu_initializer or (None, ())
+                    cls._cpu_pool = ProcessPoolExecutor(
+                        max_workers=cls.CPU_WORKERS,
+                        mp_context=multiprocessing.get_context(cls.MP_START_METHOD),
+                        initializer=initializer,
+                        initargs=initargs,
+                    )
+                else:
+                    cls._cpu_pool = ThreadPoolExecutor(max_workers=cls.CPU_WORKERS, thread_name_prefix="pipeline-cpu")
+                logger.info(f"Started {cls.CPU_EXECUTOR} pool with {cls.CPU_WORKERS} workers for enrichment")
+            return cls._cpu_pool
+
+    # ==================== DISPATCH ====================
+    @classmethod
+    def run_io(cls, fn: Callable, *args):
+        """Run fn(*args) on the parse/clean thread pool and wait for the result"""
+        return cls._get_io_pool().submit(fn, *args).result()
+
+    @classmethod
+    def map_io(cls, fn: Callable, *iterables) -> List:
+        """Run fn over the argument iterables concurrently on the parse/clean thread pool; results in input order"""
+        return list(cls._get_io_pool().map(fn, *iterables))
+
+    @classmethod
+    def run_cpu(cls, fn: Callable, *args, rows: Optional[int] = None):
+        """
+        Run fn(*args) on the enrichment pool and wait for the result.
+        fn and args must be picklable (module-level or class-level functions).
+        Runs inline when the executor is 'inline' or rows < CPU_MIN_ROWS.
+        """
+        if cls.CPU_EXECUTOR == "inline" or (rows is not None and rows < cls.CPU_MIN_ROWS):
+            return fn(*args)
+        return cls._get_cpu_pool().submit(fn, *args).result()
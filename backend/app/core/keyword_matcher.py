@@ -0,0 +1,120 @@
+"""
+Multi-pattern keyword matching for transaction enrichment
+Aho-Corasick automaton: finds every keyword occurring in a narration in one pass,
+independent of how many keywords are configured.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over (keyword, priority) pairs
+
+    Matching is plain substring containment (same as `keyword in text`).
+    Lower priority value wins, so callers encode rule order as the priority.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Best (lowest) priority of any keyword ending at this node, incl. via fail links
+        self._out: List[Optional[int]] = [None]
+        self.keyword_count = 0
+
+        for keyword, priority in keywords:
+            self._insert(keyword, priority)
+            self.keyword_count += 1
+
+        self._build_fail_links()
+        priorities = [p for p in self._out if p is not None]
+        self._top_priority = min(priorities) if priorities else None
+
+    def _insert(self, keyword: str, priority: int):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+            node = nxt
+        if self._out[node] is None or priority < self._out[node]:
+            self._out[node] = priority
+
+    def _build_fail_links(self):
+        # Depth-1 nodes fail back to the root; deeper nodes follow their parent's fail chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+
+                inherited = self._out[self._fail[child]]
+                if inherited is not None and (self._out[child] is None or inherited < self._out[child]):
+                    self._out[child] = inherited
+
+    def best_priority(self, text: str) -> Optional[int]:
+        """
+        Lowest priority among keywords contained in text, or None if none match.
+        Stops early once the highest possible priority has been seen.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        top = self._top_priority
+        best = out[0]  # empty keyword matches everything
+        if best is not None and best == top:
+            return best
+
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            found = out[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == top:
+                    break
+        return best
+
+    def contains_any(self, text: str) -> bool:
+        """True if any keyword is a substring of text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        if out[0] is not None:
+            return True
+
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] is not None:
+                return True
+        return False
+
+
+class CategoryMatcher:
+    """Maps text to the first category (in dict order) whose keywords it contains"""
+
+    def __init__(self, category_keywords: Dict[str, List[str]]):
+        self.categories = list(category_keywords)
+        self._automaton = KeywordAutomaton(
+            (keyword, priority)
+            for priority, keywords in enumerate(category_keywords.values())
+            for keyword in keywords
+        )
+
+    @property
+    def keyword_count(self) -> int:
+        return self._automaton.keyword_count
+
+    def match(self, text: str, default: str = "UNKNOWN") -> str:
+        priority = self._automaton.best_priority(text)
+        return default if priority is None else self.categories[priority]
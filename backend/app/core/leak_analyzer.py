@@ -15,10 +15,17 @@ NEW FLOW:
 
 import os
 import json
-from typing import List, Optional, Dict
+import asyncio
+import bisect
+import time
+import hashlib
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from app.models import SpendingPatternStats, User
+from app.core.detector import LeakDetector
+from app.core.model_router import ModelRouter, ModelsUnavailableError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -53,6 +60,19 @@ class LeakAnalysisResponse(BaseModel):
     analysis_timestamp: str = Field(description="ISO timestamp of when analysis was performed")
     confidence_level: str = Field(description="Overall confidence: high, medium, low")
 
+
+class LeakAnalysisResult(LeakAnalysisResponse):
+    """LeakAnalysisResponse plus evidence-cache bookkeeping (not part of the model's response schema)"""
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cached_pattern_ids: List[int] = Field(default_factory=list)
+    evidence_hashes: Dict[int, str] = Field(default_factory=dict)
+    # Patterns scored by LeakDetector rules instead of the model
+    rule_scored_pattern_ids: List[int] = Field(default_factory=list)
+    # Patterns sent to the model that got no insight (their chunk failed or the model left them out)
+    unanalyzed_pattern_ids: List[int] = Field(default_factory=list)
+
+
 # ==================== LEAK ANALYZER ====================
 
 class LeakAnalyzer:
@@ -73,6 +93,22 @@ class LeakAnalyzer:
         "gemini-2.5-flash-lite",
     ]
     
+    # Patterns are sent in chunks of about this many evidence tokens, several chunks at a time
+    CHUNK_TOKEN_BUDGET = int(os.getenv("LEAK_ANALYSIS_CHUNK_TOKENS", "4000"))
+    MAX_CONCURRENT_CHUNKS = int(os.getenv("LEAK_ANALYSIS_CONCURRENCY", "4"))
+    # Rough size of a token in JSON text, for budgeting without a tokenizer call
+    CHARS_PER_TOKEN = 4
+    # Merged confidence is the lowest level any chunk reported
+    CONFIDENCE_LEVELS = ["low", "medium", "high"]
+    # Score patterns with certain outcomes locally (LeakDetector) instead of sending them to the model
+    RULE_SCORING = os.getenv("LEAK_RULE_SCORING", "true").lower() == "true"
+    # Upper bound on one model call, including the SDK's own retries
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+    # Models tried per chunk, in ModelRouter order (healthiest first)
+    MAX_MODEL_ATTEMPTS = 3
+    # Alternative API endpoint, e.g. fake_gemini_server.py for offline testing
+    BASE_URL = os.getenv("GEMINI_BASE_URL")
+    
     def __init__(self, api_key: Optional[str] = None):
         """Initialize the leak analyzer
         
@@ -87,15 +123,57 @@ class LeakAnalyzer:
         if self.primary_model in self.fallback_models:
             self.fallback_models.remove(self.primary_model)
         self.fallback_models.insert(0, self.primary_model)
+        # Circuit breakers and latency/success windows per model; shared by all analyses
+        self.router = ModelRouter(self.fallback_models)
         
         self.enabled = GEMINI_AVAILABLE and bool(self.api_key)
         
         if self.enabled:
+            # One client for the analyzer's lifetime, so HTTP connections are reused across requests
+            self.client = genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(
+                    base_url=self.BASE_URL,
+                    timeout=int(self.REQUEST_TIMEOUT_SECONDS * 1000),
+                ),
+            )
             logger.info(f"Gemini AI analyzer initialized with primary model: {self.primary_model}")
             logger.info(f"Fallback models: {', '.join(self.fallback_models[1:])}")
         else:
             raise ValueError("Gemini API not available. Cannot initialize analyzer without API key.")
     
+    async def aclose(self):
+        """Close the client's connections (application shutdown)"""
+        await self.client.aio.aclose()
+        self.client.close()
+    
+    # ==================== EVIDENCE ====================
+    @staticmethod
+    def pattern_evidence(pattern: Dict) -> Dict:
+        """Evidence of one SpendingPatternStats dict, as sent to the model"""
+        return {
+            "id": pattern['id'],
+            "merchant": pattern['merchant_hint'],
+            "level_3_category": pattern['dominant_level_3_tag'],
+            "category_confidence": float(pattern['level_3_confidence']) if pattern['level_3_confidence'] else 0.0,
+            
+            # Aggregated evidence (FACTS ONLY)
+            "transaction_count": pattern['txn_count'],
+            "total_spent": float(pattern['total_amount']),
+            "average_per_transaction": float(pattern['avg_amount']) if pattern['avg_amount'] else 0.0,
+            "amount_std_dev": float(pattern['amount_std']) if pattern['amount_std'] else 0.0,
+            "min_amount": float(pattern['amount_min']) if pattern['amount_min'] else 0.0,
+            "max_amount": float(pattern['amount_max']) if pattern['amount_max'] else 0.0,
+            
+            # Temporal evidence
+            "active_duration_days": pattern['active_duration_days'],
+            "average_gap_days": float(pattern['avg_gap_days']) if pattern['avg_gap_days'] else 0.0,
+            "gap_std_dev": float(pattern['gap_std_days']) if pattern['gap_std_days'] else 0.0,
+            "min_gap_days": float(pattern['gap_min_days']) if pattern['gap_min_days'] else 0.0,
+            "max_gap_days": float(pattern['gap_max_days']) if pattern['gap_max_days'] else 0.0,
+            "days_since_last_transaction": pattern['last_txn_days_ago'],
+        }
+    
     def format_patterns_for_analysis(self, patterns: List[Dict]) -> str:
         """Convert aggregated pattern stats to JSON for AI reasoning
         
@@ -109,34 +187,36 @@ class LeakAnalyzer:
             Includes only aggregated EVIDENCE (facts), not conclusions.
             AI will reason over this evidence.
         """
-        patterns_data = []
-        for pattern in patterns:
-            patterns_data.append({
-                "id": pattern['id'],
-                "merchant": pattern['merchant_hint'],
-                "level_3_category": pattern['dominant_level_3_tag'],
-                "category_confidence": float(pattern['level_3_confidence']) if pattern['level_3_confidence'] else 0.0,
-                
-                # Aggregated evidence (FACTS ONLY)
-                "transaction_count": pattern['txn_count'],
-                "total_spent": float(pattern['total_amount']),
-                "average_per_transaction": float(pattern['avg_amount']) if pattern['avg_amount'] else 0.0,
-                "amount_std_dev": float(pattern['amount_std']) if pattern['amount_std'] else 0.0,
-                "min_amount": float(pattern['amount_min']) if pattern['amount_min'] else 0.0,
-                "max_amount": float(pattern['amount_max']) if pattern['amount_max'] else 0.0,
-                
-                # Temporal evidence
-                "active_duration_days": pattern['active_duration_days'],
-                "average_gap_days": float(pattern['avg_gap_days']) if pattern['avg_gap_days'] else 0.0,
-                "gap_std_dev": float(pattern['gap_std_days']) if pattern['gap_std_days'] else 0.0,
-                "min_gap_days": float(pattern['gap_min_days']) if pattern['gap_min_days'] else 0.0,
-                "max_gap_days": float(pattern['gap_max_days']) if pattern['gap_max_days'] else 0.0,
-                "days_since_last_transaction": pattern['last_txn_days_ago'],
-            })
-        
-        return json.dumps(patterns_data, indent=2)
-    
-    async def analyze_patterns(self, patterns: List[Dict]) -> LeakAnalysisResponse:
+        return json.dumps([self.pattern_evidence(pattern) for pattern in patterns], indent=2)
+    
+    # Bump when the prompt changes, so insights reasoned under the old prompt are re-analyzed
+    EVIDENCE_VERSION = 1
+    # days_since_last_transaction grows every day; only crossing one of these matters to the reasoning
+    RECENCY_BUCKET_DAYS = [7, 30, 60, 90, 180, 365]
+    
+    @classmethod
+    def evidence_fingerprint(cls, pattern: Dict) -> str:
+        """
+        Stable hash of a pattern's evidence: identical whenever a re-analysis
+        would see the same facts (recency bucketed, floats rounded to cents)
+        
+        Returns: SHA-256 hex digest
+        """
+        evidence = cls.pattern_evidence(pattern)
+        evidence.pop("id")
+        days_since_last = evidence.pop("days_since_last_transaction")
+        evidence["recency_bucket"] = (
+            bisect.bisect_left(cls.RECENCY_BUCKET_DAYS, days_since_last) if days_since_last is not None else None
+        )
+        evidence["version"] = cls.EVIDENCE_VERSION
+        evidence = {key: round(value, 2) if isinstance(value, float) else value for key, value in evidence.items()}
+        return hashlib.sha256(json.dumps(evidence, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    async def analyze_patterns(
+        self,
+        patterns: List[Dict],
+        cached_insights: Optional[Dict[int, Dict]] = None
+    ) -> LeakAnalysisResult:
         """Analyze spending pattern evidence for financial leaks using AI reasoning
         
         AI RESPONSIBILITIES:
@@ -150,15 +230,25 @@ class LeakAnalyzer:
         - Detect patterns (already done)
         - Filter patterns (all passed patterns analyzed)
         
+        EVIDENCE CACHE:
+        - Patterns whose evidence_fingerprint matches their stored insight reuse it
+        - Only new or changed patterns are sent to the model
+        
+        RULE PRE-SCORING:
+        - New or changed patterns with a certain outcome are scored by LeakDetector rules
+        - Only the ambiguous rest is sent to the model
+        
         Args:
             patterns: List of pattern dicts with aggregated evidence from SpendingPatternStats
+            cached_insights: Stored insights by pattern_id (FinancialLeak fields plus evidence_hash)
             
         Returns:
-            LeakAnalysisResponse with AI reasoning
+            LeakAnalysisResult with AI reasoning, cache hit/miss counts, rule-scored patterns and each pattern's evidence hash
             
         Raises:
             ValueError: If patterns list is empty
-            Exception: If all Gemini API models fail
+            ModelsUnavailableError: If every model's circuit is open (nothing was sent)
+            Exception: If all Gemini API models fail for every chunk
         """
         if not patterns:
             raise ValueError("No patterns provided for analysis")
@@ -166,6 +256,141 @@ class LeakAnalyzer:
         if not self.enabled:
             raise ValueError("Gemini API not available. API key not configured.")
         
+        cached_insights = cached_insights or {}
+        evidence_hashes = {pattern['id']: self.evidence_fingerprint(pattern) for pattern in patterns}
+        cached_leaks, changed = [], []
+        for pattern in patterns:
+            insight = cached_insights.get(pattern['id'])
+            if insight is not None and insight.get('evidence_hash') == evidence_hashes[pattern['id']]:
+                cached_leaks.append(FinancialLeak(
+                    pattern_id=pattern['id'],
+                    merchant_hint=pattern['merchant_hint'],
+                    leak_category=insight['leak_category'],
+                    leak_probability=insight['leak_probability'],
+                    reasoning=insight['reasoning'],
+                    actionable_step=insight['actionable_step'],
+                    estimated_annual_saving=insight['estimated_annual_saving'],
+                ))
+            else:
+                changed.append(pattern)
+        logger.info(f"Evidence cache: {len(cached_leaks)} patterns unchanged, {len(changed)} new or changed")
+        
+        rule_leaks, to_analyze = LeakDetector.pre_score(changed) if self.RULE_SCORING else ([], changed)
+        
+        unanalyzed_pattern_ids = []
+        if to_analyze:
+            analysis, unanalyzed_pattern_ids = await self._reason_over_patterns(to_analyze)
+            leaks = cached_leaks + rule_leaks + analysis.leaks
+            analysis_timestamp, confidence_level = analysis.analysis_timestamp, analysis.confidence_level
+        else:
+            # No model run: derive the overall level from the cached and rule-scored probabilities
+            leaks = cached_leaks + rule_leaks
+            analysis_timestamp = datetime.utcnow().isoformat()
+            mean_probability = sum(leak.leak_probability for leak in leaks) / len(leaks)
+            confidence_level = "high" if mean_probability >= 0.7 else "medium" if mean_probability >= 0.4 else "low"
+        
+        return LeakAnalysisResult(
+            leaks=leaks,
+            total_estimated_annual_saving=sum(leak.estimated_annual_saving for leak in leaks),
+            analysis_timestamp=analysis_timestamp,
+            confidence_level=confidence_level,
+            cache_hits=len(cached_leaks),
+            cache_misses=len(changed),
+            cached_pattern_ids=[leak.pattern_id for leak in cached_leaks],
+            evidence_hashes=evidence_hashes,
+            rule_scored_pattern_ids=[leak.pattern_id for leak in rule_leaks],
+            unanalyzed_pattern_ids=unanalyzed_pattern_ids,
+        )
+    
+    # ==================== CHUNKED REASONING ====================
+    def chunk_patterns(self, patterns: List[Dict]) -> List[List[Dict]]:
+        """Split patterns into chunks whose evidence JSON stays within CHUNK_TOKEN_BUDGET (at least one pattern each)"""
+        chunks, chunk, chunk_tokens = [], [], 0
+        for pattern in patterns:
+            tokens = len(json.dumps(self.pattern_evidence(pattern), indent=2)) // self.CHARS_PER_TOKEN
+            if chunk and chunk_tokens + tokens > self.CHUNK_TOKEN_BUDGET:
+                chunks.append(chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(pattern)
+            chunk_tokens += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+    
+    async def _reason_over_chunks(self, chunks: List[List[Dict]]) -> List:
+        """Run chunks concurrently (at most MAX_CONCURRENT_CHUNKS at a time); a failed chunk's exception is returned in its place"""
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CHUNKS)
+        
+        async def run(chunk: List[Dict]) -> LeakAnalysisResponse:
+            async with semaphore:
+                return await self._reason_over_chunk(chunk)
+        
+        return await asyncio.gather(*(run(chunk) for chunk in chunks), return_exceptions=True)
+    
+    async def _reason_over_patterns(self, patterns: List[Dict]) -> Tuple[LeakAnalysisResponse, List[int]]:
+        """
+        Reason over patterns in concurrent token-budgeted chunks and merge the chunk responses.
+        Chunks that fail on every model are split in half and retried once (only those chunks),
+        unless no chunk succeeded at all.
+        
+        Returns: (merged LeakAnalysisResponse, ids of patterns that got no insight)
+        
+        Raises:
+            ModelsUnavailableError: If every model's circuit is open
+            Exception: If every chunk failed
+        """
+        chunks = self.chunk_patterns(patterns)
+        logger.info(f"Reasoning over {len(patterns)} patterns in {len(chunks)} chunks")
+        results = await self._reason_over_chunks(chunks)
+        
+        failed = [chunk for chunk, result in zip(chunks, results) if isinstance(result, BaseException)]
+        succeeded = [(chunk, result) for chunk, result in zip(chunks, results) if not isinstance(result, BaseException)]
+        if not succeeded:
+            if all(isinstance(result, ModelsUnavailableError) for result in results):
+                logger.error(f"Leak reasoning skipped: {results[-1]}")
+                raise results[-1]
+            error_msg = f"Leak reasoning failed for all {len(chunks)} chunks. Last error: {results[-1]}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+        
+        # Smaller prompts get through where a truncated or invalid response failed the whole chunk
+        retry_chunks = [half for chunk in failed for half in (chunk[:len(chunk) // 2], chunk[len(chunk) // 2:]) if half]
+        if retry_chunks:
+            logger.warning(f"Retrying {len(failed)} failed chunks as {len(retry_chunks)} smaller chunks")
+            retry_results = await self._reason_over_chunks(retry_chunks)
+            succeeded.extend(
+                (chunk, result) for chunk, result in zip(retry_chunks, retry_results)
+                if not isinstance(result, BaseException)
+            )
+        
+        # Keep one insight per pattern of the chunk (the model may repeat or invent ids)
+        leaks_by_id = {}
+        for chunk, result in succeeded:
+            chunk_ids = {pattern['id'] for pattern in chunk}
+            for leak in result.leaks:
+                if leak.pattern_id in chunk_ids:
+                    leaks_by_id.setdefault(leak.pattern_id, leak)
+        leaks = [leaks_by_id[pattern['id']] for pattern in patterns if pattern['id'] in leaks_by_id]
+        unanalyzed = [pattern['id'] for pattern in patterns if pattern['id'] not in leaks_by_id]
+        if unanalyzed:
+            logger.warning(f"{len(unanalyzed)} patterns got no insight: {unanalyzed[:20]}")
+        
+        levels = [result.confidence_level for _, result in succeeded if result.confidence_level in self.CONFIDENCE_LEVELS]
+        analysis = LeakAnalysisResponse(
+            leaks=leaks,
+            total_estimated_annual_saving=sum(leak.estimated_annual_saving for leak in leaks),
+            analysis_timestamp=datetime.utcnow().isoformat(),
+            confidence_level=min(levels, key=self.CONFIDENCE_LEVELS.index) if levels else "low",
+        )
+        return analysis, unanalyzed
+    
+    async def _reason_over_chunk(self, patterns: List[Dict]) -> LeakAnalysisResponse:
+        """One model run over one chunk of patterns, trying the fallback models in order
+        
+        Raises:
+            ModelsUnavailableError: If every model's circuit is open (or half-open with its probe taken by another chunk)
+            Exception: If all Gemini API models fail
+        """
         # Format patterns for Gemini
         patterns_json = self.format_patterns_for_analysis(patterns)
         
@@ -238,42 +463,68 @@ Return valid JSON with structure:
   "confidence_level": "<high|medium|low>"
 }}"""
 
-        from datetime import datetime as dt
-        
-        # Try each fallback model
+        # Try the healthiest models first; models with an open circuit are skipped
+        # (raises ModelsUnavailableError right away when every circuit is open)
+        models = self.router.candidates()[:self.MAX_MODEL_ATTEMPTS]
         last_error = None
-        for attempt, model in enumerate(self.fallback_models[:3], 1):  # Try max 3 models
+        attempted = 0
+        for attempt, model in enumerate(models, 1):
+            if not self.router.begin(model):
+                # Another chunk is probing this model right now
+                logger.info(f"Attempt {attempt} - Model '{model}' skipped: circuit open, recovery probe in flight")
+                continue
+            attempted += 1
+            started = time.perf_counter()
+            succeeded = False
             try:
-                logger.info(f"Attempt {attempt}/3: Calling Gemini API with model '{model}' for leak reasoning")
+                logger.info(f"Attempt {attempt}/{len(models)}: Calling Gemini API with model '{model}' for leak reasoning")
                 
-                client = genai.Client(api_key=self.api_key)
-                response = client.models.generate_content(
-                    model=model,
-                    contents=user_prompt,
-                    config=types.GenerateContentConfig(
-                        system_instruction=system_prompt,
-                        temperature=0.3,  # Lower temperature for consistent reasoning
-                        response_mime_type="application/json",
-                        response_schema=LeakAnalysisResponse,
+                # Async SDK surface: the event loop keeps serving other requests while the model reasons
+                response = await asyncio.wait_for(
+                    self.client.aio.models.generate_content(
+                        model=model,
+                        contents=user_prompt,
+                        config=types.GenerateContentConfig(
+                            system_instruction=system_prompt,
+                            temperature=0.3,  # Lower temperature for consistent reasoning
+                            response_mime_type="application/json",
+                            response_schema=LeakAnalysisResponse,
+                        ),
                     ),
+                    timeout=self.REQUEST_TIMEOUT_SECONDS,
                 )
                 
                 # Parse response using Pydantic model validation
                 analysis = LeakAnalysisResponse.model_validate_json(response.text)
-                logger.info(f"✓ Leak reasoning successful with model '{model}'. Analyzed {len(analysis.leaks)} patterns.")
+                logger.info(f"✓ Leak reasoning successful with model '{model}'. Analyzed {len(analysis.leaks)}/{len(patterns)} patterns.")
+                succeeded = True
                 return analysis
                 
             except json.JSONDecodeError as e:
                 last_error = f"JSON parsing error: {str(e)}"
                 logger.warning(f"Attempt {attempt} - {last_error}")
                 continue
+            except asyncio.TimeoutError:
+                last_error = f"Timed out after {self.REQUEST_TIMEOUT_SECONDS:.0f}s"
+                logger.warning(f"Attempt {attempt} - Model '{model}' failed: {last_error}")
+                continue
             except Exception as e:
                 last_error = f"{type(e).__name__}: {str(e)}"
                 logger.warning(f"Attempt {attempt} - Model '{model}' failed: {last_error}")
                 continue
+            finally:
+                self.router.record(model, succeeded, time.perf_counter() - started)
+        
+        if not attempted:
+            # Every circuit refused between candidates() and begin(): nothing was sent;
+            # the probes in flight settle within one request timeout
+            raise ModelsUnavailableError(
+                f"All {len(models)} model circuits are open (recovery probes in flight)",
+                retry_after=self.REQUEST_TIMEOUT_SECONDS
+            )
         
         # All models failed
-        error_msg = f"All 3 Gemini AI models failed. Last error: {last_error}"
+        error_msg = f"All {len(models)} Gemini AI models failed. Last error: {last_error}"
         logger.error(error_msg)
         raise Exception(error_msg)
 
@@ -359,15 +610,34 @@ async def analyze_for_leaks(
         
         logger.info(f"Running AI reasoning on {len(patterns_data)} pattern stats for user {current_user.id}")
         
+        # Stored insights, reused for patterns whose evidence has not changed since they were reasoned
+        existing_insights = {
+            insight.pattern_id: insight
+            for insight in db.query(LeakInsight).filter(LeakInsight.user_id == current_user.id)
+        }
+        cached_insights = {
+            pattern_id: {
+                'evidence_hash': insight.evidence_hash,
+                'leak_category': insight.leak_category,
+                'leak_probability': insight.leak_probability,
+                'reasoning': insight.reasoning,
+                'actionable_step': insight.actionable_step,
+                'estimated_annual_saving': insight.estimated_annual_saving,
+            }
+            for pattern_id, insight in existing_insights.items()
+            if insight.evidence_hash
+        }
+        
         # Run AI reasoning (NOT pattern detection, NOT stat computation)
-        analysis_result = await leak_analyzer.analyze_patterns(patterns_data)
+        analysis_result = await leak_analyzer.analyze_patterns(patterns_data, cached_insights)
+        cached_pattern_ids = set(analysis_result.cached_pattern_ids)
+        rule_scored_pattern_ids = set(analysis_result.rule_scored_pattern_ids)
         
-        # Store/update leak insights in database
+        # Store/update leak insights in database (cache hits are already stored)
         for leak in analysis_result.leaks:
-            existing_insight = db.query(LeakInsight).filter(
-                LeakInsight.pattern_id == leak.pattern_id,
-                LeakInsight.user_id == current_user.id
-            ).first()
+            if leak.pattern_id in cached_pattern_ids:
+                continue
+            existing_insight = existing_insights.get(leak.pattern_id)
             
             if not existing_insight:
                 # Create new leak insight from AI reasoning
@@ -379,9 +649,11 @@ async def analyze_for_leaks(
                     reasoning=leak.reasoning,
                     actionable_step=leak.actionable_step,
                     estimated_annual_saving=leak.estimated_annual_saving,
+                    evidence_hash=analysis_result.evidence_hashes.get(leak.pattern_id),
                     analysis_timestamp=datetime.fromisoformat(analysis_result.analysis_timestamp)
                 )
                 db.add(new_insight)
+                existing_insights[leak.pattern_id] = new_insight
             else:
                 # Update existing insight with new AI reasoning
                 existing_insight.leak_category = leak.leak_category
@@ -389,12 +661,16 @@ async def analyze_for_leaks(
                 existing_insight.reasoning = leak.reasoning
                 existing_insight.actionable_step = leak.actionable_step
                 existing_insight.estimated_annual_saving = leak.estimated_annual_saving
+                existing_insight.evidence_hash = analysis_result.evidence_hashes.get(leak.pattern_id)
                 existing_insight.analysis_timestamp = datetime.fromisoformat(analysis_result.analysis_timestamp)
                 db.add(existing_insight)
         
         db.commit()
         
-        logger.info(f"Stored/updated {len(analysis_result.leaks)} leak insights for user {current_user.id}")
+        logger.info(
+            f"Stored/updated {len(analysis_result.leaks) - len(cached_pattern_ids)} leak insights for user {current_user.id} "
+            f"({analysis_result.cache_hits} reused unchanged)"
+        )
         
         # Get statistics for response (total spend, transaction count from patterns)
         pattern_stats = db.query(SpendingPatternStats).filter(
@@ -408,6 +684,8 @@ async def analyze_for_leaks(
         leaks_with_stats = []
         for leak in analysis_result.leaks:
             leak_dict = leak.model_dump()
+            leak_dict['cached'] = leak.pattern_id in cached_pattern_ids
+            leak_dict['rule_scored'] = leak.pattern_id in rule_scored_pattern_ids
             pattern = pattern_stats_map.get(leak.pattern_id)
             
             if pattern:
@@ -430,9 +708,20 @@ async def analyze_for_leaks(
         }
         
         # Return analysis with statistics included
-        response_dict = analysis_result.model_dump()
+        response_dict = analysis_result.model_dump(
+            exclude={
+                'cache_hits', 'cache_misses', 'cached_pattern_ids', 'evidence_hashes',
+                'rule_scored_pattern_ids', 'unanalyzed_pattern_ids',
+            }
+        )
         response_dict['leaks'] = leaks_with_stats
         response_dict['statistics'] = statistics
+        response_dict['cache'] = {
+            "hits": analysis_result.cache_hits,
+            "misses": analysis_result.cache_misses,
+        }
+        response_dict['rule_scored'] = len(rule_scored_pattern_ids)
+        response_dict['unanalyzed_pattern_ids'] = analysis_result.unanalyzed_pattern_ids
         
         return response_dict
         
@@ -442,6 +731,13 @@ async def analyze_for_leaks(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except ModelsUnavailableError as e:
+        logger.warning(f"Leak analysis rejected without calling the model: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI analysis service temporarily unavailable. All models are currently failing. Please try again later.",
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.5)))}
+        )
     except Exception as e:
         logger.error(f"Error analyzing patterns: {str(e)}")
         raise HTTPException(
@@ -450,6 +746,33 @@ async def analyze_for_leaks(
         )
 
 
+@router.get("/models/status")
+async def get_model_status(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Health of the AI models used for leak analysis (circuit state, success rate, p50 latency), in the order they are tried
+    """
+    get_current_user_from_token(request, db)
+    
+    if not leak_analyzer:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI analyzer not initialized. Check that GEMINI_API_KEY is configured."
+        )
+    
+    try:
+        order = leak_analyzer.router.candidates()
+    except ModelsUnavailableError:
+        order = []
+    models = {model["model"]: model for model in leak_analyzer.router.snapshot()}
+    return {
+        "status": "success",
+        "models": [models[model] for model in order] + [m for name, m in models.items() if name not in order]
+    }
+
+
 @router.get("/latest")
 async def get_latest_analysis(
     request: Request,
@@ -0,0 +1,194 @@
+"""
+Model Router
+Per-model circuit breakers over rolling outcome windows, used by LeakAnalyzer
+to skip models that are failing, try the fastest healthy model first and fail
+fast when no model is usable
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ModelsUnavailableError(Exception):
+    """Every model's circuit is open; retry_after is the seconds until the first one may be probed"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ModelCircuit:
+    """Rolling window of one model's call outcomes with closed / open / half-open state
+
+    - closed: calls flow; opens when the failure rate over the window reaches FAILURE_RATE
+    - open: calls are skipped until the cooldown has passed
+    - half-open: one probe call is let through; success closes the circuit,
+      failure re-opens it with a doubled cooldown (up to MAX_COOLDOWN_SECONDS)
+    """
+
+    def __init__(self, model: str, window: int, min_calls: int, failure_rate: float,
+                 cooldown_seconds: float, max_cooldown_seconds: float):
+        self.model = model
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        # (succeeded, seconds) of the last `window` calls
+        self.outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.opened_at: Optional[float] = None
+        self.cooldown = cooldown_seconds
+        self.probe_in_flight = False
+
+    # ==================== STATE ====================
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if now - self.opened_at >= self.cooldown else "open"
+
+    def available(self, now: float) -> bool:
+        state = self.state(now)
+        return state == "closed" or (state == "half_open" and not self.probe_in_flight)
+
+    def retry_after(self, now: float) -> float:
+        return 0.0 if self.opened_at is None else max(0.0, self.opened_at + self.cooldown - now)
+
+    # ==================== STATISTICS ====================
+    def success_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return sum(1 for ok, _ in self.outcomes if ok) / len(self.outcomes)
+
+    def p50_latency(self) -> Optional[float]:
+        """Median seconds of the successful calls in the window"""
+        latencies = sorted(seconds for ok, seconds in self.outcomes if ok)
+        if not latencies:
+            return None
+        middle = len(latencies) // 2
+        return latencies[middle] if len(latencies) % 2 else (latencies[middle - 1] + latencies[middle]) / 2
+
+    # ==================== TRANSITIONS ====================
+    def begin(self, now: float) -> bool:
+        """Claim a call slot; False when the circuit is open (or its half-open probe is taken)"""
+        state = self.state(now)
+        if state == "open" or (state == "half_open" and self.probe_in_flight):
+            return False
+        if state == "half_open":
+            self.probe_in_flight = True
+        return True
+
+    def record(self, succeeded: bool, seconds: float, now: float):
+        self.outcomes.append((succeeded, seconds))
+        if self.opened_at is not None:
+            if not self.probe_in_flight:
+                # A call started before the circuit opened; the probe decides
+                return
+            self.probe_in_flight = False
+            if succeeded:
+                logger.info(f"Model '{self.model}' recovered; circuit closed")
+                self.opened_at = None
+                self.cooldown = self.base_cooldown
+                self.outcomes.clear()
+                self.outcomes.append((succeeded, seconds))
+            else:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.opened_at = now
+                logger.warning(f"Model '{self.model}' probe failed; circuit open for {self.cooldown:.0f}s")
+            return
+
+        failures = sum(1 for ok, _ in self.outcomes if not ok)
+        if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate_threshold:
+            self.opened_at = now
+            logger.warning(
+                f"Model '{self.model}' failed {failures}/{len(self.outcomes)} recent calls; "
+                f"circuit open for {self.cooldown:.0f}s"
+            )
+
+    def snapshot(self, now: float) -> Dict:
+        success_rate, p50 = self.success_rate(), self.p50_latency()
+        return {
+            "model": self.model,
+            "state": self.state(now),
+            "calls": len(self.outcomes),
+            "success_rate": round(success_rate, 3) if success_rate is not None else None,
+            "p50_latency_seconds": round(p50, 3) if p50 is not None else None,
+            "retry_after_seconds": round(self.retry_after(now), 1),
+        }
+
+
+class ModelRouter:
+    """Orders the configured models by observed health and tracks their circuits
+
+    Configuration (environment):
+    - LEAK_MODEL_WINDOW: calls kept per model (default 20)
+    - LEAK_MODEL_MIN_CALLS: calls needed before a circuit may open (default 4)
+    - LEAK_MODEL_FAILURE_RATE: failure fraction that opens a circuit (default 0.5)
+    - LEAK_MODEL_COOLDOWN_SECONDS: first open period (default 30; doubles per failed probe)
+    - LEAK_MODEL_MAX_COOLDOWN_SECONDS: longest open period (default 300)
+
+    Ordering: success rate (in steps of 10%) first, then p50 latency. Models
+    without data count as healthy and fast, so each one gets measured once
+    instead of a faster fallback never being discovered; ties keep the
+    configured order.
+    """
+
+    WINDOW = int(os.getenv("LEAK_MODEL_WINDOW", "20"))
+    MIN_CALLS = int(os.getenv("LEAK_MODEL_MIN_CALLS", "4"))
+    FAILURE_RATE = float(os.getenv("LEAK_MODEL_FAILURE_RATE", "0.5"))
+    COOLDOWN_SECONDS = float(os.getenv("LEAK_MODEL_COOLDOWN_SECONDS", "30"))
+    MAX_COOLDOWN_SECONDS = float(os.getenv("LEAK_MODEL_MAX_COOLDOWN_SECONDS", "300"))
+
+    def __init__(self, models: List[str]):
+        self.models = list(models)
+        self.circuits = {
+            model: ModelCircuit(
+                model, self.WINDOW, self.MIN_CALLS, self.FAILURE_RATE,
+                self.COOLDOWN_SECONDS, self.MAX_COOLDOWN_SECONDS,
+            )
+            for model in self.models
+        }
+        # Chunks of one analysis run concurrently; keep transitions atomic
+        self._lock = threading.Lock()
+
+    def candidates(self) -> List[str]:
+        """
+        Models worth trying, healthiest first
+        Raises: ModelsUnavailableError when every circuit is open
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = [model for model in self.models if self.circuits[model].available(now)]
+            if not available:
+                retry_after = min(circuit.retry_after(now) for circuit in self.circuits.values())
+                raise ModelsUnavailableError(
+                    f"All {len(self.models)} models are failing; retry in {retry_after:.0f}s", retry_after
+                )
+
+            def health(model: str):
+                circuit = self.circuits[model]
+                success_rate, p50 = circuit.success_rate(), circuit.p50_latency()
+                return (
+                    -round(success_rate if success_rate is not None else 1.0, 1),
+                    p50 if p50 is not None else 0.0,
+                    self.models.index(model),
+                )
+
+            return sorted(available, key=health)
+
+    def begin(self, model: str) -> bool:
+        with self._lock:
+            return self.circuits[model].begin(time.monotonic())
+
+    def record(self, model: str, succeeded: bool, seconds: float):
+        with self._lock:
+            self.circuits[model].record(succeeded, seconds, time.monotonic())
+
+    def snapshot(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [self.circuits[model].snapshot(now) for model in self.models]
@@ -4,16 +4,43 @@ Rule-based analysis for spending patterns from uploaded transaction files
 """
 
 import io
+import os
+import csv
+import json
+import queue
+import time
 import uuid
+import asyncio
+import hashlib
+import zipfile
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional
+from functools import lru_cache
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Dict, Sequence, Set, Tuple, Optional
 import pandas as pd
+from openpyxl import load_workbook
 import numpy as np
+from sqlalchemy import func, insert, update
 from sqlalchemy.orm import Session
 import logging
 import re
+
+from app.core.bank_profiles import AMOUNT, DIRECTION, BankProfile, BankProfileRegistry, ProfileMatch
+from app.core.executors import PipelineExecutors
+from app.core.keyword_matcher import CategoryMatcher, KeywordAutomaton
+from app.core.upload_archive import UploadArchive
+
 logger = logging.getLogger(__name__)
 
+# Try to import pyarrow (optional: multithreaded CSV parsing into Arrow-backed columns)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.warning("pyarrow not installed. CSV files will be parsed with the pandas C engine.")
+
 
 # ==================== CONFIGURATION ====================
 class PatternConfig:
@@ -23,53 +50,191 @@ class PatternConfig:
     MIN_RECURRING_INTERVAL_DAYS = 7    # Min days between txns for recurring
     MAX_FILE_SIZE_MB = 50
     
+    # Streaming CSV ingestion: bytes pulled from the upload per read, rows per clean -> enrich -> persist batch
+    STREAMING_INGESTION = os.getenv("STREAMING_INGESTION", "true").lower() == "true"
+    STREAM_READ_BYTES = 1024 * 1024
+    STREAM_CHUNK_ROWS = 20_000
+    
+    # Row ceiling per upload (bytes are capped by MAX_FILE_SIZE_MB)
+    MAX_ROWS = 1_000_000
+    
+    # Batch uploads (several statements or a ZIP): file count and combined size ceilings;
+    # each file is still capped by MAX_FILE_SIZE_MB and the combined rows by MAX_ROWS
+    MAX_BATCH_FILES = 24
+    MAX_BATCH_SIZE_MB = 200
+    
+    # CSV parser: 'pyarrow' (used when installed) or 'c' (pandas default engine)
+    CSV_ENGINE = os.getenv("CSV_ENGINE", "pyarrow")
+    
+    # Clean/enrich the parsed frame in place instead of copying it at every stage
+    INPLACE_PIPELINE = os.getenv("INPLACE_PIPELINE", "true").lower() == "true"
+    
     # Expected columns in CSV/Excel files
     EXPECTED_COLUMNS = ['Date', 'Narration', 'Withdrawal Amt.', 'Deposit Amt.']
     AMOUNT_COLUMNS = ['Withdrawal Amt.', 'Deposit Amt.']
     DATE_COLUMN = 'Date'
     NARRATION_COLUMN = 'Narration'
+    
+    # Bank exports put account details above the table; the header is searched for in this many rows
+    HEADER_SCAN_ROWS = 50
+    
+    # Date formats tried (after the bank profile's own) when inferring a date column's format;
+    # day-first before month-first, since statements are Indian DD/MM
+    DATE_FORMATS = [
+        "%d/%m/%y", "%d/%m/%Y", "%d-%m-%y", "%d-%m-%Y", "%d.%m.%Y",
+        "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+        "%d %b %Y", "%d %b %y", "%d-%b-%Y", "%d-%b-%y",
+        "%m/%d/%Y",
+    ]
+    # Values sampled (spread across the column) to pick the format
+    DATE_SAMPLE_SIZE = 200
+    # Share of the sample a format must parse to be used for the whole column
+    DATE_FORMAT_MIN_MATCH = 0.9
 
 
 # ==================== FILE PARSER ====================
+class UploadLimitExceeded(ValueError):
+    """Upload is larger than MAX_FILE_SIZE_MB or has more than MAX_ROWS rows"""
+
+
 class FileParser:
     """Parse CSV and Excel files"""
     
     @staticmethod
-    async def validate_file(file) -> Tuple[bool, Optional[str]]:
+    def max_file_bytes() -> int:
+        return PatternConfig.MAX_FILE_SIZE_MB * 1024 * 1024
+    
+    @staticmethod
+    def size_error(size: Optional[int]) -> Optional[str]:
+        """Error message if a known size is over the limit, else None"""
+        if size is not None and size > FileParser.max_file_bytes():
+            return f"File too large: {size / (1024 * 1024):.1f} MB exceeds the {PatternConfig.MAX_FILE_SIZE_MB} MB limit"
+        return None
+    
+    @staticmethod
+    def rows_error(rows: int) -> Optional[str]:
+        if rows > PatternConfig.MAX_ROWS:
+            return f"File has more than {PatternConfig.MAX_ROWS:,} rows (limit per upload)"
+        return None
+    
+    @staticmethod
+    def limits() -> Dict:
+        return {"max_file_size_mb": PatternConfig.MAX_FILE_SIZE_MB, "max_rows": PatternConfig.MAX_ROWS}
+    
+    @staticmethod
+    def validate_filename(filename: Optional[str]) -> Tuple[bool, Optional[str]]:
         """
-        Validate file type and size
+        Validate file type from its name
         Returns: (is_valid, error_message)
         """
-        if not file:
+        if not filename:
             return False, "No file provided"
         
-        filename = file.filename.lower() if hasattr(file, 'filename') else str(file).lower()
+        filename = filename.lower()
         
         # Check file extension
         valid_extensions = ['.csv', '.xlsx', '.xls']
         if not any(filename.endswith(ext) for ext in valid_extensions):
             return False, f"Invalid file type. Accepted: CSV, XLSX, XLS. Got: {filename}"
         
-        # File size check - UploadFile doesn't provide direct size, skip for now
+        # Size is enforced on upload.size when known, and while reading (read_limited / stream)
         return True, None
     
     @staticmethod
-    async def parse_file(file) -> Tuple[Optional[pd.DataFrame], List[Dict]]:
+    async def validate_file(file) -> Tuple[bool, Optional[str]]:
         """
-        Parse CSV or Excel file and validate expected columns
+        Validate file type and size
+        Returns: (is_valid, error_message)
+        """
+        if not file:
+            return False, "No file provided"
+        
+        filename = file.filename if hasattr(file, 'filename') else str(file)
+        is_valid, error_msg = FileParser.validate_filename(filename)
+        if not is_valid:
+            return is_valid, error_msg
+        
+        size_error = FileParser.size_error(getattr(file, 'size', None))
+        return (False, size_error) if size_error else (True, None)
+    
+    @staticmethod
+    async def read_limited(file) -> bytes:
+        """
+        Read an upload in fixed-size reads, stopping as soon as it crosses MAX_FILE_SIZE_MB
+        Raises: UploadLimitExceeded
+        """
+        max_bytes = FileParser.max_file_bytes()
+        buffer = bytearray()
+        while True:
+            chunk = await file.read(PatternConfig.STREAM_READ_BYTES)
+            if not chunk:
+                return bytes(buffer)
+            buffer += chunk
+            if len(buffer) > max_bytes:
+                raise UploadLimitExceeded(
+                    f"File too large: exceeds the {PatternConfig.MAX_FILE_SIZE_MB} MB limit (aborted after {len(buffer):,} bytes)"
+                )
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        """SHA-256 of the raw file bytes (upload ledger key)"""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    async def hash_upload(file) -> str:
+        """
+        SHA-256 of an upload, read in fixed-size pieces (nothing is buffered);
+        the upload is rewound afterwards so it can be read again
+        Raises: UploadLimitExceeded
+        """
+        max_bytes = FileParser.max_file_bytes()
+        digest = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = await file.read(PatternConfig.STREAM_READ_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadLimitExceeded(
+                    f"File too large: exceeds the {PatternConfig.MAX_FILE_SIZE_MB} MB limit (aborted after {size:,} bytes)"
+                )
+            digest.update(chunk)
+        await file.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def parse_content(content: bytes, filename: str) -> Tuple[Optional[pd.DataFrame], List[Dict]]:
+        """
+        Parse CSV or Excel bytes and validate expected columns
         Returns: (dataframe, errors_list)
         """
         errors = []
         try:
-            filename = file.filename.lower() if hasattr(file, 'filename') else str(file).lower()
-            
-            # Read file content
-            content = await file.read()
+            filename = filename.lower()
             
-            if filename.endswith('.csv'):
-                df = pd.read_csv(io.BytesIO(content))
-            else:  # .xlsx, .xls
-                df = pd.read_excel(io.BytesIO(content), sheet_name=0)  # Read first sheet
+            if filename.endswith('.csv') and FileParser.use_arrow():
+                match = FileParser.detect_csv_profile(content[:BankProfileRegistry.DETECT_BYTES])
+                table = pa_csv.read_csv(
+                    io.BytesIO(content),
+                    read_options=pa_csv.ReadOptions(use_threads=True, skip_rows=match.header_row),
+                    convert_options=FileParser.arrow_convert_options(match)
+                )
+                df = FileParser.to_pipeline_columns(table.to_pandas(types_mapper=pd.ArrowDtype), match)
+            elif filename.endswith('.csv'):
+                match = FileParser.detect_csv_profile(content[:BankProfileRegistry.DETECT_BYTES])
+                df = FileParser.to_pipeline_columns(
+                    pd.read_csv(io.BytesIO(content), **FileParser.pandas_csv_options(match)), match
+                )
+            elif filename.endswith('.xlsx'):
+                chunks = list(FileParser.iter_xlsx_chunks(io.BytesIO(content)))
+                df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+                df.attrs = chunks[0].attrs
+            else:  # .xls
+                raw = pd.read_excel(io.BytesIO(content), sheet_name=0, header=None)  # Read first sheet
+                match = FileParser.find_header_row(raw.itertuples(index=False, name=None))
+                body = raw.iloc[match.header_row + 1:].set_axis(match.header, axis=1)
+                df = FileParser.to_pipeline_columns(body.reset_index(drop=True), match)
             
             # Validate expected columns exist
             missing_cols = [col for col in PatternConfig.EXPECTED_COLUMNS if col not in df.columns]
@@ -87,6 +252,354 @@ class FileParser:
             logger.error(error_msg)
             errors.append({"error": error_msg})
             return None, errors
+    
+    @staticmethod
+    async def parse_file(file) -> Tuple[Optional[pd.DataFrame], List[Dict]]:
+        """
+        Parse CSV or Excel file and validate expected columns
+        Returns: (dataframe, errors_list)
+        """
+        filename = file.filename if hasattr(file, 'filename') else str(file)
+        try:
+            # Read file content
+            content = await file.read()
+        except Exception as e:
+            error_msg = f"Failed to parse file: {str(e)}"
+            logger.error(error_msg)
+            return None, [{"error": error_msg}]
+        
+        return FileParser.parse_content(content, filename)
+    
+    @staticmethod
+    def is_streamable(filename: str) -> bool:
+        """CSV uploads are parsed while bytes arrive; .xlsx is a zip and needs the whole file first"""
+        return PatternConfig.STREAMING_INGESTION and filename.lower().endswith('.csv')
+    
+    @staticmethod
+    def is_chunked(filename: str) -> bool:
+        """File types that go through the pipeline in row chunks (CSV and .xlsx)"""
+        return PatternConfig.STREAMING_INGESTION and filename.lower().endswith(('.csv', '.xlsx'))
+    
+    @staticmethod
+    def iter_chunks(source: BinaryIO, filename: str, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Row chunks of a CSV or .xlsx source (see is_chunked)"""
+        if filename.lower().endswith('.xlsx'):
+            return FileParser.iter_xlsx_chunks(source, chunk_rows)
+        return FileParser.iter_csv_chunks(source, chunk_rows)
+    
+    # ==================== BATCH UPLOADS ====================
+    @staticmethod
+    def is_archive(filename: Optional[str]) -> bool:
+        return bool(filename) and filename.lower().endswith('.zip')
+    
+    @staticmethod
+    def batch_size_error(total_bytes: int) -> Optional[str]:
+        if total_bytes > PatternConfig.MAX_BATCH_SIZE_MB * 1024 * 1024:
+            return f"Batch too large: exceeds the {PatternConfig.MAX_BATCH_SIZE_MB} MB limit for all files combined"
+        return None
+    
+    @staticmethod
+    def batch_limits() -> Dict:
+        return {
+            **FileParser.limits(),
+            "max_batch_files": PatternConfig.MAX_BATCH_FILES,
+            "max_batch_size_mb": PatternConfig.MAX_BATCH_SIZE_MB,
+        }
+    
+    @staticmethod
+    def expand_archives(files: List[Tuple[str, bytes]]) -> Tuple[List[Tuple[str, bytes]], List[Dict]]:
+        """
+        Replace .zip uploads by the statements inside them ("archive.zip/inner.csv")
+        
+        Directories and hidden/macOS metadata entries are ignored. Members are
+        checked against the per-file and batch limits from their declared size
+        before they are decompressed, and read with a hard cap in case that
+        size is wrong.
+        
+        Returns: (statement files, per-file errors for rejected entries)
+        Raises: UploadLimitExceeded when the batch as a whole is over a limit
+        """
+        max_bytes = FileParser.max_file_bytes()
+        expanded: List[Tuple[str, bytes]] = []
+        rejected: List[Dict] = []
+        total_bytes = 0
+        
+        def add(filename: str, content: bytes):
+            nonlocal total_bytes
+            total_bytes += len(content)
+            size_error = FileParser.batch_size_error(total_bytes)
+            if size_error:
+                raise UploadLimitExceeded(size_error)
+            expanded.append((filename, content))
+            if len(expanded) > PatternConfig.MAX_BATCH_FILES:
+                raise UploadLimitExceeded(f"Batch has more than {PatternConfig.MAX_BATCH_FILES} statement files")
+        
+        for filename, content in files:
+            if not FileParser.is_archive(filename):
+                add(filename, content)
+                continue
+            
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(content))
+            except zipfile.BadZipFile as e:
+                rejected.append({"filename": filename, "status": "error", "detail": f"Invalid ZIP archive: {str(e)}"})
+                continue
+            
+            with archive:
+                for member in archive.infolist():
+                    name = member.filename
+                    basename = name.rsplit('/', 1)[-1]
+                    if member.is_dir() or name.startswith('__MACOSX/') or basename.startswith('.'):
+                        continue
+                    
+                    member_name = f"{filename}/{name}"
+                    is_valid, error_msg = FileParser.validate_filename(basename)
+                    if is_valid:
+                        error_msg = FileParser.size_error(member.file_size)
+                    if error_msg:
+                        rejected.append({"filename": member_name, "status": "error", "detail": error_msg})
+                        continue
+                    
+                    size_error = FileParser.batch_size_error(total_bytes + member.file_size)
+                    if size_error:
+                        raise UploadLimitExceeded(size_error)
+                    with archive.open(member) as stream:
+                        data = stream.read(max_bytes + 1)
+                    if len(data) > max_bytes:
+                        rejected.append({"filename": member_name, "status": "error", "detail": FileParser.size_error(len(data))})
+                        continue
+                    add(member_name, data)
+        
+        return expanded, rejected
+    
+    # ==================== FORMAT DETECTION ====================
+    @staticmethod
+    def find_header_row(rows: Iterator[Sequence]) -> ProfileMatch:
+        """
+        Consume rows up to and including the header of a known bank format (see BankProfileRegistry)
+        Returns: ProfileMatch
+        Raises: ValueError if no known header within HEADER_SCAN_ROWS rows
+        """
+        scanned: List[Sequence] = []
+        
+        def remember(rows):
+            for row in rows:
+                scanned.append(row)
+                yield row
+        
+        match = BankProfileRegistry.detect(remember(rows), PatternConfig.HEADER_SCAN_ROWS)
+        if match:
+            return match
+        
+        # Report against the standard layout, using the row closest to it
+        best = max(scanned, key=lambda row: sum(col in row for col in PatternConfig.EXPECTED_COLUMNS), default=[])
+        missing_cols = [col for col in PatternConfig.EXPECTED_COLUMNS if col not in best]
+        raise ValueError(
+            f"Missing required columns: {missing_cols}. Expected: {PatternConfig.EXPECTED_COLUMNS} "
+            f"or a supported bank export ({', '.join(BankProfileRegistry.PROFILES)})"
+        )
+    
+    @staticmethod
+    def detect_csv_profile(head: bytes) -> ProfileMatch:
+        """Detect the bank format from the first bytes of a CSV"""
+        lines = head.decode("utf-8-sig", errors="replace").splitlines()
+        if len(head) >= BankProfileRegistry.DETECT_BYTES and len(lines) > 1:
+            lines = lines[:-1]  # may be cut mid-line
+        return FileParser.find_header_row(next(csv.reader([line]), []) for line in lines)
+    
+    @staticmethod
+    def to_pipeline_columns(df: pd.DataFrame, match: ProfileMatch) -> pd.DataFrame:
+        """
+        Rename a parsed statement to the PatternConfig columns; single-amount layouts
+        are split into withdrawal (money out) and deposit (money in)
+        """
+        df = df[match.source_columns].rename(columns=match.columns)
+        profile = match.profile
+        if profile.amount_style != "split":
+            amount = DataNormalizer.normalize_amount_columns(df, [AMOUNT])[AMOUNT]
+            if profile.amount_style == "indicator":
+                debit = df[DIRECTION].astype(str).str.strip().str.upper().isin(profile.debit_markers).to_numpy()
+                amount = amount.abs().where(~debit, -amount.abs())
+            df = df.assign(**{
+                PatternConfig.AMOUNT_COLUMNS[0]: (-amount).where(amount < 0),
+                PatternConfig.AMOUNT_COLUMNS[1]: amount.where(amount > 0),
+            })
+        df = df[PatternConfig.EXPECTED_COLUMNS]
+        df.attrs["bank_profile"] = profile.name
+        return df
+    
+    # ==================== ARROW CSV ENGINE ====================
+    @staticmethod
+    def use_arrow() -> bool:
+        return PYARROW_AVAILABLE and PatternConfig.CSV_ENGINE == "pyarrow"
+    
+    @staticmethod
+    def arrow_convert_options(match: ProfileMatch) -> "pa_csv.ConvertOptions":
+        """
+        Read only the mapped columns, all typed as strings: dates come in many formats
+        and amounts may carry thousands separators, so DataNormalizer parses both.
+        Empty cells become nulls (same as pandas NaN).
+        """
+        return pa_csv.ConvertOptions(
+            column_types={col: pa.string() for col in match.source_columns},
+            include_columns=match.source_columns,
+            strings_can_be_null=True,
+        )
+    
+    @staticmethod
+    def _iter_arrow_csv_chunks(source: BinaryIO, match: ProfileMatch, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Arrow streaming reader; record batches are regrouped into chunk_rows-row frames"""
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(
+                use_threads=True,
+                block_size=PatternConfig.STREAM_READ_BYTES,
+                skip_rows=match.header_row
+            ),
+            convert_options=FileParser.arrow_convert_options(match)
+        )
+        pending: List = []
+        pending_rows = 0
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows < chunk_rows:
+                continue
+            table = pa.Table.from_batches(pending)
+            while table.num_rows >= chunk_rows:
+                yield table.slice(0, chunk_rows).to_pandas(types_mapper=pd.ArrowDtype)
+                table = table.slice(chunk_rows)
+            pending, pending_rows = table.to_batches(), table.num_rows
+        if pending_rows:
+            yield pa.Table.from_batches(pending).to_pandas(types_mapper=pd.ArrowDtype)
+    
+    # ==================== STREAMING XLSX READER ====================
+    @staticmethod
+    def iter_xlsx_chunks(source: BinaryIO, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Parse the first sheet of an .xlsx workbook into DataFrames of at most chunk_rows rows
+        
+        openpyxl read-only mode streams the sheet XML instead of building the
+        workbook DOM. Preamble rows above the header and blank rows are skipped;
+        only the mapped columns are kept. A sheet with a header but no data
+        rows yields one empty frame (mapped columns and attrs), as for CSV.
+        Raises: ValueError if no known header is found
+        """
+        chunk_rows = chunk_rows or PatternConfig.STREAM_CHUNK_ROWS
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            # Exported files often carry wrong <dimension> metadata, which would truncate iteration
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            
+            match = FileParser.find_header_row(rows)
+            columns = match.source_columns
+            positions = [match.header.index(col) for col in columns]
+            
+            batch: List[tuple] = []
+            yielded = False
+            for row in rows:
+                # Trailing empty cells may be missing from short rows
+                values = tuple(row[i] if i < len(row) else None for i in positions)
+                if all(value is None for value in values):
+                    continue
+                batch.append(values)
+                if len(batch) >= chunk_rows:
+                    yield FileParser.to_pipeline_columns(pd.DataFrame.from_records(batch, columns=columns), match)
+                    yielded = True
+                    batch = []
+            if batch or not yielded:
+                yield FileParser.to_pipeline_columns(pd.DataFrame.from_records(batch, columns=columns), match)
+        finally:
+            workbook.close()
+    
+    # ==================== CSV CHUNKS ====================
+    @staticmethod
+    def pandas_csv_options(match: ProfileMatch) -> Dict:
+        """pd.read_csv arguments for a detected format (C engine)"""
+        narration = next(col for col, role in match.columns.items() if role == PatternConfig.NARRATION_COLUMN)
+        return {
+            "skiprows": match.header_row,
+            "usecols": match.source_columns,
+            # Keep narrations textual even when a chunk happens to hold only digits
+            "dtype": {narration: str},
+        }
+    
+    @staticmethod
+    def iter_csv_chunks(source: BinaryIO, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Parse a CSV stream into DataFrames of at most chunk_rows rows
+        The bank format is detected from the first bytes, before any rows are parsed.
+        Raises: ValueError if no known header is found
+        """
+        chunk_rows = chunk_rows or PatternConfig.STREAM_CHUNK_ROWS
+        buffered = io.BufferedReader(source, buffer_size=PatternConfig.STREAM_READ_BYTES)
+        try:
+            match = FileParser.detect_csv_profile(buffered.peek(BankProfileRegistry.DETECT_BYTES))
+            
+            if FileParser.use_arrow():
+                chunks = FileParser._iter_arrow_csv_chunks(buffered, match, chunk_rows)
+            else:
+                chunks = pd.read_csv(buffered, chunksize=chunk_rows, **FileParser.pandas_csv_options(match))
+            for chunk in chunks:
+                yield FileParser.to_pipeline_columns(chunk, match)
+        finally:
+            # The caller owns source; closing the wrapper would close it too
+            buffered.detach()
+
+
+class UploadStreamReader(io.RawIOBase):
+    """Blocking file-like view over byte chunks fed from the event loop
+    
+    The async side feeds chunks read from the UploadFile; a worker thread reads
+    them through pandas. The bounded queue applies backpressure, so at most
+    `max_chunks` reads are buffered. An empty chunk marks end of file.
+    """
+    
+    def __init__(self, max_chunks: int = 4):
+        super().__init__()
+        self._queue: "queue.Queue" = queue.Queue(max_chunks)
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._abandoned = False
+        self.bytes_read = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def feed(self, chunk) -> bool:
+        """
+        Blocking put; returns False once the consumer has stopped reading.
+        An exception instance is raised to the reader instead of data.
+        """
+        while not self._abandoned:
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def abandon(self):
+        """Called by the consumer when it stops reading, to release a blocked feeder"""
+        self._abandoned = True
+    
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._eof:
+            chunk = self._queue.get()
+            if isinstance(chunk, BaseException):
+                self._eof = True
+                raise chunk
+            if chunk:
+                self._buffer = memoryview(chunk)
+            else:
+                self._eof = True
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self.bytes_read += n
+        return n
 
 
 # ==================== DATA NORMALIZER ====================
@@ -94,64 +607,191 @@ class DataNormalizer:
     """Normalize and clean transaction data - hygiene only, no logic"""
     
     @staticmethod
-    def normalize_amount_columns(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    def normalize_amount_columns(df: pd.DataFrame, cols: List[str], inplace: bool = False) -> pd.DataFrame:
         """
         Normalize amount columns: remove commas, convert to numeric
         Handles currency symbols and whitespace
+        inplace: replace the columns on df itself instead of a copy
         """
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
         for col in cols:
             if col not in df.columns:
                 continue
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace(",", "", regex=False)
-                .str.strip()
-                .replace("", pd.NA)
-            )
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+            values = df[col]
+            if isinstance(values.dtype, pd.ArrowDtype) and pa.types.is_string(values.dtype.pyarrow_dtype):
+                # Fast path: plain numbers cast in one Arrow kernel; separators/stray text fall through
+                try:
+                    casted = pc.cast(pa.array(values), pa.float64())
+                    df[col] = pd.Series(casted.to_numpy(zero_copy_only=False), index=df.index)
+                    continue
+                except pa.ArrowInvalid:
+                    pass
+            if not pd.api.types.is_numeric_dtype(values):
+                # Arrow strings stay Arrow through the str accessor, no Python str round-trip
+                if not isinstance(values.dtype, pd.ArrowDtype):
+                    values = values.astype(str)
+                values = (
+                    values
+                    .str.replace(",", "", regex=False)
+                    .str.strip()
+                    .replace("", pd.NA)
+                )
+            df[col] = pd.to_numeric(values, errors="coerce").astype("float64")
         return df
     
+    # Bank profile name -> date format that last fit that bank's statements
+    _date_format_cache: Dict[Optional[str], str] = {}
+    
+    @staticmethod
+    def infer_date_format(values: pd.Series, profile: Optional[BankProfile] = None) -> Optional[str]:
+        """
+        Pick one strptime format for a column of date strings from a sample of its values.
+        The format cached for the profile is tried first, then the profile's formats,
+        then PatternConfig.DATE_FORMATS.
+        Returns: format, or None if none parses DATE_FORMAT_MIN_MATCH of the sample
+        """
+        values = values.dropna()
+        if values.empty:
+            return None
+        positions = np.linspace(0, len(values) - 1, min(len(values), PatternConfig.DATE_SAMPLE_SIZE)).astype(int)
+        sample = values.iloc[positions].drop_duplicates()
+        
+        cache_key = profile.name if profile else None
+        cached = DataNormalizer._date_format_cache.get(cache_key)
+        candidates = dict.fromkeys(
+            ([cached] if cached else []) + (profile.date_formats if profile else []) + PatternConfig.DATE_FORMATS
+        )
+        
+        best, best_parsed = None, 0
+        for fmt in candidates:
+            parsed = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+            if parsed > best_parsed:
+                best, best_parsed = fmt, parsed
+            if parsed == len(sample):
+                break
+        if best is None or best_parsed < PatternConfig.DATE_FORMAT_MIN_MATCH * len(sample):
+            return None
+        DataNormalizer._date_format_cache[cache_key] = best
+        return best
+    
+    @staticmethod
+    def _to_datetime_cached(values: pd.Series, **kwargs) -> pd.Series:
+        """
+        pd.to_datetime over the distinct values only, mapped back to every row.
+        A statement repeats the same few hundred dates, and pandas' own cache=True
+        heuristic skips caching when the first values are all distinct (sorted statements).
+        """
+        codes, uniques = pd.factorize(values)
+        parsed = pd.to_datetime(pd.Series(uniques), errors="coerce", cache=False, **kwargs).to_numpy()
+        # Missing values have code -1, which picks the trailing NaT
+        parsed = np.append(parsed, np.datetime64("NaT").astype(parsed.dtype))
+        return pd.Series(parsed[codes], index=values.index)
+    
     @staticmethod
-    def normalize_date_column(df: pd.DataFrame, date_col: str) -> pd.DataFrame:
+    def _parse_dates_elementwise(values: pd.Series, dayfirst: bool) -> pd.Series:
+        """Slow path: ISO dates first (dayfirst would swap their month and day), then per-value guessing"""
+        parsed = DataNormalizer._to_datetime_cached(values, format="ISO8601")
+        rest = parsed.isna() & values.notna()
+        if rest.any():
+            parsed[rest] = DataNormalizer._to_datetime_cached(values[rest], format="mixed", dayfirst=dayfirst)
+        return parsed
+    
+    @staticmethod
+    def normalize_date_column(
+        df: pd.DataFrame,
+        date_col: str,
+        profile: Optional[BankProfile] = None,
+        inplace: bool = False
+    ) -> pd.DataFrame:
         """
         Parse date column to uniform datetime format
+        
+        The format is inferred once from a sample (see infer_date_format) and the
+        whole column is parsed with it; without a fitting format, dates are parsed
+        element-wise (day first unless the profile says otherwise).
+        Non-empty values that fail to parse are reported in
+        df.attrs["unparseable_dates"] ({"count", "examples"}); the format used is in
+        df.attrs["date_format"].
+        inplace: replace the column on df itself instead of a copy
         """
-        df = df.copy()
-        if date_col in df.columns:
-            df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+        if not inplace:
+            df = df.copy()
+        if date_col not in df.columns:
+            return df
+        
+        values = df[date_col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            df.attrs["date_format"] = None
+            df.attrs["unparseable_dates"] = {"count": 0, "examples": []}
+            return df
+        if not pd.api.types.is_numeric_dtype(values):
+            text = values if isinstance(values.dtype, pd.ArrowDtype) else values.where(values.isna(), values.astype(str))
+            values = text.str.strip().replace("", pd.NA)
+        
+        fmt = DataNormalizer.infer_date_format(values, profile)
+        dayfirst = profile.dayfirst if profile else True
+        if fmt:
+            parsed = DataNormalizer._to_datetime_cached(values, format=fmt)
+            # The few values in another layout (e.g. 4-digit years) are parsed element-wise
+            stragglers = parsed.isna() & values.notna()
+            if stragglers.any():
+                parsed[stragglers] = DataNormalizer._parse_dates_elementwise(values[stragglers], dayfirst)
+        else:
+            logger.warning(f"No single date format fits column '{date_col}', parsing element-wise (dayfirst={dayfirst})")
+            parsed = DataNormalizer._parse_dates_elementwise(values, dayfirst)
+        
+        unparseable = parsed.isna() & values.notna()
+        count = int(unparseable.sum())
+        if count:
+            examples = values[unparseable].astype(str).drop_duplicates().head(5).tolist()
+            logger.warning(f"{count} rows have unparseable dates (format {fmt}), e.g. {examples}")
+        else:
+            examples = []
+        
+        df[date_col] = parsed
+        df.attrs["date_format"] = fmt
+        df.attrs["unparseable_dates"] = {"count": count, "examples": examples}
         return df
     
     @staticmethod
-    def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    def clean_dataframe(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         Apply all hygiene normalizations to incoming CSV/Excel data
         - Normalize amount columns
         - Parse dates
         - Remove rows with critical missing values
+        inplace: normalize df's own columns (caller owns the frame); rows are
+        still only dropped in the returned frame
         Returns: cleaned dataframe
         """
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
         
         # Normalize amounts
         df = DataNormalizer.normalize_amount_columns(
             df, 
-            cols=PatternConfig.AMOUNT_COLUMNS
+            cols=PatternConfig.AMOUNT_COLUMNS,
+            inplace=True
         )
         
         # Parse dates
         df = DataNormalizer.normalize_date_column(
             df,
-            date_col=PatternConfig.DATE_COLUMN
+            date_col=PatternConfig.DATE_COLUMN,
+            profile=BankProfileRegistry.get(df.attrs.get("bank_profile")),
+            inplace=True
         )
         
-        # Remove rows with missing critical columns
+        # Remove rows with missing critical columns (no copy when nothing is dropped;
+        # otherwise an explicit copy, so later stages add columns to a frame, not a slice)
         critical_cols = [
             PatternConfig.DATE_COLUMN,
             PatternConfig.NARRATION_COLUMN
         ]
-        df = df.dropna(subset=critical_cols, how='any')
+        complete = df[critical_cols].notna().all(axis=1)
+        if not complete.all():
+            df = df[complete].copy()
         
         logger.info(f"Data cleaning complete: {len(df)} rows remaining")
         return df
@@ -160,7 +800,26 @@ class DataNormalizer:
 # ==================== ENRICHMENT KEYWORDS & RULES ====================
 class EnrichmentConfig:
     """Keyword mappings for transaction enrichment"""
-    
+
+    # Level-1 payment rail rules (priority order matters: first match wins)
+    LEVEL_1_RULES = [
+        ("SALARY", r"\b(?:salary|payroll|wages|ctc|employer)\b"),  # override everything
+        ("INTEREST_DIVIDEND", r"\b(?:interest|dividend|fd int|rd int|tds)\b"),
+        ("REVERSAL_REFUND", r"\b(?:refund|reversal|reversed|chargeback|failed|return)\b"),
+        ("INTERNAL_TRANSFER", r"\b(?:self|own|internal|to self)\b"),
+        ("UPI", r"\b(?:upi|@ybl|@ok|@axis|@hdfc|@sbi|@icici|paytm|phonepe|gpay|googlepay|amazonpay|bhim)\b"),
+        ("ACH", r"\b(?:ach|nach|ecs|mandate|auto debit|si)\b"),
+        ("IMPS", r"\b(?:imps|mmt|mobile transfer)\b"),
+        ("NEFT", r"\b(?:neft|n-e-f-t|neft cr|neft dr)\b"),
+        ("RTGS", r"\b(?:rtgs|r-t-g-s)\b"),
+        ("CARD", r"\b(?:pos|card|debit card|credit card|visa|mastercard|rupay|amex|ecom|online)\b"),
+        ("CASH", r"\b(?:cash|atm|atm wdl|cash wdl|cash dep|withdrawal)\b"),
+    ]
+
+    # Level-2 role matrix: level-1 rails that count as income (CREDIT) / expense (DEBIT)
+    INCOME_LEVEL_1_TAGS = {"SALARY", "INTEREST_DIVIDEND", "NEFT", "RTGS", "ACH"}
+    EXPENSE_LEVEL_1_TAGS = {"UPI", "CARD", "CASH", "IMPS", "NEFT", "RTGS", "ACH"}
+
     LEVEL_3_KEYWORDS = {
         "OTT": ["netflix", "hotstar", "zee5", "sony liv", "spotify", "apple music", "prime video"],
         "FOOD": ["swiggy", "zomato", "uber eats", "dominos", "pizza hut", "kfc", "mcdonald", "restaurant", "cafe", "burger king", "food delivery"],
@@ -171,11 +830,56 @@ class EnrichmentConfig:
         "UTILITIES": ["electricity", "water bill", "gas bill", "broadband", "wifi"],
     }
     
+    # Process-wide LRU of normalized narration -> merchant_hint (shared across uploads)
+    MERCHANT_HINT_CACHE_SIZE = 50_000
+
     NOISE_PATTERNS = [
         "upi", "imps", "neft", "rtgs", "hdfc", "sbi", "icici", "axis", "yesb",
         "bank", "sbipmopad", "yesb0yblupi", "paytm", "phonepe", "gpay", "googlepay", "vyapar", "merchant", "collect",
     ]
 
+    # Compiled forms of the lists above (built at import, rebuilt by reload())
+    level_1_patterns: List[Tuple[str, "re.Pattern"]] = []
+    level_3_matcher: Optional[CategoryMatcher] = None
+    noise_matcher: Optional[KeywordAutomaton] = None
+
+    @classmethod
+    def compile(cls):
+        """Compile level-1 regexes and build keyword automata from the current lists"""
+        cls.level_1_patterns = [(tag, re.compile(pattern)) for tag, pattern in cls.LEVEL_1_RULES]
+        cls.level_3_matcher = CategoryMatcher(cls.LEVEL_3_KEYWORDS)
+        cls.noise_matcher = KeywordAutomaton((pattern, 0) for pattern in cls.NOISE_PATTERNS)
+        logger.info(
+            f"Enrichment rules compiled: {len(cls.level_1_patterns)} level-1 rules, "
+            f"{cls.level_3_matcher.keyword_count} level-3 keywords, {cls.noise_matcher.keyword_count} noise patterns"
+        )
+
+    @classmethod
+    def reload(
+        cls,
+        level_1_rules: Optional[List[Tuple[str, str]]] = None,
+        level_3_keywords: Optional[Dict[str, List[str]]] = None,
+        noise_patterns: Optional[List[str]] = None,
+    ):
+        """
+        Replace rule/keyword lists and rebuild compiled matchers.
+        Mutating the lists in place without calling this leaves stale matchers.
+        """
+        if level_1_rules is not None:
+            cls.LEVEL_1_RULES = level_1_rules
+        if level_3_keywords is not None:
+            cls.LEVEL_3_KEYWORDS = level_3_keywords
+        if noise_patterns is not None:
+            cls.NOISE_PATTERNS = noise_patterns
+        cls.compile()
+        # Cached merchant hints were computed against the old noise patterns
+        TransactionEnricher.clear_merchant_hint_cache()
+        # Enrichment worker processes start from import-time defaults; replay this reload there
+        PipelineExecutors.set_cpu_initializer(cls.reload, cls.LEVEL_1_RULES, cls.LEVEL_3_KEYWORDS, cls.NOISE_PATTERNS)
+
+
+EnrichmentConfig.compile()
+
 
 # ==================== TRANSACTION ENRICHER ====================
 class TransactionEnricher:
@@ -197,70 +901,143 @@ class TransactionEnricher:
             return "UNKNOWN"
     
     @staticmethod
-    def add_money_flow(df: pd.DataFrame) -> pd.DataFrame:
+    def classify_level_1(narration) -> str:
+        """
+        Level-1 tag (payment rail) for a single narration.
+        Row-at-a-time reference for add_level_1_tag.
+        """
+        n = "" if pd.isna(narration) else str(narration).lower().strip()
+        for tag, pattern in EnrichmentConfig.level_1_patterns:
+            if pattern.search(n):
+                return tag
+        return "UNKNOWN"
+    
+    @staticmethod
+    def classify_level_2(level_1: str, withdrawal, deposit) -> str:
+        """
+        Level-2 tag (transaction role) for a single row.
+        Row-at-a-time reference for add_level_2_tag.
+        """
+        if pd.notna(withdrawal) and withdrawal > 0 and pd.isna(deposit):
+            direction = "DEBIT"
+        elif pd.notna(deposit) and deposit > 0 and pd.isna(withdrawal):
+            direction = "CREDIT"
+        else:
+            direction = "UNKNOWN"
+
+        # 1. Adjustments
+        if level_1 == "REVERSAL_REFUND":
+            return "ADJUSTMENT"
+        # 2. Transfers
+        if level_1 == "INTERNAL_TRANSFER":
+            return "TRANSFER"
+        # 3. Income
+        if direction == "CREDIT" and level_1 in EnrichmentConfig.INCOME_LEVEL_1_TAGS:
+            return "INCOME"
+        # 4. Expense
+        if direction == "DEBIT" and level_1 in EnrichmentConfig.EXPENSE_LEVEL_1_TAGS:
+            return "EXPENSE"
+        # 5. Fallback
+        return "UNKNOWN"
+    
+    @staticmethod
+    def classify_level_3(narration, level_2: str = "EXPENSE") -> str:
+        """
+        Level-3 tag (coarse category) for a single narration.
+        Row-at-a-time reference for add_level_3_tag.
+        """
+        # Level-3 applies only to expenses
+        if level_2 != "EXPENSE":
+            return "UNKNOWN"
+
+        n = "" if pd.isna(narration) else str(narration).lower()
+
+        # Priority order matters: earlier categories in LEVEL_3_KEYWORDS win
+        return EnrichmentConfig.level_3_matcher.match(n)
+    
+    @staticmethod
+    def _tag_unique_narrations(
+        narrations: pd.Series,
+        tag_uniques,
+        strip: bool = True,
+        mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Tag a narration column by tagging each distinct narration once.
+        
+        `tag_uniques` receives a Series of normalized (lowercased) unique
+        narrations and returns one tag per entry. Missing narrations map to UNKNOWN.
+        mask: only these rows are tagged, the rest are UNKNOWN (avoids
+        materializing the selected narrations)
+        Returns: object array of tags aligned with `narrations`
+        """
+        codes, uniques = pd.factorize(narrations)
+        if mask is not None:
+            codes = np.where(mask, codes, -1)
+            wanted = np.unique(codes[codes >= 0])
+        else:
+            wanted = np.arange(len(uniques))
+        normalized = pd.Series(uniques.take(wanted), dtype=object).astype(str).str.lower()
+        if strip:
+            normalized = normalized.str.strip()
+
+        # Sentinel at the end so code -1 (NaN / masked out) maps to UNKNOWN
+        unique_tags = np.full(len(uniques) + 1, "UNKNOWN", dtype=object)
+        if len(normalized):
+            unique_tags[wanted] = np.asarray(tag_uniques(normalized), dtype=object)
+        return unique_tags[codes]
+    
+    @staticmethod
+    def _select_labels(conditions: List[np.ndarray], labels: List[str], default: str) -> np.ndarray:
+        """
+        np.select over string labels without a fixed-width string intermediate:
+        selects small int codes, then maps them to one shared object per label
+        Returns: object array
+        """
+        label_objects = np.array(list(labels) + [default], dtype=object)
+        codes = np.select(conditions, np.arange(len(labels), dtype=np.int8), default=np.int8(len(labels)))
+        return label_objects[codes]
+    
+    @staticmethod
+    def _amount_column(df: pd.DataFrame, col: str) -> pd.Series:
+        """Numeric view of an amount column (all-NaN if the column is absent)"""
+        if col not in df.columns:
+            return pd.Series(np.nan, index=df.index)
+        return pd.to_numeric(df[col], errors="coerce")
+    
+    @staticmethod
+    def add_money_flow(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """Add money_flow column to dataframe"""
-        df = df.copy()
-        df["money_flow"] = df.apply(
-            lambda r: TransactionEnricher.get_money_flow(
-                r.get(PatternConfig.AMOUNT_COLUMNS[0]),
-                r.get(PatternConfig.AMOUNT_COLUMNS[1])
-            ),
-            axis=1
+        if not inplace:
+            df = df.copy()
+        withdrawal = TransactionEnricher._amount_column(df, PatternConfig.AMOUNT_COLUMNS[0])
+        deposit = TransactionEnricher._amount_column(df, PatternConfig.AMOUNT_COLUMNS[1])
+        df["money_flow"] = TransactionEnricher._select_labels(
+            [(withdrawal > 0).to_numpy(), (deposit > 0).to_numpy()],
+            ["OUTFLOW", "INFLOW"],
+            default="UNKNOWN",
         )
         return df
     
     @staticmethod
-    def add_level_1_tag(df: pd.DataFrame, narration_col: str = "Narration") -> pd.DataFrame:
+    def add_level_1_tag(df: pd.DataFrame, narration_col: str = "Narration", inplace: bool = False) -> pd.DataFrame:
         """
         Adds Level-1 transaction tag based on payment rail / channel.
         Deterministic, rule-based, India-focused.
+        Rules: EnrichmentConfig.LEVEL_1_RULES (first match wins).
         """
-        def normalize(text: str) -> str:
-            if pd.isna(text):
-                return ""
-            return str(text).lower().strip()
-
-        def tag_narration(narration: str) -> str:
-            n = normalize(narration)
-
-            # 1. Salary (override everything)
-            if re.search(r"\b(salary|payroll|wages|ctc|employer)\b", n):
-                return "SALARY"
-            # 2. Interest / Dividend
-            if re.search(r"\b(interest|dividend|fd int|rd int|tds)\b", n):
-                return "INTEREST_DIVIDEND"
-            # 3. Refund / Reversal
-            if re.search(r"\b(refund|reversal|reversed|chargeback|failed|return)\b", n):
-                return "REVERSAL_REFUND"
-            # 4. Internal / Self transfer
-            if re.search(r"\b(self|own|internal|to self)\b", n):
-                return "INTERNAL_TRANSFER"
-            # 5. UPI
-            if re.search(r"\b(upi|@ybl|@ok|@axis|@hdfc|@sbi|@icici|paytm|phonepe|gpay|googlepay|amazonpay|bhim)\b", n):
-                return "UPI"
-            # 6. ACH / NACH / ECS
-            if re.search(r"\b(ach|nach|ecs|mandate|auto debit|si)\b", n):
-                return "ACH"
-            # 7. IMPS
-            if re.search(r"\b(imps|mmt|mobile transfer)\b", n):
-                return "IMPS"
-            # 8. NEFT
-            if re.search(r"\b(neft|n-e-f-t|neft cr|neft dr)\b", n):
-                return "NEFT"
-            # 9. RTGS
-            if re.search(r"\b(rtgs|r-t-g-s)\b", n):
-                return "RTGS"
-            # 10. Card
-            if re.search(r"\b(pos|card|debit card|credit card|visa|mastercard|rupay|amex|ecom|online)\b", n):
-                return "CARD"
-            # 11. Cash / ATM
-            if re.search(r"\b(cash|atm|atm wdl|cash wdl|cash dep|withdrawal)\b", n):
-                return "CASH"
-            # 12. Fallback
-            return "UNKNOWN"
+        rules = EnrichmentConfig.level_1_patterns
+
+        def tag_narrations(normalized: pd.Series) -> np.ndarray:
+            if not rules:
+                return np.full(len(normalized), "UNKNOWN")
+            # One boolean mask per rule; np.select picks the first matching rule
+            masks = [normalized.str.contains(pattern).to_numpy(dtype=bool) for _, pattern in rules]
+            return np.select(masks, [tag for tag, _ in rules], default="UNKNOWN")
 
-        df = df.copy()
-        df["level_1_tag"] = df[narration_col].apply(tag_narration)
+        if not inplace:
+            df = df.copy()
+        df["level_1_tag"] = TransactionEnricher._tag_unique_narrations(df[narration_col], tag_narrations)
         return df
     
     @staticmethod
@@ -269,42 +1046,32 @@ class TransactionEnricher:
         level_1_col: str = "level_1_tag",
         withdrawal_col: str = "Withdrawal Amt.",
         deposit_col: str = "Deposit Amt.",
+        inplace: bool = False,
     ) -> pd.DataFrame:
         """
         Adds Level-2 transaction classification:
         INCOME / EXPENSE / TRANSFER / ADJUSTMENT / UNKNOWN
         """
-        def get_direction(row):
-            withdrawal = row.get(withdrawal_col)
-            deposit = row.get(deposit_col)
-
-            if pd.notna(withdrawal) and withdrawal > 0 and pd.isna(deposit):
-                return "DEBIT"
-            if pd.notna(deposit) and deposit > 0 and pd.isna(withdrawal):
-                return "CREDIT"
-            return "UNKNOWN"
+        if not inplace:
+            df = df.copy()
+        level_1 = df[level_1_col]
+        withdrawal = TransactionEnricher._amount_column(df, withdrawal_col)
+        deposit = TransactionEnricher._amount_column(df, deposit_col)
 
-        def classify(row):
-            level_1 = row[level_1_col]
-            direction = get_direction(row)
-
-            # 1. Adjustments
-            if level_1 == "REVERSAL_REFUND":
-                return "ADJUSTMENT"
-            # 2. Transfers
-            if level_1 == "INTERNAL_TRANSFER":
-                return "TRANSFER"
-            # 3. Income
-            if direction == "CREDIT" and level_1 in {"SALARY", "INTEREST_DIVIDEND", "NEFT", "RTGS", "ACH"}:
-                return "INCOME"
-            # 4. Expense
-            if direction == "DEBIT" and level_1 in {"UPI", "CARD", "CASH", "IMPS", "NEFT", "RTGS", "ACH"}:
-                return "EXPENSE"
-            # 5. Fallback
-            return "UNKNOWN"
+        is_debit = (withdrawal > 0) & deposit.isna()
+        is_credit = (deposit > 0) & withdrawal.isna()
 
-        df = df.copy()
-        df["level_2_tag"] = df.apply(classify, axis=1)
+        conditions = [
+            (level_1 == "REVERSAL_REFUND").to_numpy(),
+            (level_1 == "INTERNAL_TRANSFER").to_numpy(),
+            (is_credit & level_1.isin(EnrichmentConfig.INCOME_LEVEL_1_TAGS)).to_numpy(),
+            (is_debit & level_1.isin(EnrichmentConfig.EXPENSE_LEVEL_1_TAGS)).to_numpy(),
+        ]
+        df["level_2_tag"] = TransactionEnricher._select_labels(
+            conditions,
+            ["ADJUSTMENT", "TRANSFER", "INCOME", "EXPENSE"],
+            default="UNKNOWN",
+        )
         return df
     
     @staticmethod
@@ -312,34 +1079,29 @@ class TransactionEnricher:
         df: pd.DataFrame,
         narration_col: str = "Narration",
         level_2_col: str = "level_2_tag",
+        inplace: bool = False,
     ) -> pd.DataFrame:
         """
         Adds Level-3 coarse category tagging.
         Applies ONLY to EXPENSE rows.
         Conservative, keyword-based, rule-driven.
         """
-        def normalize(text: str) -> str:
-            if pd.isna(text):
-                return ""
-            return str(text).lower()
-
-        def classify_level_3(row) -> str:
-            # Level-3 applies only to expenses
-            if row[level_2_col] != "EXPENSE":
-                return "UNKNOWN"
+        if not inplace:
+            df = df.copy()
+        tags = np.full(len(df), "UNKNOWN", dtype=object)
+        is_expense = (df[level_2_col] == "EXPENSE").to_numpy()
 
-            narration = normalize(row[narration_col])
-
-            # Priority order matters
-            for category, keywords in EnrichmentConfig.LEVEL_3_KEYWORDS.items():
-                for kw in keywords:
-                    if kw in narration:
-                        return category
-
-            return "UNKNOWN"
+        if is_expense.any():
+            # Single automaton pass per distinct expense narration, categories in priority order
+            matcher = EnrichmentConfig.level_3_matcher
+            tags = TransactionEnricher._tag_unique_narrations(
+                df[narration_col],
+                lambda normalized: [matcher.match(n) for n in normalized],
+                strip=False,
+                mask=is_expense,
+            )
 
-        df = df.copy()
-        df["level_3_tag"] = df.apply(classify_level_3, axis=1)
+        df["level_3_tag"] = tags
         return df
     
     @staticmethod
@@ -354,7 +1116,7 @@ class TransactionEnricher:
         """Check if token is noise and should be filtered"""
         if len(token) < 3:
             return True
-        if any(pat in token for pat in EnrichmentConfig.NOISE_PATTERNS):
+        if EnrichmentConfig.noise_matcher.contains_any(token):
             return True
         if re.search(r"\d{4,}", token):  # long numeric sequences
             return True
@@ -368,7 +1130,15 @@ class TransactionEnricher:
         text = TransactionEnricher.normalize_text(narration)
         if not text:
             return "UNKNOWN"
+        return TransactionEnricher._merchant_hint_from_text(text)
 
+    @staticmethod
+    @lru_cache(maxsize=EnrichmentConfig.MERCHANT_HINT_CACHE_SIZE)
+    def _merchant_hint_from_text(text: str) -> str:
+        """
+        Merchant hint for an already-normalized narration.
+        Memoized: statements repeat the same narration templates many times.
+        """
         # Split by hyphen (candidate generator)
         tokens = [t.strip() for t in text.split("-") if t.strip()]
 
@@ -394,18 +1164,49 @@ class TransactionEnricher:
 
         return candidates[0]
 
+    @staticmethod
+    def merchant_hint_cache_stats() -> Dict:
+        """Hit/miss counters for the process-wide merchant hint cache"""
+        info = TransactionEnricher._merchant_hint_from_text.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
+
+    @staticmethod
+    def clear_merchant_hint_cache():
+        """Drop cached merchant hints (called when EnrichmentConfig is reloaded)"""
+        TransactionEnricher._merchant_hint_from_text.cache_clear()
+
     @staticmethod
     def add_merchant_hint(
         df: pd.DataFrame,
-        narration_col: str = "Narration"
+        narration_col: str = "Narration",
+        inplace: bool = False
     ) -> pd.DataFrame:
-        """Add merchant_hint column"""
-        df = df.copy()
-        df["merchant_hint"] = df[narration_col].apply(TransactionEnricher.extract_merchant_hint)
+        """Add merchant_hint column (each distinct narration is resolved once)"""
+        if not inplace:
+            df = df.copy()
+        codes, uniques = pd.factorize(df[narration_col])
+        hints = np.array(
+            [TransactionEnricher.extract_merchant_hint(n) for n in uniques] + ["UNKNOWN"],
+            dtype=object
+        )
+        df["merchant_hint"] = hints[codes]
+
+        stats = TransactionEnricher.merchant_hint_cache_stats()
+        logger.debug(
+            f"Merchant hints: {len(uniques)} distinct narrations, "
+            f"cache hit rate {stats['hit_rate']:.1%} ({stats['size']}/{stats['max_size']} entries)"
+        )
         return df
     
     @staticmethod
-    def enrich_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    def enrich_transactions(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         Apply all enrichments to transactions.
         Deterministic, rule-based, no filtering.
@@ -416,23 +1217,32 @@ class TransactionEnricher:
         - level_2_tag (transaction role)
         - level_3_tag (soft category)
         - merchant_hint (merchant identity)
+        
+        inplace: add the columns to df itself (caller owns the frame)
         """
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
         
-        # Apply all enrichments in sequence
-        df = TransactionEnricher.add_money_flow(df)
-        df = TransactionEnricher.add_level_1_tag(df, narration_col=PatternConfig.NARRATION_COLUMN)
-        df = TransactionEnricher.add_level_2_tag(df)
-        df = TransactionEnricher.add_level_3_tag(df)
-        df = TransactionEnricher.add_merchant_hint(df, narration_col=PatternConfig.NARRATION_COLUMN)
+        # Apply all enrichments in sequence, on the one frame
+        df = TransactionEnricher.add_money_flow(df, inplace=True)
+        df = TransactionEnricher.add_level_1_tag(df, narration_col=PatternConfig.NARRATION_COLUMN, inplace=True)
+        df = TransactionEnricher.add_level_2_tag(df, inplace=True)
+        df = TransactionEnricher.add_level_3_tag(df, inplace=True)
+        df = TransactionEnricher.add_merchant_hint(df, narration_col=PatternConfig.NARRATION_COLUMN, inplace=True)
         
         logger.info(f"Transaction enrichment complete: {len(df)} rows enriched")
         return df
-        
-        return "Other"
     
     @staticmethod
-    def normalize_and_enrich_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    def enrich_with_cache_stats(df: pd.DataFrame, inplace: bool = False) -> Tuple[pd.DataFrame, Dict]:
+        """
+        enrich_transactions plus the merchant hint cache stats of the process that ran it
+        (entry point for enrichment worker processes)
+        """
+        return TransactionEnricher.enrich_transactions(df, inplace=inplace), TransactionEnricher.merchant_hint_cache_stats()
+    
+    @staticmethod
+    def normalize_and_enrich_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         """
         NEW WORKFLOW: Clean and enrich transactions (no detection)
         
@@ -442,11 +1252,11 @@ class TransactionEnricher:
         
         Returns: fully enriched dataframe
         """
-        # Step 1: Clean (hygiene only)
+        # Step 1: Clean (hygiene only); the cleaned frame is ours, so enrichment can add to it
         df = DataNormalizer.clean_dataframe(df)
         
         # Step 2: Enrich (deterministic, rule-based)
-        df = TransactionEnricher.enrich_transactions(df)
+        df = TransactionEnricher.enrich_transactions(df, inplace=True)
         
         logger.info(f"Normalize & enrich complete: {len(df)} rows processed")
         return df
@@ -462,28 +1272,37 @@ class TransactionEnricher:
         - Withdrawal Amt. → withdrawal_amount
         - Deposit Amt. → deposit_amount
         - money_flow, level_1/2/3_tag, merchant_hint → as-is
-        """
-        records = []
-        for idx, row in df.iterrows():
-            try:
-                record = {
-                    "txn_date": row.get(PatternConfig.DATE_COLUMN),
-                    "narration": row.get(PatternConfig.NARRATION_COLUMN),
-                    "withdrawal_amount": row.get(PatternConfig.AMOUNT_COLUMNS[0]),
-                    "deposit_amount": row.get(PatternConfig.AMOUNT_COLUMNS[1]),
-                    "money_flow": row.get("money_flow", "UNKNOWN"),
-                    "level_1_tag": row.get("level_1_tag", "UNKNOWN"),
-                    "level_2_tag": row.get("level_2_tag", "UNKNOWN"),
-                    "level_3_tag": row.get("level_3_tag", "UNKNOWN"),
-                    "merchant_hint": row.get("merchant_hint", "UNKNOWN"),
-                    "file_upload_id": file_upload_id,
-                }
-                records.append(record)
-            except Exception as e:
-                logger.error(f"Error converting row {idx} to record: {e}")
-                continue
         
-        return records
+        Columnar: each column is converted once; NaN/NaT become None.
+        """
+        # Source column -> (record field, default when the column is absent)
+        field_map = {
+            PatternConfig.DATE_COLUMN: ("txn_date", None),
+            PatternConfig.NARRATION_COLUMN: ("narration", None),
+            PatternConfig.AMOUNT_COLUMNS[0]: ("withdrawal_amount", None),
+            PatternConfig.AMOUNT_COLUMNS[1]: ("deposit_amount", None),
+            "money_flow": ("money_flow", "UNKNOWN"),
+            "level_1_tag": ("level_1_tag", "UNKNOWN"),
+            "level_2_tag": ("level_2_tag", "UNKNOWN"),
+            "level_3_tag": ("level_3_tag", "UNKNOWN"),
+            "merchant_hint": ("merchant_hint", "UNKNOWN"),
+        }
+
+        n_rows = len(df)
+        columns = {}
+        for src, (field, default) in field_map.items():
+            if src in df.columns:
+                # Box each distinct value once; code -1 (NaN/NaT) hits the trailing None
+                codes, uniques = pd.factorize(df[src])
+                boxed = np.append(np.asarray(uniques, dtype=object), None)
+                columns[field] = boxed[codes].tolist()
+            else:
+                columns[field] = [default] * n_rows
+        columns["file_upload_id"] = [file_upload_id] * n_rows
+
+        # Zip column lists into row dicts (no per-row Series boxing as with iterrows)
+        fields = list(columns)
+        return [dict(zip(fields, row)) for row in zip(*columns.values())]
 
 
 # ==================== PATTERN DETECTOR ====================
@@ -500,6 +1319,14 @@ class PatternAggregator:
     - No regularity thresholds
     """
     
+    # Enriched dataframe column -> transaction record field (for aggregate_patterns_df)
+    DF_COLUMN_MAP = {
+        PatternConfig.DATE_COLUMN: "txn_date",
+        PatternConfig.NARRATION_COLUMN: "narration",
+        PatternConfig.AMOUNT_COLUMNS[0]: "withdrawal_amount",
+        PatternConfig.AMOUNT_COLUMNS[1]: "deposit_amount",
+    }
+    
     @staticmethod
     def group_by_merchant(transactions: List[Dict]) -> Dict[str, List[Dict]]:
         """Group transactions by merchant_hint (identity)"""
@@ -684,94 +1511,724 @@ class PatternAggregator:
         return patterns
 
 
+    @staticmethod
+    def _sorted_expense_groups(df: pd.DataFrame) -> Optional[Tuple[pd.DataFrame, np.ndarray, np.ndarray]]:
+        """
+        EXPENSE rows with record column names, stably sorted by (merchant, txn_date).
+        Merchant codes follow first appearance, like the insertion order of group_by_merchant.
+        Returns: (sorted frame, group code per row, merchant name per code) or None if no expenses
+        """
+        df = df.rename(columns=PatternAggregator.DF_COLUMN_MAP)
+        if df.empty or "level_2_tag" not in df.columns:
+            logger.info("No transactions to aggregate")
+            return None
+        
+        expenses = df.loc[df["level_2_tag"] == "EXPENSE"]
+        logger.info(f"Filtered {len(expenses)} EXPENSE transactions from {len(df)} total")
+        if expenses.empty:
+            logger.warning("No EXPENSE transactions found for aggregation")
+            return None
+        
+        if "merchant_hint" not in expenses.columns:
+            expenses = expenses.assign(merchant_hint="UNKNOWN")
+        raw_codes, merchant_names = pd.factorize(expenses["merchant_hint"].fillna("UNKNOWN"))
+        dates = pd.to_datetime(expenses["txn_date"]).to_numpy()
+        order = np.lexsort((np.arange(len(raw_codes)), dates, raw_codes))
+        
+        frame = expenses.iloc[order].reset_index(drop=True)
+        frame["txn_date"] = dates[order]
+        logger.info(f"Grouped into {len(merchant_names)} merchant groups")
+        return frame, raw_codes[order], np.asarray(merchant_names, dtype=object)
+    
+    @staticmethod
+    def _amount_values(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-row amounts used for amount statistics (NaN where a row contributes nothing).
+        primary: withdrawal for OUTFLOW / deposit for INFLOW
+        fallback: any positive amount, used only by groups without a primary amount
+        """
+        def numeric(name: str) -> pd.Series:
+            if name not in frame.columns:
+                return pd.Series(np.nan, index=frame.index)
+            return pd.to_numeric(frame[name], errors="coerce")
+        
+        withdrawal = numeric("withdrawal_amount")
+        deposit = numeric("deposit_amount")
+        money_flow = frame["money_flow"] if "money_flow" in frame.columns else pd.Series("UNKNOWN", index=frame.index)
+        
+        primary = withdrawal.where((money_flow == "OUTFLOW") & withdrawal.notna(),
+                                   deposit.where((money_flow == "INFLOW") & deposit.notna()))
+        fallback = withdrawal.where(withdrawal.notna() & (withdrawal != 0), deposit)
+        fallback = fallback.where(fallback > 0)
+        return primary.to_numpy(dtype=float), fallback.to_numpy(dtype=float)
+    
+    @staticmethod
+    def _accumulate(codes: np.ndarray, values: np.ndarray, n_groups: int) -> pd.DataFrame:
+        """
+        Mergeable accumulators per group over non-NaN values:
+        count, sum, mean, m2 (sum of squared deviations), min, max.
+        Groups without values get count 0 and zeros elsewhere.
+        """
+        mask = ~np.isnan(values)
+        grouped = pd.Series(values[mask]).groupby(codes[mask])
+        stats = grouped.agg(count="size", sum="sum", mean="mean", min="min", max="max")
+        stats["m2"] = grouped.var(ddof=0) * stats["count"]
+        return stats.reindex(np.arange(n_groups)).fillna(0.0)
+    
+    @staticmethod
+    def _gap_days(frame: pd.DataFrame, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positive day gaps between consecutive transactions of the same merchant: (codes, gaps)"""
+        dates = frame["txn_date"].to_numpy()
+        gap_days = pd.TimedeltaIndex(np.diff(dates)).days.to_numpy()
+        gap_mask = (codes[1:] == codes[:-1]) & (gap_days > 0)
+        return codes[1:][gap_mask], gap_days[gap_mask].astype(float)
+    
+    @staticmethod
+    def _tag_counts(codes: np.ndarray, tags: pd.Series) -> pd.DataFrame:
+        """Rows of (code, tag, count, first) where first is the position of the tag's first occurrence"""
+        frame = pd.DataFrame({
+            "code": codes,
+            "tag": tags.fillna("UNKNOWN").to_numpy(dtype=object),
+            "pos": np.arange(len(codes)),
+        })
+        return frame.groupby(["code", "tag"], sort=False).agg(count=("pos", "size"), first=("pos", "min")).reset_index()
+    
+    @staticmethod
+    def _dominant_tags(codes: np.ndarray, tags: pd.Series, txn_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Most frequent tag per group and its share of the group.
+        Ties go to the tag seen first in date order (same as max() over an insertion-ordered dict).
+        Returns: (dominant_tag per group, confidence per group)
+        """
+        per_tag = PatternAggregator._tag_counts(codes, tags)
+        per_tag = per_tag.sort_values(["code", "count", "first"], ascending=[True, False, True], kind="stable")
+        dominant = per_tag.drop_duplicates("code").set_index("code").reindex(np.arange(len(txn_counts)))
+        return dominant["tag"].to_numpy(dtype=object), dominant["count"].to_numpy() / txn_counts
+    
+    @staticmethod
+    def _tag_column(frame: pd.DataFrame, level: int) -> pd.Series:
+        name = f"level_{level}_tag"
+        return frame[name] if name in frame.columns else pd.Series("UNKNOWN", index=frame.index)
+    
+    @staticmethod
+    def aggregate_patterns_df(df: pd.DataFrame) -> List[Dict]:
+        """
+        Vectorized aggregate_patterns over an enriched DataFrame.
+        
+        Accepts either enriched column names (Date, Withdrawal Amt., ...) or
+        transaction record names (txn_date, withdrawal_amount, ...). Uses one
+        groupby per statistic instead of per-merchant Python loops; output
+        dicts (keys, rounding, order) match aggregate_patterns.
+        
+        Returns: list of pattern stat dicts
+        """
+        groups = PatternAggregator._sorted_expense_groups(df)
+        if groups is None:
+            return []
+        frame, codes, merchant_names = groups
+        n_groups = len(merchant_names)
+        
+        txn_counts = np.bincount(codes, minlength=n_groups)
+        group_starts = np.concatenate(([0], np.cumsum(txn_counts)[:-1]))
+        dates = frame["txn_date"].to_numpy()
+        first_dates = dates[group_starts]
+        last_dates = dates[group_starts + txn_counts - 1]
+        active_duration_days = pd.TimedeltaIndex(last_dates - first_dates).days.to_numpy()
+        last_txn_days_ago = (pd.Timestamp(datetime.now()) - pd.DatetimeIndex(last_dates)).days.to_numpy()
+        
+        gap_codes, gaps = PatternAggregator._gap_days(frame, codes)
+        gap_stats = PatternAggregator._accumulate(gap_codes, gaps, n_groups)
+        gap_std = np.sqrt(np.divide(gap_stats["m2"], gap_stats["count"], out=np.zeros(n_groups), where=gap_stats["count"] > 0))
+        
+        # Flow-matching amounts; groups without any fall back to any positive amount
+        primary, fallback = PatternAggregator._amount_values(frame)
+        has_primary = np.bincount(codes, weights=~np.isnan(primary), minlength=n_groups) > 0
+        amounts = np.where(has_primary[codes], primary, fallback)
+        amount_stats = PatternAggregator._accumulate(codes, amounts, n_groups)
+        amount_std = np.sqrt(np.divide(amount_stats["m2"], amount_stats["count"], out=np.zeros(n_groups), where=amount_stats["count"] > 0))
+        
+        dominant = {
+            level: PatternAggregator._dominant_tags(codes, PatternAggregator._tag_column(frame, level), txn_counts)
+            for level in (1, 2, 3)
+        }
+        
+        # Apply ONLY minimum filter: txn_count >= 2
+        keep = txn_counts >= 2
+        logger.debug(f"{int((~keep).sum())} merchant(s) filtered with a single transaction")
+        
+        def values(arr, digits: Optional[int] = None, cast=float) -> list:
+            kept = [cast(v) for v in np.asarray(arr)[keep].tolist()]
+            return kept if digits is None else [round(v, digits) for v in kept]
+        
+        columns = {
+            # Identity
+            "merchant_hint": values(merchant_names, cast=str),
+            
+            # Aggregated evidence
+            "txn_count": values(txn_counts, cast=int),
+            "total_amount": values(amount_stats["sum"], 2),
+            "avg_amount": values(amount_stats["mean"], 2),
+            "amount_std": values(amount_std, 2),
+            "amount_min": values(amount_stats["min"], 2),
+            "amount_max": values(amount_stats["max"], 2),
+            
+            "active_duration_days": values(active_duration_days, cast=int),
+            "avg_gap_days": values(gap_stats["mean"], 2),
+            "gap_std_days": values(gap_std, 2),
+            "gap_min_days": values(gap_stats["min"], cast=int),
+            "gap_max_days": values(gap_stats["max"], cast=int),
+            
+            "last_txn_days_ago": values(last_txn_days_ago, cast=int),
+            
+            # Soft metadata
+            "dominant_level_1_tag": values(dominant[1][0], cast=str),
+            "level_1_confidence": values(dominant[1][1], 4),
+            "dominant_level_2_tag": values(dominant[2][0], cast=str),
+            "level_2_confidence": values(dominant[2][1], 4),
+            "dominant_level_3_tag": values(dominant[3][0], cast=str),
+            "level_3_confidence": values(dominant[3][1], 4),
+        }
+        fields = list(columns)
+        patterns = [dict(zip(fields, row)) for row in zip(*columns.values())]
+        
+        logger.info(f"Pattern aggregation complete: {len(patterns)} patterns created")
+        return patterns
+    
+    # ==================== INCREMENTAL (RUNNING) STATISTICS ====================
+    # Running stats are plain JSON-serializable dicts, one per merchant:
+    # {
+    #   "txn_count", "first_txn_date", "last_txn_date" (ISO),
+    #   "amounts" / "fallback_amounts" / "gaps": {"count", "sum", "mean", "m2", "min", "max"},
+    #   "level_1_counts" / "level_2_counts" / "level_3_counts": {tag: count} in first-seen order
+    # }
+    # Two running stats for consecutive date ranges merge exactly (Chan/Welford), so an upload
+    # only has to summarize its own new rows.
+    
+    @staticmethod
+    def compute_running_stats_df(df: pd.DataFrame) -> Dict[str, Dict]:
+        """
+        Summarize EXPENSE rows of a DataFrame into running stats per merchant_hint.
+        Returns: {merchant_hint: running_stats}
+        """
+        groups = PatternAggregator._sorted_expense_groups(df)
+        if groups is None:
+            return {}
+        frame, codes, merchant_names = groups
+        n_groups = len(merchant_names)
+        
+        txn_counts = np.bincount(codes, minlength=n_groups)
+        group_starts = np.concatenate(([0], np.cumsum(txn_counts)[:-1]))
+        dates = pd.DatetimeIndex(frame["txn_date"])
+        first_dates = dates[group_starts]
+        last_dates = dates[group_starts + txn_counts - 1]
+        
+        primary, fallback = PatternAggregator._amount_values(frame)
+        gap_codes, gaps = PatternAggregator._gap_days(frame, codes)
+        accumulators = {
+            "amounts": PatternAggregator._accumulate(codes, primary, n_groups),
+            "fallback_amounts": PatternAggregator._accumulate(codes, fallback, n_groups),
+            "gaps": PatternAggregator._accumulate(gap_codes, gaps, n_groups),
+        }
+        accumulators = {
+            name: stats.to_dict("index")
+            for name, stats in accumulators.items()
+        }
+        
+        tag_counts = {level: [{} for _ in range(n_groups)] for level in (1, 2, 3)}
+        for level in (1, 2, 3):
+            per_tag = PatternAggregator._tag_counts(codes, PatternAggregator._tag_column(frame, level))
+            per_tag = per_tag.sort_values(["code", "first"], kind="stable")
+            for code, tag, count in zip(per_tag["code"].tolist(), per_tag["tag"].tolist(), per_tag["count"].tolist()):
+                tag_counts[level][code][str(tag)] = int(count)
+        
+        running = {}
+        for code in range(n_groups):
+            running[str(merchant_names[code])] = {
+                "txn_count": int(txn_counts[code]),
+                "first_txn_date": first_dates[code].isoformat(),
+                "last_txn_date": last_dates[code].isoformat(),
+                **{
+                    name: {key: float(value) for key, value in stats[code].items()}
+                    for name, stats in accumulators.items()
+                },
+                "level_1_counts": tag_counts[1][code],
+                "level_2_counts": tag_counts[2][code],
+                "level_3_counts": tag_counts[3][code],
+            }
+        return running
+    
+    @staticmethod
+    def _merge_accumulators(a: Dict, b: Dict) -> Dict:
+        """Combine two count/sum/mean/m2/min/max accumulators (Chan et al. parallel variance)"""
+        if not a["count"]:
+            return dict(b)
+        if not b["count"]:
+            return dict(a)
+        count = a["count"] + b["count"]
+        delta = b["mean"] - a["mean"]
+        return {
+            "count": count,
+            "sum": a["sum"] + b["sum"],
+            "mean": a["mean"] + delta * b["count"] / count,
+            "m2": a["m2"] + b["m2"] + delta * delta * a["count"] * b["count"] / count,
+            "min": min(a["min"], b["min"]),
+            "max": max(a["max"], b["max"]),
+        }
+    
+    @staticmethod
+    def merge_running_stats(older: Dict, newer: Dict) -> Dict:
+        """
+        Merge running stats of a later date range into an earlier one.
+        Caller must ensure newer.first_txn_date >= older.last_txn_date; the gap
+        between the two ranges is added as one more gap observation.
+        """
+        gaps = PatternAggregator._merge_accumulators(older["gaps"], newer["gaps"])
+        bridge = (datetime.fromisoformat(newer["first_txn_date"]) - datetime.fromisoformat(older["last_txn_date"])).days
+        if bridge > 0:
+            gaps = PatternAggregator._merge_accumulators(
+                gaps, {"count": 1.0, "sum": float(bridge), "mean": float(bridge), "m2": 0.0, "min": float(bridge), "max": float(bridge)}
+            )
+        
+        def merge_counts(a: Dict, b: Dict) -> Dict:
+            merged = dict(a)
+            for tag, count in b.items():
+                merged[tag] = merged.get(tag, 0) + count
+            return merged
+        
+        return {
+            "txn_count": older["txn_count"] + newer["txn_count"],
+            "first_txn_date": older["first_txn_date"],
+            "last_txn_date": newer["last_txn_date"],
+            "amounts": PatternAggregator._merge_accumulators(older["amounts"], newer["amounts"]),
+            "fallback_amounts": PatternAggregator._merge_accumulators(older["fallback_amounts"], newer["fallback_amounts"]),
+            "gaps": gaps,
+            "level_1_counts": merge_counts(older["level_1_counts"], newer["level_1_counts"]),
+            "level_2_counts": merge_counts(older["level_2_counts"], newer["level_2_counts"]),
+            "level_3_counts": merge_counts(older["level_3_counts"], newer["level_3_counts"]),
+        }
+    
+    @staticmethod
+    def combine_running_stats(a: Dict, b: Dict) -> Optional[Dict]:
+        """
+        Merge two running stats in chronological order, whichever comes first.
+        Returns: merged stats, or None if their date ranges overlap
+        """
+        if a["last_txn_date"] <= b["first_txn_date"]:
+            return PatternAggregator.merge_running_stats(a, b)
+        if b["last_txn_date"] <= a["first_txn_date"]:
+            return PatternAggregator.merge_running_stats(b, a)
+        return None
+    
+    @staticmethod
+    def pattern_from_running_stats(merchant_hint: str, running: Dict) -> Dict:
+        """Derive the pattern stat dict (same schema as compute_aggregate_stats) from running stats"""
+        txn_count = running["txn_count"]
+        first_date = datetime.fromisoformat(running["first_txn_date"])
+        last_date = datetime.fromisoformat(running["last_txn_date"])
+        
+        amounts = running["amounts"] if running["amounts"]["count"] else running["fallback_amounts"]
+        gaps = running["gaps"]
+        
+        def std(acc: Dict) -> float:
+            return float(np.sqrt(acc["m2"] / acc["count"])) if acc["count"] else 0.0
+        
+        def dominant(counts: Dict) -> Tuple[str, float]:
+            if not counts:
+                return 'UNKNOWN', 0.0
+            tag = max(counts, key=counts.get)
+            return tag, counts[tag] / txn_count
+        
+        level_1_tag, level_1_confidence = dominant(running["level_1_counts"])
+        level_2_tag, level_2_confidence = dominant(running["level_2_counts"])
+        level_3_tag, level_3_confidence = dominant(running["level_3_counts"])
+        
+        return {
+            # Identity
+            "merchant_hint": merchant_hint,
+            
+            # Aggregated evidence
+            "txn_count": txn_count,
+            "total_amount": round(amounts["sum"], 2),
+            "avg_amount": round(amounts["mean"], 2),
+            "amount_std": round(std(amounts), 2),
+            "amount_min": round(amounts["min"], 2),
+            "amount_max": round(amounts["max"], 2),
+            
+            "active_duration_days": (last_date - first_date).days,
+            "avg_gap_days": round(gaps["mean"], 2),
+            "gap_std_days": round(std(gaps), 2),
+            "gap_min_days": int(gaps["min"]),
+            "gap_max_days": int(gaps["max"]),
+            
+            "last_txn_days_ago": (datetime.now() - last_date).days,
+            
+            # Soft metadata
+            "dominant_level_1_tag": level_1_tag,
+            "level_1_confidence": round(level_1_confidence, 4),
+            "dominant_level_2_tag": level_2_tag,
+            "level_2_confidence": round(level_2_confidence, 4),
+            "dominant_level_3_tag": level_3_tag,
+            "level_3_confidence": round(level_3_confidence, 4),
+            
+            # Mergeable state for the next upload
+            "running_stats": json.dumps(running),
+        }
+    
+    # ==================== RE-AGGREGATION FROM THE UPLOAD ARCHIVE ====================
+    # Columns the statistics use; narration and hashes are never read from the Parquet files
+    ARCHIVE_COLUMNS = [
+        "txn_date", "withdrawal_amount", "deposit_amount", "money_flow",
+        "level_1_tag", "level_2_tag", "level_3_tag", "merchant_hint",
+    ]
+    
+    @staticmethod
+    def read_archived_expenses(
+        user_id: int,
+        file_upload_ids: Iterable[str],
+        merchant_hints: Optional[Iterable[str]] = None
+    ) -> pd.DataFrame:
+        """
+        A user's archived EXPENSE rows (optionally only some merchants), reading
+        only ARCHIVE_COLUMNS and skipping non-matching row groups (see UploadArchive)
+        
+        Only the files of file_upload_ids (the uploads with stored transactions) are
+        read: files of uploads whose rows are gone from the database (deleted
+        duplicates, a reset database) are not part of the history.
+        """
+        filters = [("level_2_tag", "==", "EXPENSE")]
+        if merchant_hints is not None:
+            filters.append(("merchant_hint", "in", list(merchant_hints)))
+        return UploadArchive.read(
+            user_id, columns=PatternAggregator.ARCHIVE_COLUMNS, filters=filters, file_upload_ids=file_upload_ids
+        )
+    
+    @staticmethod
+    def running_stats_from_archive(
+        user_id: int,
+        file_upload_ids: Iterable[str],
+        merchant_hints: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Running stats per merchant over the user's archived history
+        Returns: {merchant_hint: running_stats}
+        """
+        history = PatternAggregator.read_archived_expenses(user_id, file_upload_ids, merchant_hints)
+        return PatternAggregator.compute_running_stats_df(history) if not history.empty else {}
+    
+    @staticmethod
+    def aggregate_patterns_from_archive(user_id: int, file_upload_ids: Iterable[str]) -> List[Dict]:
+        """aggregate_patterns_df over the user's archived history"""
+        history = PatternAggregator.read_archived_expenses(user_id, file_upload_ids)
+        return PatternAggregator.aggregate_patterns_df(history) if not history.empty else []
+
+
 # ==================== PERSISTENCE ====================
 class TransactionPersistence:
     """Handle database persistence"""
     
+    # Rows per executemany batch for bulk inserts
+    BULK_INSERT_BATCH_SIZE = 5000
+    
     @staticmethod
-    def persist_enriched_transactions(
+    def compute_content_hash(user_id: int, txn: Dict) -> str:
+        """
+        Deterministic duplicate key for a transaction:
+        SHA-256 of user_id, txn_date, narration, withdrawal_amount, deposit_amount.
+        NULL amounts hash as empty strings, so NULL matches NULL.
+        """
+        def fmt_amount(value) -> str:
+            return "" if value is None or pd.isna(value) else repr(float(value))
+
+        txn_date = txn.get('txn_date')
+        parts = [
+            str(user_id),
+            txn_date.isoformat() if txn_date is not None else "",
+            txn.get('narration') or "",
+            fmt_amount(txn.get('withdrawal_amount')),
+            fmt_amount(txn.get('deposit_amount')),
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _backfill_content_hashes(db: Session, user_id: int) -> int:
+        """Hash legacy rows stored before content_hash existed (one-time per user)"""
+        from app.models import Transaction
+        
+        legacy_rows = db.query(
+            Transaction.id,
+            Transaction.txn_date,
+            Transaction.narration,
+            Transaction.withdrawal_amount,
+            Transaction.deposit_amount,
+        ).filter(
+            Transaction.user_id == user_id,
+            Transaction.content_hash.is_(None)
+        ).all()
+        
+        if not legacy_rows:
+            return 0
+        
+        updates = [
+            {
+                "id": row.id,
+                "content_hash": TransactionPersistence.compute_content_hash(user_id, row._asdict()),
+            }
+            for row in legacy_rows
+        ]
+        db.execute(update(Transaction), updates)
+        logger.info(f"Backfilled content_hash for {len(updates)} existing transactions of user {user_id}")
+        return len(updates)
+    
+    @staticmethod
+    def insert_new_transactions(
         db: Session,
         user_id: int,
-        transactions: List[Dict]
-    ) -> int:
+        transactions: List[Dict],
+        inserted_hashes: Optional[Set[str]] = None
+    ) -> List[Dict]:
         """
-        Persist enriched transactions to database
+        Persist enriched transactions to database, skipping duplicates
         
         Stores deterministic facts and enrichment tags:
         - Core facts: txn_date, narration, withdrawal_amount, deposit_amount
         - Deterministic tags: money_flow, level_1_tag, level_2_tag, level_3_tag, merchant_hint
         - Provenance: file_upload_id
         
-        Returns: count of persisted transactions
+        Duplicates (same user_id, date, narration and amounts) are detected by
+        content_hash: hashes of all the user's stored rows are fetched in one query
+        for the upload's date range, and the remaining rows are written with
+        batched bulk INSERTs inside a single transaction.
+        
+        Rows repeated within the upload are kept: repeats within this call are
+        all inserted, and inserted_hashes (shared across the calls of one upload
+        run, e.g. its chunks, and updated here) holds the hashes this run already
+        stored, which are not duplicates. Rows stored by an earlier run of the
+        same upload (a resumed job, a retried batch) are.
+        
+        Returns: the inserted rows (Transaction column dicts)
         """
         from app.models import Transaction
         
+        if not transactions:
+            return []
+        
         try:
-            count = 0
-            duplicates_skipped = 0
+            TransactionPersistence._backfill_content_hashes(db, user_id)
             
             for txn in transactions:
-                # Check for duplicates before inserting
-                # A duplicate is defined as: same user_id, date, narration, and amount
-                # IMPORTANT: Must handle NULL amounts correctly (NULL == NULL is NULL in SQL, not TRUE)
-                withdrawal_amt = txn.get('withdrawal_amount')
-                deposit_amt = txn.get('deposit_amount')
-                
-                query = db.query(Transaction).filter(
-                    Transaction.user_id == user_id,
-                    Transaction.txn_date == txn['txn_date'],
-                    Transaction.narration == txn['narration']
-                )
-                
-                # Handle NULL comparison properly for withdrawal_amount
-                if withdrawal_amt is None:
-                    query = query.filter(Transaction.withdrawal_amount.is_(None))
-                else:
-                    query = query.filter(Transaction.withdrawal_amount == withdrawal_amt)
-                
-                # Handle NULL comparison properly for deposit_amount
-                if deposit_amt is None:
-                    query = query.filter(Transaction.deposit_amount.is_(None))
-                else:
-                    query = query.filter(Transaction.deposit_amount == deposit_amt)
-                
-                existing_txn = query.first()
-                
-                if existing_txn:
-                    # Skip duplicate
-                    duplicates_skipped += 1
-                    logger.debug(f"Skipped duplicate transaction: {txn['narration']} on {txn['txn_date']}")
-                    continue
-                
-                transaction = Transaction(
-                    user_id=user_id,
+                if 'content_hash' not in txn:
+                    txn['content_hash'] = TransactionPersistence.compute_content_hash(user_id, txn)
+            
+            # One set-based lookup of hashes already stored for this user and date range
+            txn_dates = [txn['txn_date'] for txn in transactions if txn.get('txn_date') is not None]
+            query = db.query(Transaction.content_hash).filter(Transaction.user_id == user_id)
+            if txn_dates:
+                query = query.filter(Transaction.txn_date.between(min(txn_dates), max(txn_dates)))
+            existing_hashes = {row.content_hash for row in query}
+            # Rows this run stored from earlier chunks are not duplicates (in-file repeats are kept)
+            if inserted_hashes:
+                existing_hashes -= inserted_hashes
+            
+            rows = [
+                {
+                    "user_id": user_id,
                     # Core transaction facts
-                    txn_date=txn['txn_date'],
-                    narration=txn['narration'],
+                    "txn_date": txn['txn_date'],
+                    "narration": txn['narration'],
                     # Amount tracking
-                    withdrawal_amount=txn.get('withdrawal_amount'),
-                    deposit_amount=txn.get('deposit_amount'),
-                    money_flow=txn['money_flow'],
+                    "withdrawal_amount": txn.get('withdrawal_amount'),
+                    "deposit_amount": txn.get('deposit_amount'),
+                    "money_flow": txn['money_flow'],
                     # Deterministic enrichment
-                    level_1_tag=txn['level_1_tag'],
-                    level_2_tag=txn['level_2_tag'],
-                    level_3_tag=txn.get('level_3_tag', 'UNKNOWN'),
-                    merchant_hint=txn.get('merchant_hint', 'UNKNOWN'),
+                    "level_1_tag": txn['level_1_tag'],
+                    "level_2_tag": txn['level_2_tag'],
+                    "level_3_tag": txn.get('level_3_tag', 'UNKNOWN'),
+                    "merchant_hint": txn.get('merchant_hint', 'UNKNOWN'),
                     # Provenance
-                    file_upload_id=txn['file_upload_id']
-                )
-                db.add(transaction)
-                count += 1
+                    "file_upload_id": txn['file_upload_id'],
+                    "content_hash": txn['content_hash'],
+                }
+                for txn in transactions
+                if txn['content_hash'] not in existing_hashes
+            ]
+            duplicates_skipped = len(transactions) - len(rows)
+            
+            batch_size = TransactionPersistence.BULK_INSERT_BATCH_SIZE
+            for start in range(0, len(rows), batch_size):
+                db.execute(insert(Transaction), rows[start:start + batch_size])
             
             db.commit()
-            logger.info(f"Persisted {count} enriched transactions for user {user_id} (skipped {duplicates_skipped} duplicates)")
-            return count
+            if inserted_hashes is not None:
+                inserted_hashes.update(row["content_hash"] for row in rows)
+            logger.info(f"Persisted {len(rows)} enriched transactions for user {user_id} (skipped {duplicates_skipped} duplicates)")
+            return rows
             
         except Exception as e:
             logger.error(f"Error persisting enriched transactions: {e}", exc_info=True)
             db.rollback()
             raise
     
+    @staticmethod
+    def persist_enriched_transactions(
+        db: Session,
+        user_id: int,
+        transactions: List[Dict]
+    ) -> int:
+        """
+        Persist enriched transactions to database (see insert_new_transactions)
+        
+        Returns: count of persisted transactions
+        """
+        return len(TransactionPersistence.insert_new_transactions(db, user_id, transactions))
+    
+    @staticmethod
+    def stored_upload_merchants(db: Session, user_id: int, file_upload_id: str) -> Optional[Set[str]]:
+        """
+        Merchants of the EXPENSE rows an upload has already stored, or None when it stored no rows
+        (a job resumed after a restart finds the chunks committed before the interruption)
+        """
+        from app.models import Transaction
+        
+        rows = db.query(Transaction.merchant_hint, Transaction.level_2_tag).filter(
+            Transaction.user_id == user_id,
+            Transaction.file_upload_id == file_upload_id
+        ).distinct().all()
+        if not rows:
+            return None
+        return {merchant for merchant, level_2_tag in rows if level_2_tag == "EXPENSE"}
+    
+    # Max merchant hints per IN (...) query (stays under SQLite's bound-parameter limit)
+    MERCHANT_QUERY_CHUNK_SIZE = 500
+    
+    @staticmethod
+    def _merchant_history_running_stats(
+        db: Session,
+        user_id: int,
+        merchant_hints: Optional[List[str]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Rebuild running stats for the given merchants (all merchants when None) from their stored EXPENSE transactions
+        
+        Reads the user's Parquet upload archive when it holds every stored
+        upload, otherwise the transactions table.
+        """
+        from app.models import Transaction
+        
+        uploads = TransactionPersistence._stored_uploads(db, user_id)
+        if TransactionPersistence.archive_is_complete(db, user_id, uploads):
+            return PatternAggregator.running_stats_from_archive(user_id, uploads, merchant_hints)
+        
+        columns = [
+            Transaction.txn_date, Transaction.narration,
+            Transaction.withdrawal_amount, Transaction.deposit_amount, Transaction.money_flow,
+            Transaction.level_1_tag, Transaction.level_2_tag, Transaction.level_3_tag,
+            Transaction.merchant_hint,
+        ]
+        query = db.query(*columns).filter(
+            Transaction.user_id == user_id,
+            Transaction.level_2_tag == "EXPENSE"
+        )
+        rows = []
+        if merchant_hints is None:
+            rows = query.order_by(Transaction.id).all()
+        chunk = TransactionPersistence.MERCHANT_QUERY_CHUNK_SIZE
+        for start in range(0, len(merchant_hints or []), chunk):
+            rows.extend(
+                query.filter(
+                    Transaction.merchant_hint.in_(merchant_hints[start:start + chunk])
+                ).order_by(Transaction.id).all()
+            )
+        
+        if not rows:
+            return {}
+        history = pd.DataFrame([row._asdict() for row in rows])
+        return PatternAggregator.compute_running_stats_df(history)
+    
+    @staticmethod
+    def update_pattern_stats_incremental(
+        db: Session,
+        user_id: int,
+        new_transactions: List[Dict]
+    ) -> Tuple[int, int]:
+        """
+        Update pattern stats with newly inserted transactions only (see apply_running_stats).
+        Returns: (patterns_aggregated, patterns_stored)
+        """
+        if not new_transactions:
+            return 0, 0
+        
+        batch = PatternAggregator.compute_running_stats_df(pd.DataFrame(new_transactions))
+        return TransactionPersistence.apply_running_stats(db, user_id, batch)
+    
+    @staticmethod
+    def apply_running_stats(
+        db: Session,
+        user_id: int,
+        batch: Dict[str, Dict],
+        rebuild: Iterable[str] = ()
+    ) -> Tuple[int, int]:
+        """
+        Merge running stats of newly stored rows into the stored pattern stats.
+        
+        For each merchant in batch:
+        - stored running_stats ending on/before the new rows' first date are
+          merged with the new rows' summary (no history read)
+        - otherwise (first sighting, single earlier txn, back-dated upload, or
+          listed in rebuild) the merchant is rebuilt from its stored EXPENSE history
+        
+        Merchants not in batch keep their stored stats.
+        Equivalent to re-aggregating the user's full history.
+        
+        Returns: (patterns_aggregated, patterns_stored)
+        """
+        from app.models import SpendingPatternStats
+        
+        if not batch:
+            return 0, 0
+        
+        rebuild_set = set(rebuild)
+        merchants = [merchant for merchant in batch if merchant not in rebuild_set]
+        stored = {}
+        chunk = TransactionPersistence.MERCHANT_QUERY_CHUNK_SIZE
+        for start in range(0, len(merchants), chunk):
+            rows = db.query(SpendingPatternStats.merchant_hint, SpendingPatternStats.running_stats).filter(
+                SpendingPatternStats.user_id == user_id,
+                SpendingPatternStats.merchant_hint.in_(merchants[start:start + chunk])
+            ).all()
+            stored.update({row.merchant_hint: json.loads(row.running_stats) for row in rows if row.running_stats})
+        
+        running = {}
+        to_rebuild = [merchant for merchant in batch if merchant in rebuild_set]
+        for merchant in merchants:
+            new_stats = batch[merchant]
+            old_stats = stored.get(merchant)
+            if old_stats is not None and old_stats["last_txn_date"] <= new_stats["first_txn_date"]:
+                running[merchant] = PatternAggregator.merge_running_stats(old_stats, new_stats)
+            else:
+                to_rebuild.append(merchant)
+        
+        if to_rebuild:
+            running.update(TransactionPersistence._merchant_history_running_stats(db, user_id, to_rebuild))
+        logger.info(f"Incremental pattern update: {len(batch) - len(to_rebuild)} merged, {len(to_rebuild)} rebuilt from history")
+        
+        # Apply ONLY minimum filter: txn_count >= 2
+        pattern_stats = [
+            PatternAggregator.pattern_from_running_stats(merchant, stats)
+            for merchant, stats in running.items()
+            if stats["txn_count"] >= 2
+        ]
+        return len(pattern_stats), TransactionPersistence.persist_pattern_stats(db, user_id, pattern_stats)
+    
+    # Aggregated evidence columns written by the pattern upsert
+    PATTERN_STAT_FIELDS = [
+        "txn_count", "total_amount", "avg_amount", "amount_std", "amount_min", "amount_max",
+        "active_duration_days", "avg_gap_days", "gap_std_days", "gap_min_days", "gap_max_days",
+        "last_txn_days_ago",
+        "dominant_level_1_tag", "level_1_confidence",
+        "dominant_level_2_tag", "level_2_confidence",
+        "dominant_level_3_tag", "level_3_confidence",
+    ]
+    
     @staticmethod
     def persist_pattern_stats(
         db: Session,
@@ -789,21 +2246,79 @@ class TransactionPersistence:
         Handles upsert: if pattern exists for (user_id, merchant_hint), update it.
         This enables re-running aggregation without duplication.
         
+        On SQLite and PostgreSQL all patterns are written with a single
+        INSERT ... ON CONFLICT (user_id, merchant_hint) DO UPDATE; other
+        dialects fall back to the per-merchant upsert.
+        
         Returns: count of persisted/updated patterns
         """
         from app.models import SpendingPatternStats
-        from sqlalchemy.exc import IntegrityError
+        
+        if not pattern_stats:
+            return 0
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return TransactionPersistence._upsert_pattern_stats_rowwise(db, user_id, pattern_stats)
+        
+        fields = TransactionPersistence.PATTERN_STAT_FIELDS
+        rows = [
+            {
+                "user_id": user_id,
+                "merchant_hint": stats['merchant_hint'],
+                **{field: stats[field] for field in fields},
+                "running_stats": stats.get('running_stats'),
+            }
+            for stats in pattern_stats
+        ]
         
         try:
-            count = 0
-            for stats in pattern_stats:
-                merchant_hint = stats['merchant_hint']
-                
-                try:
-                    # Check if pattern already exists for this user + merchant
-                    existing = db.query(SpendingPatternStats).filter(
-                        SpendingPatternStats.user_id == user_id,
-                        SpendingPatternStats.merchant_hint == merchant_hint
+            stmt = dialect_insert(SpendingPatternStats)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "merchant_hint"],
+                set_={
+                    **{field: getattr(stmt.excluded, field) for field in fields},
+                    "running_stats": stmt.excluded.running_stats,
+                    "updated_at": datetime.utcnow(),
+                },
+            )
+            db.execute(stmt, rows)
+            db.commit()
+            logger.info(f"Upserted {len(rows)} pattern stats for user {user_id}")
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"Error in persist_pattern_stats: {e}", exc_info=True)
+            db.rollback()
+            raise
+    
+    @staticmethod
+    def _upsert_pattern_stats_rowwise(
+        db: Session,
+        user_id: int,
+        pattern_stats: List[Dict]
+    ) -> int:
+        """
+        Per-merchant SELECT-then-update upsert, for dialects without ON CONFLICT.
+        Returns: count of persisted/updated patterns
+        """
+        from app.models import SpendingPatternStats
+        from sqlalchemy.exc import IntegrityError
+        
+        try:
+            count = 0
+            for stats in pattern_stats:
+                merchant_hint = stats['merchant_hint']
+                
+                try:
+                    # Check if pattern already exists for this user + merchant
+                    existing = db.query(SpendingPatternStats).filter(
+                        SpendingPatternStats.user_id == user_id,
+                        SpendingPatternStats.merchant_hint == merchant_hint
                     ).first()
                     
                     if existing:
@@ -827,6 +2342,7 @@ class TransactionPersistence:
                         existing.level_2_confidence = stats['level_2_confidence']
                         existing.dominant_level_3_tag = stats['dominant_level_3_tag']
                         existing.level_3_confidence = stats['level_3_confidence']
+                        existing.running_stats = stats.get('running_stats')
                         existing.updated_at = datetime.utcnow()
                         db.add(existing)
                     else:
@@ -852,7 +2368,8 @@ class TransactionPersistence:
                             dominant_level_2_tag=stats['dominant_level_2_tag'],
                             level_2_confidence=stats['level_2_confidence'],
                             dominant_level_3_tag=stats['dominant_level_3_tag'],
-                            level_3_confidence=stats['level_3_confidence']
+                            level_3_confidence=stats['level_3_confidence'],
+                            running_stats=stats.get('running_stats')
                         )
                         db.add(pattern_obj)
                     
@@ -877,8 +2394,228 @@ class TransactionPersistence:
             db.rollback()
             raise
 
+    # ==================== UPLOAD ARCHIVE ====================
+    @staticmethod
+    def _stored_uploads(db: Session, user_id: int) -> Dict[str, Optional[datetime]]:
+        """file_upload_id -> first stored_at of every upload with stored transactions"""
+        from app.models import Transaction
+        
+        rows = db.query(Transaction.file_upload_id, func.min(Transaction.created_at)).filter(
+            Transaction.user_id == user_id
+        ).group_by(Transaction.file_upload_id).all()
+        return {upload_id: created_at for upload_id, created_at in rows}
+    
+    @staticmethod
+    def archive_is_complete(db: Session, user_id: int, upload_ids: Optional[Iterable[str]] = None) -> bool:
+        """
+        True when every upload with stored transactions (upload_ids, queried when
+        not given) has its Parquet archive file
+        
+        Archive files of other uploads may exist; readers pass upload_ids to skip them.
+        """
+        if not UploadArchive.enabled():
+            return False
+        if upload_ids is None:
+            upload_ids = TransactionPersistence._stored_uploads(db, user_id)
+        return bool(upload_ids) and not UploadArchive.missing_uploads(user_id, upload_ids)
+    
+    @staticmethod
+    def backfill_archive(db: Session, user_id: int) -> int:
+        """
+        Archive uploads stored before the archive existed (or whose archive write failed)
+        Returns: number of uploads archived
+        """
+        from app.models import Transaction
+        
+        if not UploadArchive.enabled():
+            return 0
+        uploads = TransactionPersistence._stored_uploads(db, user_id)
+        missing = UploadArchive.missing_uploads(user_id, uploads)
+        columns = [getattr(Transaction, column) for column in UploadArchive.COLUMNS]
+        
+        archived = 0
+        for upload_id in missing:
+            rows = db.query(*columns).filter(
+                Transaction.user_id == user_id,
+                Transaction.file_upload_id == upload_id
+            ).order_by(Transaction.id).all()
+            if UploadArchive.write(user_id, upload_id, [row._asdict() for row in rows], uploaded_at=uploads[upload_id]):
+                archived += 1
+        if archived:
+            logger.info(f"Backfilled the upload archive with {archived} uploads of user {user_id}")
+        return archived
+    
+    @staticmethod
+    def rebuild_pattern_stats(db: Session, user_id: int) -> Dict:
+        """
+        Recompute every merchant's pattern stats from the user's full history,
+        read from the Parquet upload archive (backfilled first) when possible
+        
+        Returns: {"patterns_aggregated", "pattern_stats_stored", "source", "uploads_archived"}
+        """
+        uploads_archived = TransactionPersistence.backfill_archive(db, user_id)
+        source = "archive" if TransactionPersistence.archive_is_complete(db, user_id) else "database"
+        
+        running = TransactionPersistence._merchant_history_running_stats(db, user_id)
+        pattern_stats = [
+            PatternAggregator.pattern_from_running_stats(merchant, stats)
+            for merchant, stats in running.items()
+            if stats["txn_count"] >= 2
+        ]
+        stored = TransactionPersistence.persist_pattern_stats(db, user_id, pattern_stats)
+        logger.info(f"Rebuilt {stored} pattern stats for user {user_id} from the {source}")
+        return {
+            "patterns_aggregated": len(pattern_stats),
+            "pattern_stats_stored": stored,
+            "source": source,
+            "uploads_archived": uploads_archived,
+        }
+    
+    # ==================== UPLOAD LEDGER ====================
+    @staticmethod
+    def find_prior_uploads(
+        db: Session,
+        user_id: int,
+        content_hashes: Iterable[str]
+    ) -> Dict[str, Dict]:
+        """
+        Earlier uploads of the same bytes by this user (see UploadLedger)
+        Returns: {content_hash: that upload's response, marked duplicate_upload}
+        """
+        from app.models import UploadLedger
+
+        hashes = list(set(content_hashes))
+        entries = []
+        chunk = TransactionPersistence.MERCHANT_QUERY_CHUNK_SIZE
+        for start in range(0, len(hashes), chunk):
+            entries.extend(
+                db.query(UploadLedger).filter(
+                    UploadLedger.user_id == user_id,
+                    UploadLedger.content_hash.in_(hashes[start:start + chunk])
+                ).all()
+            )
+
+        prior = {}
+        for entry in entries:
+            result = json.loads(entry.result) if entry.result else {
+                "status": "success",
+                "upload_id": entry.file_upload_id,
+                "statistics": {
+                    "total_rows": entry.total_rows,
+                    "clean_rows": entry.clean_rows,
+                    "transactions_stored": entry.transactions_stored,
+                },
+            }
+            prior[entry.content_hash] = {
+                **result,
+                "duplicate_upload": True,
+                "original_upload_at": entry.created_at.isoformat() if entry.created_at else None,
+                "stages": [],
+            }
+        return prior
+
+    @staticmethod
+    def find_prior_upload(db: Session, user_id: int, content_hash: str) -> Optional[Dict]:
+        """
+        Result of an earlier upload of the same bytes by this user
+        Returns: that upload's response (marked duplicate_upload), or None
+        """
+        prior = TransactionPersistence.find_prior_uploads(db, user_id, [content_hash]).get(content_hash)
+        if prior:
+            logger.info(f"File already uploaded by user {user_id} (upload {prior.get('upload_id')}), returning its result")
+        return prior
+
+    @staticmethod
+    def record_upload(
+        db: Session,
+        user_id: int,
+        content_hash: str,
+        filename: Optional[str],
+        result: Dict
+    ) -> bool:
+        """
+        Add a successful upload to the ledger so identical re-uploads are answered from it
+        Returns: False if the same bytes were recorded meanwhile (concurrent upload)
+        """
+        from app.models import UploadLedger
+        from sqlalchemy.exc import IntegrityError
+
+        statistics = result.get("statistics", {})
+        db.add(UploadLedger(
+            user_id=user_id,
+            content_hash=content_hash,
+            file_upload_id=result["upload_id"],
+            filename=filename,
+            total_rows=statistics.get("total_rows", 0),
+            clean_rows=statistics.get("clean_rows", 0),
+            transactions_stored=statistics.get("transactions_stored", 0),
+            result=json.dumps({key: value for key, value in result.items() if key != "stages"}, default=str),
+        ))
+        try:
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            logger.info(f"Upload {result['upload_id']} already in the ledger for user {user_id}")
+            return False
+        except Exception as e:
+            # The upload itself is stored; only re-upload short-circuiting is lost
+            logger.error(f"Error recording upload {result['upload_id']} in the ledger: {e}", exc_info=True)
+            db.rollback()
+            return False
+
 
 # ==================== MAIN PROCESSOR ====================
+class StageTracker:
+    """Per-stage status, row counts and timings of one upload run"""
+    
+    def __init__(self, on_update: Optional[Callable[[List[Dict]], None]] = None):
+        self.stages: List[Dict] = []
+        self._on_update = on_update
+        self._started = 0.0
+    
+    def _notify(self):
+        if self._on_update:
+            self._on_update(self.stages)
+    
+    def start(self, stage: str):
+        self.stages.append({"stage": stage, "status": "running", "rows": None, "seconds": None})
+        self._started = time.perf_counter()
+        self._notify()
+    
+    def finish(self, rows: Optional[int] = None, status: str = "completed"):
+        current = self.stages[-1]
+        current["status"] = status
+        current["rows"] = rows
+        current["seconds"] = round(time.perf_counter() - self._started, 4)
+        self._notify()
+    
+    def add(self, stage: str, rows: int, seconds: float):
+        """Accumulate rows/seconds into a stage that runs once per streamed chunk"""
+        current = next((entry for entry in self.stages if entry["stage"] == stage), None)
+        if current is None:
+            current = {"stage": stage, "status": "running", "rows": 0, "seconds": 0.0}
+            self.stages.append(current)
+        current["rows"] += rows
+        current["seconds"] = round(current["seconds"] + seconds, 4)
+        self._notify()
+    
+    def _close_running(self, status: str):
+        running = [entry for entry in self.stages if entry["status"] == "running"]
+        for entry in running:
+            entry["status"] = status
+            if entry["seconds"] is None:
+                entry["seconds"] = round(time.perf_counter() - self._started, 4)
+        if running:
+            self._notify()
+    
+    def complete(self):
+        self._close_running("completed")
+    
+    def fail(self):
+        self._close_running("failed")
+
+
 class TransactionUploadProcessor:
     """Main orchestrator for transaction upload processing
     
@@ -887,8 +2624,8 @@ class TransactionUploadProcessor:
     2. Parse CSV/Excel
     3. Clean dataframe (normalize dates, amounts)
     4. Enrich transactions (add deterministic tags)
-    5. Store enriched transactions
-    6. Aggregate into pattern stats
+    5. Store enriched transactions (new rows only)
+    6. Merge new rows into per-merchant running stats
     7. Store pattern stats
     8. [Optional: Run AI analysis for leaks]
     """
@@ -902,135 +2639,291 @@ class TransactionUploadProcessor:
         """
         Main entry point: process entire file upload end-to-end
         
+        Reads the upload, then runs the CPU-bound pipeline in a worker thread
+        so the event loop keeps serving other requests.
+        
         Returns: response dict with statistics and results
         """
-        file_upload_id = str(uuid.uuid4())
+        is_valid, error_msg = await FileParser.validate_file(file)
+        if not is_valid:
+            logger.warning(f"File validation failed: {error_msg}")
+            return {
+                "status": "error",
+                "detail": error_msg,
+                "limit_exceeded": FileParser.size_error(getattr(file, 'size', None)) is not None
+            }
+        
+        if not FileParser.is_streamable(file.filename):
+            try:
+                content = await FileParser.read_limited(file)
+            except UploadLimitExceeded as e:
+                logger.warning(f"Upload rejected: {e}")
+                return {
+                    "status": "error",
+                    "detail": str(e),
+                    "limit_exceeded": True
+                }
+            return await asyncio.to_thread(
+                TransactionUploadProcessor.process_content,
+                content, file.filename, user_id, db
+            )
+        
+        # Hash the (already spooled) upload first, so a file uploaded before is answered from the ledger
+        try:
+            content_hash = await FileParser.hash_upload(file)
+        except UploadLimitExceeded as e:
+            logger.warning(f"Upload rejected: {e}")
+            return {
+                "status": "error",
+                "detail": str(e),
+                "limit_exceeded": True
+            }
+        
+        # Stream: feed the upload in fixed-size reads while a worker thread parses and persists chunks.
+        # Bytes are counted as they arrive; crossing the limit aborts the reader mid-file.
+        reader = UploadStreamReader()
+        consumer = asyncio.create_task(asyncio.to_thread(
+            TransactionUploadProcessor.process_stream,
+            reader, file.filename, user_id, db,
+            content_hash=content_hash
+        ))
+        max_bytes = FileParser.max_file_bytes()
+        bytes_received = 0
+        try:
+            while True:
+                chunk = await file.read(PatternConfig.STREAM_READ_BYTES)
+                bytes_received += len(chunk)
+                if bytes_received > max_bytes:
+                    await asyncio.to_thread(reader.feed, UploadLimitExceeded(
+                        f"File too large: exceeds the {PatternConfig.MAX_FILE_SIZE_MB} MB limit "
+                        f"(aborted after {bytes_received:,} bytes)"
+                    ))
+                    break
+                if not await asyncio.to_thread(reader.feed, chunk) or not chunk:
+                    break
+        except Exception as e:
+            logger.error(f"Error reading upload stream: {e}", exc_info=True)
+            await asyncio.to_thread(reader.feed, e)
+        return await consumer
+    
+    @staticmethod
+    def process_content(
+        content: bytes,
+        filename: str,
+        user_id: int,
+        db: Session,
+        file_upload_id: Optional[str] = None,
+        on_stage: Optional[Callable[[List[Dict]], None]] = None
+    ) -> Dict:
+        """
+        Process raw file bytes end-to-end (blocking; call from a worker thread)
+        
+        Parsing and cleaning run on the pipeline thread pool, enrichment on the
+        process pool (see PipelineExecutors).
+        
+        on_stage is called with the stage list whenever a stage starts or ends.
+        
+        Bytes this user has uploaded before are not processed again: the
+        earlier upload's response is returned from the ledger, with
+        duplicate_upload set.
+        
+        Returns: response dict with statistics, per-stage timings and results
+        """
+        size_error = FileParser.size_error(len(content))
+        if size_error:
+            logger.warning(f"Upload rejected: {size_error}")
+            return {
+                "status": "error",
+                "detail": size_error,
+                "limit_exceeded": True
+            }
+        
+        content_hash = FileParser.content_hash(content)
+        if FileParser.is_chunked(filename):
+            return TransactionUploadProcessor.process_stream(
+                io.BytesIO(content), filename, user_id, db,
+                file_upload_id=file_upload_id, on_stage=on_stage, content_hash=content_hash
+            )
+        
+        prior = TransactionPersistence.find_prior_upload(db, user_id, content_hash)
+        if prior:
+            return prior
+        
+        file_upload_id = file_upload_id or str(uuid.uuid4())
+        tracker = StageTracker(on_stage)
         logger.info(f"Starting transaction upload processing: upload_id={file_upload_id}, user_id={user_id}")
         
         try:
             # ==================== STEP 1: VALIDATE FILE ====================
-            is_valid, error_msg = await FileParser.validate_file(file)
+            tracker.start("validate")
+            is_valid, error_msg = FileParser.validate_filename(filename)
             if not is_valid:
+                tracker.fail()
                 logger.warning(f"File validation failed: {error_msg}")
                 return {
                     "status": "error",
-                    "detail": error_msg
+                    "detail": error_msg,
+                    "stages": tracker.stages
                 }
+            tracker.finish()
             
             # ==================== STEP 2: PARSE FILE ====================
-            df, parse_errors = await FileParser.parse_file(file)
+            tracker.start("parse")
+            df, parse_errors = PipelineExecutors.run_io(FileParser.parse_content, content, filename)
             if df is None:
+                tracker.fail()
                 logger.error("File parsing failed")
                 return {
                     "status": "error",
                     "detail": "Failed to parse file",
-                    "errors": parse_errors
+                    "errors": parse_errors,
+                    "stages": tracker.stages
                 }
             
             total_rows = len(df)
+            bank_profile = df.attrs.get("bank_profile")
+            rows_error = FileParser.rows_error(total_rows)
+            if rows_error:
+                tracker.fail()
+                logger.warning(f"Upload rejected: {rows_error}")
+                return {
+                    "status": "error",
+                    "detail": rows_error,
+                    "limit_exceeded": True,
+                    "statistics": {
+                        "total_rows": total_rows,
+                        "bytes_read": len(content),
+                        "limits": FileParser.limits()
+                    },
+                    "stages": tracker.stages
+                }
+            tracker.finish(total_rows)
             logger.info(f"File parsed: {total_rows} rows")
             
             # ==================== STEP 3: CLEAN DATAFRAME ====================
             # (Normalize amounts, parse dates, remove rows with missing critical columns)
+            tracker.start("clean")
             try:
-                df_clean = DataNormalizer.clean_dataframe(df)
+                df_clean = PipelineExecutors.run_io(DataNormalizer.clean_dataframe, df, PatternConfig.INPLACE_PIPELINE)
             except Exception as e:
+                tracker.fail()
                 logger.error(f"Error cleaning dataframe: {e}", exc_info=True)
                 return {
                     "status": "error",
-                    "detail": f"Failed to clean transaction data: {str(e)}"
+                    "detail": f"Failed to clean transaction data: {str(e)}",
+                    "stages": tracker.stages
                 }
+            del df  # superseded by df_clean (same frame when cleaned in place)
             
             clean_rows = len(df_clean)
+            unparseable_dates = df_clean.attrs.get("unparseable_dates", {"count": 0, "examples": []})
             if clean_rows == 0:
+                tracker.fail()
                 logger.warning("No valid transactions after cleaning")
                 return {
                     "status": "error",
                     "detail": "No valid transactions found in file (all rows filtered during cleaning)",
                     "statistics": {
                         "total_rows": total_rows,
-                        "clean_rows": 0
-                    }
+                        "clean_rows": 0,
+                        "unparseable_dates": unparseable_dates
+                    },
+                    "stages": tracker.stages
                 }
             
+            tracker.finish(clean_rows)
             logger.info(f"Cleaning complete: {clean_rows} valid rows from {total_rows}")
             
             # ==================== STEP 4: ENRICH TRANSACTIONS ====================
             # (Add money_flow, level_1/2/3_tag, merchant_hint - all deterministic)
+            tracker.start("enrich")
             try:
-                df_enriched = TransactionEnricher.enrich_transactions(df_clean)
+                df_enriched, hint_cache_stats = PipelineExecutors.run_cpu(
+                    TransactionEnricher.enrich_with_cache_stats, df_clean, PatternConfig.INPLACE_PIPELINE, rows=clean_rows
+                )
             except Exception as e:
+                tracker.fail()
                 logger.error(f"Error enriching transactions: {e}", exc_info=True)
                 return {
                     "status": "error",
-                    "detail": f"Failed to enrich transaction data: {str(e)}"
+                    "detail": f"Failed to enrich transaction data: {str(e)}",
+                    "stages": tracker.stages
                 }
             
+            tracker.finish(len(df_enriched))
             logger.info(f"Enrichment complete: {len(df_enriched)} transactions enriched")
             
             # ==================== STEP 5: CONVERT TO TRANSACTION RECORDS ====================
             # (Map dataframe columns to Transaction model fields)
+            tracker.start("convert")
             try:
                 transaction_records = TransactionEnricher.convert_df_to_transaction_records(df_enriched, file_upload_id)
             except Exception as e:
+                tracker.fail()
                 logger.error(f"Error converting to transaction records: {e}", exc_info=True)
                 return {
                     "status": "error",
-                    "detail": f"Failed to prepare transaction records: {str(e)}"
+                    "detail": f"Failed to prepare transaction records: {str(e)}",
+                    "stages": tracker.stages
                 }
             
             if not transaction_records:
+                tracker.fail()
                 logger.warning("No transaction records after conversion")
                 return {
                     "status": "error",
-                    "detail": "No valid transaction records to store"
+                    "detail": "No valid transaction records to store",
+                    "stages": tracker.stages
                 }
+            tracker.finish(len(transaction_records))
             
             # ==================== STEP 6: STORE ENRICHED TRANSACTIONS ====================
             # (Persist to Transaction table - source of truth)
+            tracker.start("store_transactions")
             try:
-                txn_count = TransactionPersistence.persist_enriched_transactions(
+                inserted_records = TransactionPersistence.insert_new_transactions(
                     db, user_id, transaction_records
                 )
             except Exception as e:
+                tracker.fail()
                 logger.error(f"Error persisting enriched transactions: {e}", exc_info=True)
                 db.rollback()
                 return {
                     "status": "error",
-                    "detail": f"Failed to store transactions: {str(e)}"
+                    "detail": f"Failed to store transactions: {str(e)}",
+                    "stages": tracker.stages
                 }
             
+            txn_count = len(inserted_records)
+            tracker.finish(txn_count)
             logger.info(f"Stored {txn_count} enriched transactions")
             
-            # ==================== STEP 7: AGGREGATE INTO PATTERN STATS ====================
-            # (Filter EXPENSE only, group by merchant, compute aggregated metrics)
+            # ==================== STEP 6b: ARCHIVE STORED ROWS ====================
+            # (Parquet copy of this upload's rows for full-history rebuilds; never fails the upload)
+            tracker.start("archive")
+            tracker.finish(UploadArchive.write(user_id, file_upload_id, inserted_records))
+            
+            # ==================== STEP 7-8: UPDATE PATTERN STATS ====================
+            # (Merge only the newly stored EXPENSE rows into per-merchant running stats and upsert)
+            tracker.start("update_patterns")
             try:
-                pattern_stats = PatternAggregator.aggregate_patterns(transaction_records)
+                patterns_aggregated, pattern_count = TransactionPersistence.update_pattern_stats_incremental(
+                    db, user_id, inserted_records
+                )
             except Exception as e:
-                logger.error(f"Error aggregating patterns: {e}", exc_info=True)
+                tracker.fail()
+                logger.error(f"Error updating pattern stats: {e}", exc_info=True)
+                db.rollback()
                 return {
                     "status": "error",
-                    "detail": f"Failed to aggregate spending patterns: {str(e)}"
+                    "detail": f"Failed to update spending pattern statistics: {str(e)}",
+                    "stages": tracker.stages
                 }
             
-            if not pattern_stats:
-                logger.warning("No patterns aggregated (all filtered or no expenses)")
-                pattern_count = 0
+            tracker.finish(pattern_count)
+            if not patterns_aggregated:
+                logger.warning("No patterns updated (no new expense transactions)")
             else:
-                # ==================== STEP 8: STORE PATTERN STATS ====================
-                # (Persist aggregated evidence to SpendingPatternStats - upsertable)
-                try:
-                    pattern_count = TransactionPersistence.persist_pattern_stats(
-                        db, user_id, pattern_stats
-                    )
-                except Exception as e:
-                    logger.error(f"Error persisting pattern stats: {e}", exc_info=True)
-                    db.rollback()
-                    return {
-                        "status": "error",
-                        "detail": f"Failed to store pattern statistics: {str(e)}"
-                    }
-                
                 logger.info(f"Stored {pattern_count} pattern statistics")
             
             # ==================== STEP 9: BUILD SUCCESS RESPONSE ====================
@@ -1041,18 +2934,647 @@ class TransactionUploadProcessor:
                     "total_rows": total_rows,
                     "clean_rows": clean_rows,
                     "transactions_stored": txn_count,
-                    "patterns_aggregated": len(pattern_stats),
-                    "pattern_stats_stored": pattern_count
-                }
+                    "patterns_aggregated": patterns_aggregated,
+                    "pattern_stats_stored": pattern_count,
+                    "bank_profile": bank_profile,
+                    "date_format": df_clean.attrs.get("date_format"),
+                    "unparseable_dates": unparseable_dates,
+                    "bytes_read": len(content),
+                    "limits": FileParser.limits(),
+                    "merchant_hint_cache": hint_cache_stats
+                },
+                "stages": tracker.stages
             }
             
+            TransactionPersistence.record_upload(db, user_id, content_hash, filename, response)
             logger.info(f"Upload processing complete: {txn_count} txns, {pattern_count} pattern stats")
             return response
             
         except Exception as e:
+            tracker.fail()
             logger.error(f"Unexpected error during upload processing: {e}", exc_info=True)
             db.rollback()
             return {
                 "status": "error",
-                "detail": f"Unexpected error: {str(e)}"
+                "detail": f"Unexpected error: {str(e)}",
+                "stages": tracker.stages
+            }
+    
+    @staticmethod
+    def _bytes_read(source: BinaryIO, filename: str) -> int:
+        if isinstance(source, UploadStreamReader):
+            return source.bytes_read
+        if filename.lower().endswith('.xlsx'):
+            # Zip reads seek around the file; the whole workbook was consumed
+            return source.seek(0, io.SEEK_END)
+        return source.tell()
+    
+    @staticmethod
+    def process_stream(
+        source: BinaryIO,
+        filename: str,
+        user_id: int,
+        db: Session,
+        file_upload_id: Optional[str] = None,
+        on_stage: Optional[Callable[[List[Dict]], None]] = None,
+        content_hash: Optional[str] = None
+    ) -> Dict:
+        """
+        Process a CSV stream or .xlsx file chunk by chunk (blocking; call from a worker thread)
+        
+        Each chunk of PatternConfig.STREAM_CHUNK_ROWS rows goes through
+        clean -> enrich -> convert -> store and is committed before the next
+        chunk is parsed, so memory stays bounded by the chunk size. Running
+        stats of the stored rows are merged in memory and applied to pattern
+        stats once at the end.
+        
+        With content_hash (SHA-256 of the whole file), an earlier upload of the
+        same bytes is answered from the ledger and a successful one is recorded.
+        
+        Returns: response dict with statistics, per-stage timings and results
+        """
+        if content_hash:
+            prior = TransactionPersistence.find_prior_upload(db, user_id, content_hash)
+            if prior:
+                if isinstance(source, UploadStreamReader):
+                    source.abandon()
+                return prior
+        
+        file_upload_id = file_upload_id or str(uuid.uuid4())
+        tracker = StageTracker(on_stage)
+        logger.info(f"Starting streamed upload processing: upload_id={file_upload_id}, user_id={user_id}")
+        
+        totals = {"total_rows": 0, "clean_rows": 0, "transactions_stored": 0, "chunks": 0}
+        bank_profile = None
+        date_format = None
+        unparseable_dates = {"count": 0, "examples": []}
+        hint_cache_stats = TransactionEnricher.merchant_hint_cache_stats()
+        running: Dict[str, Dict] = {}
+        overlapping: Set[str] = set()
+        # Hashes stored by this run: rows repeated across chunks are kept, rows of an interrupted earlier run are not
+        inserted_hashes: Set[str] = set()
+        error = None
+        limit_exceeded = False
+        
+        # A resumed job: chunks committed before the interruption are skipped as duplicates,
+        # so their merchants are rebuilt from stored history, and this run's archive file would
+        # miss their rows (the upload is archived from the database by backfill_archive instead)
+        resumed_merchants = TransactionPersistence.stored_upload_merchants(db, user_id, file_upload_id)
+        if resumed_merchants is not None:
+            logger.info(f"Upload {file_upload_id} already stored rows; resuming")
+            overlapping |= resumed_merchants
+            running.update({merchant: {} for merchant in resumed_merchants})
+            UploadArchive.remove(user_id, file_upload_id)
+        # Parquet copy of the stored rows, one row group per chunk, published when the stream ends
+        archive = UploadArchive.open(user_id, file_upload_id) if resumed_merchants is None else None
+        
+        def timed(stage: str, fn, *args, rows_of=len, **kwargs):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            tracker.add(stage, rows_of(result) if rows_of else 0, time.perf_counter() - started)
+            return result
+        
+        try:
+            # ==================== STEP 1: VALIDATE FILE ====================
+            tracker.start("validate")
+            is_valid, error_msg = FileParser.validate_filename(filename)
+            if not is_valid:
+                tracker.fail()
+                logger.warning(f"File validation failed: {error_msg}")
+                return {
+                    "status": "error",
+                    "detail": error_msg,
+                    "stages": tracker.stages
+                }
+            tracker.finish()
+            
+            # ==================== STEPS 2-6: PARSE -> CLEAN -> ENRICH -> STORE, PER CHUNK ====================
+            chunks = FileParser.iter_chunks(source, filename)
+            while True:
+                try:
+                    chunk = timed("parse", next, chunks, None, rows_of=lambda c: 0 if c is None else len(c))
+                except UploadLimitExceeded as e:
+                    tracker.add("parse", 0, 0.0)
+                    error, limit_exceeded = str(e), True
+                    break
+                except Exception as e:
+                    tracker.add("parse", 0, 0.0)
+                    error = f"Failed to parse file: {str(e)}"
+                    break
+                if chunk is None:
+                    break
+                
+                rows_error = FileParser.rows_error(totals["total_rows"] + len(chunk))
+                if rows_error:
+                    error, limit_exceeded = rows_error, True
+                    break
+                
+                totals["chunks"] += 1
+                totals["total_rows"] += len(chunk)
+                bank_profile = chunk.attrs.get("bank_profile", bank_profile)
+                try:
+                    df_clean = timed(
+                        "clean", PipelineExecutors.run_io, DataNormalizer.clean_dataframe, chunk, PatternConfig.INPLACE_PIPELINE
+                    )
+                    totals["clean_rows"] += len(df_clean)
+                    date_format = df_clean.attrs.get("date_format", date_format)
+                    chunk_unparseable = df_clean.attrs.get("unparseable_dates", {"count": 0, "examples": []})
+                    unparseable_dates["count"] += chunk_unparseable["count"]
+                    unparseable_dates["examples"] = (unparseable_dates["examples"] + chunk_unparseable["examples"])[:5]
+                    if df_clean.empty:
+                        continue
+                    
+                    df_enriched, hint_cache_stats = timed(
+                        "enrich", PipelineExecutors.run_cpu, TransactionEnricher.enrich_with_cache_stats, df_clean,
+                        PatternConfig.INPLACE_PIPELINE, rows=len(df_clean), rows_of=lambda result: len(result[0])
+                    )
+                    records = timed(
+                        "convert", TransactionEnricher.convert_df_to_transaction_records, df_enriched, file_upload_id
+                    )
+                    inserted = timed(
+                        "store_transactions", TransactionPersistence.insert_new_transactions, db, user_id, records, inserted_hashes
+                    )
+                    totals["transactions_stored"] += len(inserted)
+                    if archive is not None and inserted:
+                        try:
+                            timed("archive", archive.write, inserted, rows_of=lambda _: len(inserted))
+                        except Exception as e:
+                            # The database keeps the rows; rebuilds fall back to it for this upload
+                            logger.error(f"Error archiving upload {file_upload_id}: {e}", exc_info=True)
+                            archive.discard()
+                            archive = None
+                    
+                    # Summarize this chunk's stored rows; merge with earlier chunks where dates allow
+                    batch = timed(
+                        "update_patterns", PatternAggregator.compute_running_stats_df, pd.DataFrame(inserted),
+                        rows_of=None
+                    ) if inserted else {}
+                    for merchant, stats in batch.items():
+                        if merchant in overlapping:
+                            continue
+                        merged = PatternAggregator.combine_running_stats(running[merchant], stats) if merchant in running else stats
+                        if merged is None:
+                            # Interleaved dates across chunks: rebuild this merchant from stored history
+                            overlapping.add(merchant)
+                        running[merchant] = merged or stats
+                except Exception as e:
+                    logger.error(f"Error processing chunk {totals['chunks']}: {e}", exc_info=True)
+                    db.rollback()
+                    error = f"Failed to process rows {totals['total_rows'] - len(chunk) + 1}-{totals['total_rows']}: {str(e)}"
+                    break
+            
+            if error is None and totals["clean_rows"] == 0:
+                error = "No valid transactions found in file (all rows filtered during cleaning)"
+            
+            # ==================== STEP 7-8: UPDATE PATTERN STATS ====================
+            # (Also after a mid-file failure: chunks already committed must be reflected)
+            patterns_aggregated, pattern_count = 0, 0
+            if running:
+                started = time.perf_counter()
+                try:
+                    patterns_aggregated, pattern_count = TransactionPersistence.apply_running_stats(
+                        db, user_id, running, rebuild=overlapping
+                    )
+                except Exception as e:
+                    logger.error(f"Error updating pattern stats: {e}", exc_info=True)
+                    db.rollback()
+                    error = error or f"Failed to update spending pattern statistics: {str(e)}"
+                tracker.add("update_patterns", pattern_count, time.perf_counter() - started)
+            
+            statistics = {
+                "total_rows": totals["total_rows"],
+                "clean_rows": totals["clean_rows"],
+                "transactions_stored": totals["transactions_stored"],
+                "patterns_aggregated": patterns_aggregated,
+                "pattern_stats_stored": pattern_count,
+                "chunks": totals["chunks"],
+                "bank_profile": bank_profile,
+                "date_format": date_format,
+                "unparseable_dates": unparseable_dates,
+                "bytes_read": TransactionUploadProcessor._bytes_read(source, filename),
+                "limits": FileParser.limits(),
+                "merchant_hint_cache": hint_cache_stats
+            }
+            
+            if error:
+                tracker.fail()
+                logger.error(f"Streamed upload failed after {totals['chunks']} chunks: {error}")
+                return {
+                    "status": "error",
+                    "detail": error,
+                    "limit_exceeded": limit_exceeded,
+                    "upload_id": file_upload_id,
+                    "statistics": statistics,
+                    "stages": tracker.stages
+                }
+            
+            tracker.complete()
+            logger.info(
+                f"Streamed upload complete: {totals['chunks']} chunks, "
+                f"{totals['transactions_stored']} txns, {pattern_count} pattern stats"
+            )
+            response = {
+                "status": "success",
+                "upload_id": file_upload_id,
+                "statistics": statistics,
+                "stages": tracker.stages
+            }
+            if content_hash:
+                TransactionPersistence.record_upload(db, user_id, content_hash, filename, response)
+            return response
+            
+        except Exception as e:
+            tracker.fail()
+            logger.error(f"Unexpected error during streamed upload processing: {e}", exc_info=True)
+            db.rollback()
+            return {
+                "status": "error",
+                "detail": f"Unexpected error: {str(e)}",
+                "stages": tracker.stages
+            }
+        finally:
+            # Publish the archive of every committed chunk, also after a mid-file failure
+            if archive is not None:
+                try:
+                    archive.close()
+                except Exception as e:
+                    logger.error(f"Error archiving upload {file_upload_id}: {e}", exc_info=True)
+                    archive.discard()
+            # Release the feeding side if we stopped before end of file
+            if isinstance(source, UploadStreamReader):
+                source.abandon()
+    
+    # ==================== BATCH UPLOADS ====================
+    @staticmethod
+    async def process_batch_upload(
+        files: List,
+        user_id: int,
+        db: Session
+    ) -> Dict:
+        """
+        Entry point for several statements (or ZIP archives of them) uploaded together
+        
+        Each upload is read with the per-file size cap and counted against the
+        batch cap; the pipeline then runs once in a worker thread (see process_batch).
+        
+        Returns: response dict with batch and per-file statistics
+        """
+        if not files:
+            return {"status": "error", "detail": "No file provided"}
+        if len(files) > PatternConfig.MAX_BATCH_FILES:
+            return {
+                "status": "error",
+                "detail": f"Batch has more than {PatternConfig.MAX_BATCH_FILES} statement files",
+                "limit_exceeded": True
+            }
+        
+        contents = []
+        total_bytes = 0
+        try:
+            for file in files:
+                size_error = FileParser.size_error(getattr(file, 'size', None))
+                if size_error:
+                    raise UploadLimitExceeded(f"{file.filename}: {size_error}")
+                content = await FileParser.read_limited(file)
+                total_bytes += len(content)
+                size_error = FileParser.batch_size_error(total_bytes)
+                if size_error:
+                    raise UploadLimitExceeded(size_error)
+                contents.append((file.filename, content))
+        except UploadLimitExceeded as e:
+            logger.warning(f"Batch upload rejected: {e}")
+            return {
+                "status": "error",
+                "detail": str(e),
+                "limit_exceeded": True
+            }
+        
+        return await asyncio.to_thread(TransactionUploadProcessor.process_batch, contents, user_id, db)
+    
+    @staticmethod
+    def _parse_and_clean(filename: str, content: bytes) -> Dict:
+        """
+        Parse and clean one file of a batch (runs on the parse/clean pool)
+        Returns: per-file statistics; the cleaned frame is under "frame" when the file is usable
+        """
+        stats = {"filename": filename, "status": "error", "total_rows": 0, "clean_rows": 0, "bytes_read": len(content)}
+        
+        is_valid, error_msg = FileParser.validate_filename(filename)
+        if not is_valid:
+            return {**stats, "detail": error_msg}
+        
+        df, parse_errors = FileParser.parse_content(content, filename)
+        if df is None:
+            return {**stats, "detail": "Failed to parse file", "errors": parse_errors}
+        stats["total_rows"] = len(df)
+        stats["bank_profile"] = df.attrs.get("bank_profile")
+        rows_error = FileParser.rows_error(len(df))
+        if rows_error:
+            return {**stats, "detail": rows_error, "limit_exceeded": True}
+        
+        try:
+            df_clean = DataNormalizer.clean_dataframe(df, PatternConfig.INPLACE_PIPELINE)
+        except Exception as e:
+            logger.error(f"Error cleaning {filename}: {e}", exc_info=True)
+            return {**stats, "detail": f"Failed to clean transaction data: {str(e)}"}
+        stats["clean_rows"] = len(df_clean)
+        stats["date_format"] = df_clean.attrs.get("date_format")
+        stats["unparseable_dates"] = df_clean.attrs.get("unparseable_dates", {"count": 0, "examples": []})
+        if df_clean.empty:
+            return {**stats, "detail": "No valid transactions found in file (all rows filtered during cleaning)"}
+        
+        return {**stats, "status": "success", "frame": df_clean}
+    
+    @staticmethod
+    def _batch_statistics(file_stats: List[Dict], **totals) -> Dict:
+        """Batch totals summed over the per-file statistics; totals overrides/extends them"""
+        return {
+            "files": len(file_stats),
+            "files_processed": sum(
+                1 for stats in file_stats if stats["status"] == "success" and not stats.get("duplicate_upload")
+            ),
+            "files_already_uploaded": sum(1 for stats in file_stats if stats.get("duplicate_upload")),
+            "files_failed": sum(1 for stats in file_stats if stats["status"] == "error"),
+            "total_rows": sum(stats.get("total_rows", 0) for stats in file_stats),
+            "clean_rows": sum(stats.get("clean_rows", 0) for stats in file_stats if stats["status"] == "success"),
+            "duplicates_in_batch": sum(stats.get("duplicates_in_batch", 0) for stats in file_stats),
+            "transactions_stored": sum(stats.get("transactions_stored", 0) for stats in file_stats),
+            "patterns_aggregated": 0,
+            "pattern_stats_stored": 0,
+            "limits": FileParser.batch_limits(),
+            **totals,
+        }
+    
+    @staticmethod
+    def process_batch(
+        files: List[Tuple[str, bytes]],
+        user_id: int,
+        db: Session,
+        on_stage: Optional[Callable[[List[Dict]], None]] = None
+    ) -> Dict:
+        """
+        Process several statements as one upload (blocking; call from a worker thread)
+        
+        - ZIP archives are expanded into their statements
+        - files are parsed and cleaned concurrently on the pipeline thread pool
+        - the combined frame is enriched once
+        - rows repeated across files (overlapping statement periods) are kept
+          from the first file only; repeats within a file are kept, as for
+          single uploads
+        - rows already stored (by earlier uploads, or by an earlier attempt
+          of this batch that failed after storing) are skipped
+        - every file keeps its own file_upload_id, but all rows are stored in
+          one transaction and pattern stats are updated once for the batch
+        
+        Files that cannot be used are reported in "files" and do not fail the batch.
+        
+        Returns: response dict with batch statistics, per-file statistics and stage timings
+        """
+        batch_id = str(uuid.uuid4())
+        tracker = StageTracker(on_stage)
+        logger.info(f"Starting batch upload processing: batch_id={batch_id}, user_id={user_id}, files={len(files)}")
+        
+        try:
+            # ==================== STEP 1: VALIDATE / EXPAND ARCHIVES ====================
+            tracker.start("validate")
+            try:
+                statements, rejected = FileParser.expand_archives(files)
+            except UploadLimitExceeded as e:
+                tracker.fail()
+                logger.warning(f"Batch upload rejected: {e}")
+                return {
+                    "status": "error",
+                    "detail": str(e),
+                    "limit_exceeded": True,
+                    "stages": tracker.stages
+                }
+            if not statements:
+                tracker.fail()
+                return {
+                    "status": "error",
+                    "detail": "No statement files (CSV, XLSX, XLS) in upload",
+                    "files": rejected,
+                    "stages": tracker.stages
+                }
+            bytes_read = sum(len(content) for _, content in statements)
+            
+            # Files uploaded before (or repeated within the batch) are answered from the ledger, not processed
+            content_hashes = [FileParser.content_hash(content) for _, content in statements]
+            prior_uploads = TransactionPersistence.find_prior_uploads(db, user_id, content_hashes)
+            pending: List[Tuple[str, bytes]] = []
+            pending_hashes: List[str] = []
+            first_seen: Dict[str, str] = {}
+            already_uploaded: List[Dict] = []
+            for (filename, content), content_hash in zip(statements, content_hashes):
+                prior = prior_uploads.get(content_hash)
+                if prior:
+                    already_uploaded.append({
+                        "filename": filename,
+                        "status": "success",
+                        "duplicate_upload": True,
+                        "upload_id": prior.get("upload_id"),
+                        "original_upload_at": prior.get("original_upload_at"),
+                        "previous_statistics": prior.get("statistics"),
+                    })
+                elif content_hash in first_seen:
+                    already_uploaded.append({
+                        "filename": filename,
+                        "status": "success",
+                        "duplicate_upload": True,
+                        "duplicate_of": first_seen[content_hash],
+                    })
+                else:
+                    first_seen[content_hash] = filename
+                    pending.append((filename, content))
+                    pending_hashes.append(content_hash)
+            del statements
+            tracker.finish(len(pending))
+            if already_uploaded:
+                logger.info(f"Batch: {len(already_uploaded)} files already uploaded, answered from the ledger")
+            
+            # ==================== STEPS 2-3: PARSE + CLEAN, FILES IN PARALLEL ====================
+            tracker.start("parse_clean")
+            file_stats = PipelineExecutors.map_io(
+                TransactionUploadProcessor._parse_and_clean,
+                [filename for filename, _ in pending],
+                [content for _, content in pending]
+            )
+            del pending
+            usable = [stats for stats in file_stats if stats["status"] == "success"]
+            usable_hashes = [
+                content_hash for stats, content_hash in zip(file_stats, pending_hashes) if stats["status"] == "success"
+            ]
+            file_stats.extend(already_uploaded)
+            file_stats.extend(rejected)
+            
+            clean_rows = sum(stats["clean_rows"] for stats in usable)
+            for stats in file_stats:
+                if stats["status"] == "error":
+                    logger.warning(f"Batch file {stats['filename']} skipped: {stats['detail']}")
+            
+            rows_error = FileParser.rows_error(clean_rows)
+            if rows_error or not (usable or already_uploaded):
+                tracker.fail()
+                for stats in usable:
+                    del stats["frame"]
+                return {
+                    "status": "error",
+                    "detail": rows_error or "No valid transactions found in any file",
+                    "limit_exceeded": rows_error is not None,
+                    "files": file_stats,
+                    "stages": tracker.stages
+                }
+            tracker.finish(clean_rows)
+            
+            if not usable:
+                tracker.complete()
+                logger.info(f"Batch upload complete: all {len(already_uploaded)} usable files were uploaded before")
+                return {
+                    "status": "success",
+                    "batch_id": batch_id,
+                    "statistics": TransactionUploadProcessor._batch_statistics(file_stats, bytes_read=bytes_read),
+                    "files": file_stats,
+                    "stages": tracker.stages
+                }
+            
+            # ==================== STEP 4: ENRICH THE COMBINED FRAME ====================
+            tracker.start("enrich")
+            frames = [stats.pop("frame") for stats in usable]
+            combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            del frames
+            try:
+                df_enriched, hint_cache_stats = PipelineExecutors.run_cpu(
+                    TransactionEnricher.enrich_with_cache_stats, combined, PatternConfig.INPLACE_PIPELINE, rows=clean_rows
+                )
+            except Exception as e:
+                tracker.fail()
+                logger.error(f"Error enriching transactions: {e}", exc_info=True)
+                return {
+                    "status": "error",
+                    "detail": f"Failed to enrich transaction data: {str(e)}",
+                    "files": file_stats,
+                    "stages": tracker.stages
+                }
+            del combined
+            tracker.finish(len(df_enriched))
+            
+            # ==================== STEP 5: CONVERT + DEDUPE ACROSS FILES ====================
+            # (Files occupy consecutive row ranges of the combined frame, in upload order)
+            tracker.start("convert")
+            records: List[Dict] = []
+            seen_hashes: Set[str] = set()
+            offset = 0
+            for stats in usable:
+                stats["upload_id"] = str(uuid.uuid4())
+                file_records = TransactionEnricher.convert_df_to_transaction_records(
+                    df_enriched.iloc[offset:offset + stats["clean_rows"]], stats["upload_id"]
+                )
+                offset += stats["clean_rows"]
+                
+                file_hashes = set()
+                kept = 0
+                for txn in file_records:
+                    txn['content_hash'] = TransactionPersistence.compute_content_hash(user_id, txn)
+                    if txn['content_hash'] in seen_hashes:
+                        continue
+                    file_hashes.add(txn['content_hash'])
+                    records.append(txn)
+                    kept += 1
+                seen_hashes |= file_hashes
+                stats["duplicates_in_batch"] = len(file_records) - kept
+                stats["kept_rows"] = kept
+            del df_enriched
+            duplicates_in_batch = sum(stats["duplicates_in_batch"] for stats in usable)
+            tracker.finish(len(records))
+            logger.info(f"Batch dedupe: {len(records)} rows kept, {duplicates_in_batch} repeated across files")
+            
+            # ==================== STEP 6: STORE ALL FILES IN ONE TRANSACTION ====================
+            tracker.start("store_transactions")
+            try:
+                inserted_records = TransactionPersistence.insert_new_transactions(db, user_id, records)
+            except Exception as e:
+                tracker.fail()
+                logger.error(f"Error persisting enriched transactions: {e}", exc_info=True)
+                db.rollback()
+                return {
+                    "status": "error",
+                    "detail": f"Failed to store transactions: {str(e)}",
+                    "files": file_stats,
+                    "stages": tracker.stages
+                }
+            del records
+            
+            stored_per_upload: Dict[str, List[Dict]] = {}
+            for txn in inserted_records:
+                stored_per_upload.setdefault(txn['file_upload_id'], []).append(txn)
+            for stats in usable:
+                stats["transactions_stored"] = len(stored_per_upload.get(stats["upload_id"], []))
+                stats["duplicates_skipped"] = stats.pop("kept_rows") - stats["transactions_stored"]
+            txn_count = len(inserted_records)
+            tracker.finish(txn_count)
+            
+            # ==================== STEP 6b: ARCHIVE STORED ROWS, ONE FILE PER UPLOAD ====================
+            tracker.start("archive")
+            tracker.finish(sum(
+                UploadArchive.write(user_id, upload_id, rows) for upload_id, rows in stored_per_upload.items()
+            ))
+            del stored_per_upload
+            
+            # ==================== STEP 7-8: UPDATE PATTERN STATS ONCE ====================
+            tracker.start("update_patterns")
+            try:
+                patterns_aggregated, pattern_count = TransactionPersistence.update_pattern_stats_incremental(
+                    db, user_id, inserted_records
+                )
+            except Exception as e:
+                tracker.fail()
+                logger.error(f"Error updating pattern stats: {e}", exc_info=True)
+                db.rollback()
+                return {
+                    "status": "error",
+                    "detail": f"Failed to update spending pattern statistics: {str(e)}",
+                    "files": file_stats,
+                    "stages": tracker.stages
+                }
+            tracker.finish(pattern_count)
+            
+            # Ledger entries, so these files are answered instantly when uploaded again
+            for stats, content_hash in zip(usable, usable_hashes):
+                TransactionPersistence.record_upload(
+                    db, user_id, content_hash, stats["filename"],
+                    {
+                        "status": "success",
+                        "upload_id": stats["upload_id"],
+                        "statistics": {key: value for key, value in stats.items() if key not in ("filename", "status", "upload_id")}
+                    }
+                )
+            
+            # ==================== STEP 9: BUILD SUCCESS RESPONSE ====================
+            tracker.complete()
+            logger.info(
+                f"Batch upload complete: {len(usable)}/{len(file_stats)} files, "
+                f"{txn_count} txns, {pattern_count} pattern stats"
+            )
+            return {
+                "status": "success",
+                "batch_id": batch_id,
+                "statistics": TransactionUploadProcessor._batch_statistics(
+                    file_stats,
+                    patterns_aggregated=patterns_aggregated,
+                    pattern_stats_stored=pattern_count,
+                    bytes_read=bytes_read,
+                    merchant_hint_cache=hint_cache_stats
+                ),
+                "files": file_stats,
+                "stages": tracker.stages
+            }
+            
+        except Exception as e:
+            tracker.fail()
+            logger.error(f"Unexpected error during batch upload processing: {e}", exc_info=True)
+            db.rollback()
+            return {
+                "status": "error",
+                "detail": f"Unexpected error: {str(e)}",
+                "stages": tracker.stages
             }
@@ -0,0 +1,223 @@
+"""
+Upload Archive
+Enriched rows of every upload kept as compressed Parquet files, one per
+file_upload_id, so full-history recomputation reads columnar files from disk
+instead of pulling every transaction back through the ORM
+"""
+
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Try to import pyarrow (optional: without it uploads are not archived and rebuilds read the database)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    logger.warning("pyarrow not installed. Uploads will not be archived to Parquet.")
+
+
+class UploadArchiveWriter:
+    """Appends the stored rows of one upload (one row group per write) and publishes the file on close
+
+    Rows go to a temporary file that is renamed into place by close(), so a
+    half-written upload is never read as complete.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self._writer: Optional["pq.ParquetWriter"] = None
+
+    def write(self, records: List[Dict]):
+        """Append transaction record dicts (as returned by insert_new_transactions)"""
+        if not records:
+            return
+        table = UploadArchive.to_table(records)
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(self._tmp_path, UploadArchive.SCHEMA, compression=UploadArchive.COMPRESSION)
+        self._writer.write_table(table)
+        self.rows += len(records)
+
+    def close(self):
+        """Publish the file (nothing is written for an upload that stored no rows)"""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+        logger.info(f"Archived {self.rows} rows to {self.path}")
+
+    def discard(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class UploadArchive:
+    """Parquet files of stored transactions under UPLOAD_ARCHIVE_DIR/user_<id>/<file_upload_id>.parquet
+
+    Each file holds exactly the rows an upload inserted into the transactions
+    table, so the files of a user together are the user's transaction history.
+    Readers check that every file_upload_id in the database has its file
+    (see missing_uploads) and fall back to the database otherwise, e.g. for
+    uploads stored before the archive existed or whose archive write failed,
+    and read only the files of those uploads (files whose rows were since
+    deleted from the database are ignored).
+
+    Configuration (environment):
+    - UPLOAD_ARCHIVE: 'true' | 'false' (default 'true'; needs pyarrow)
+    - UPLOAD_ARCHIVE_DIR: root directory (default ./upload_archive)
+    - UPLOAD_ARCHIVE_COMPRESSION: Parquet codec (default 'zstd')
+    """
+
+    ENABLED = os.getenv("UPLOAD_ARCHIVE", "true").lower() == "true"
+    DATA_DIR = os.getenv("UPLOAD_ARCHIVE_DIR", "./upload_archive")
+    COMPRESSION = os.getenv("UPLOAD_ARCHIVE_COMPRESSION", "zstd")
+
+    # Transaction record fields, in the transactions table's terms
+    COLUMNS = [
+        "txn_date", "narration", "withdrawal_amount", "deposit_amount", "money_flow",
+        "level_1_tag", "level_2_tag", "level_3_tag", "merchant_hint", "content_hash",
+    ]
+    SCHEMA = pa.schema([
+        ("txn_date", pa.timestamp("us")),
+        ("narration", pa.string()),
+        ("withdrawal_amount", pa.float64()),
+        ("deposit_amount", pa.float64()),
+        ("money_flow", pa.string()),
+        ("level_1_tag", pa.string()),
+        ("level_2_tag", pa.string()),
+        ("level_3_tag", pa.string()),
+        ("merchant_hint", pa.string()),
+        ("content_hash", pa.string()),
+    ]) if PARQUET_AVAILABLE else None
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls.ENABLED and PARQUET_AVAILABLE
+
+    # ==================== PATHS ====================
+    @classmethod
+    def user_dir(cls, user_id: int) -> str:
+        return os.path.join(cls.DATA_DIR, f"user_{int(user_id)}")
+
+    @classmethod
+    def path(cls, user_id: int, file_upload_id: str) -> str:
+        # Upload ids are UUIDs; anything else is reduced to a safe file name
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", str(file_upload_id))
+        return os.path.join(cls.user_dir(user_id), f"{safe_id}.parquet")
+
+    @classmethod
+    def file_name(cls, user_id: int, file_upload_id: str) -> str:
+        """Archive file name of an upload, without .parquet (as listed by archived_uploads)"""
+        return os.path.basename(cls.path(user_id, file_upload_id))[:-len(".parquet")]
+
+    @classmethod
+    def archived_uploads(cls, user_id: int) -> List[str]:
+        """file_upload_ids with a published archive file, oldest first"""
+        directory = cls.user_dir(user_id)
+        if not os.path.isdir(directory):
+            return []
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(".parquet")]
+        entries.sort(key=lambda entry: (entry.stat().st_mtime_ns, entry.name))
+        return [entry.name[:-len(".parquet")] for entry in entries]
+
+    @classmethod
+    def missing_uploads(cls, user_id: int, file_upload_ids: Iterable[str]) -> Set[str]:
+        """The given uploads that have no archive file"""
+        archived = set(cls.archived_uploads(user_id))
+        return {upload_id for upload_id in file_upload_ids if cls.file_name(user_id, upload_id) not in archived}
+
+    # ==================== WRITE ====================
+    @classmethod
+    def to_table(cls, records: List[Dict]) -> "pa.Table":
+        frame = pd.DataFrame.from_records(records, columns=cls.COLUMNS)
+        frame["txn_date"] = pd.to_datetime(frame["txn_date"])
+        return pa.Table.from_pandas(frame, schema=cls.SCHEMA, preserve_index=False)
+
+    @classmethod
+    def open(cls, user_id: int, file_upload_id: str) -> Optional[UploadArchiveWriter]:
+        """Writer for one upload's stored rows, or None when archiving is off"""
+        if not cls.enabled():
+            return None
+        return UploadArchiveWriter(cls.path(user_id, file_upload_id))
+
+    @classmethod
+    def write(
+        cls,
+        user_id: int,
+        file_upload_id: str,
+        records: List[Dict],
+        uploaded_at: Optional[datetime] = None
+    ) -> int:
+        """
+        Archive the rows an upload stored. Failures are logged, not raised:
+        the transactions table stays the source of truth and readers fall back to it.
+        uploaded_at back-dates the file (backfills), since files are read in modification-time order.
+        Returns: rows written
+        """
+        writer = cls.open(user_id, file_upload_id)
+        if writer is None or not records:
+            return 0
+        try:
+            writer.write(records)
+            writer.close()
+            if uploaded_at is not None:
+                timestamp = uploaded_at.replace(tzinfo=timezone.utc).timestamp()
+                os.utime(writer.path, (timestamp, timestamp))
+            return writer.rows
+        except Exception as e:
+            logger.error(f"Error archiving upload {file_upload_id}: {e}", exc_info=True)
+            writer.discard()
+            return 0
+
+    @classmethod
+    def remove(cls, user_id: int, file_upload_id: str):
+        """Delete an upload's archive file (readers then fall back to the database for it)"""
+        path = cls.path(user_id, file_upload_id)
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"Removed archive file {path}")
+
+    # ==================== READ ====================
+    @classmethod
+    def read(
+        cls,
+        user_id: int,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List] = None,
+        file_upload_ids: Optional[Iterable[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Archived rows of a user (all uploads, or only file_upload_ids; oldest upload first),
+        reading only `columns` and only row groups/rows matching `filters` (pyarrow filter syntax)
+        Returns: DataFrame with the requested columns (empty if nothing is archived)
+        """
+        columns = list(columns or cls.COLUMNS)
+        upload_ids = cls.archived_uploads(user_id)
+        if file_upload_ids is not None:
+            wanted = {cls.file_name(user_id, upload_id) for upload_id in file_upload_ids}
+            upload_ids = [upload_id for upload_id in upload_ids if upload_id in wanted]
+        if not upload_ids:
+            return pd.DataFrame({column: pd.Series(dtype=object) for column in columns})
+
+        tables = [
+            pq.read_table(cls.path(user_id, upload_id), columns=columns, filters=filters)
+            for upload_id in upload_ids
+        ]
+        table = pa.concat_tables(tables)
+        logger.info(f"Read {table.num_rows} archived rows ({len(columns)} columns) from {len(upload_ids)} uploads of user {user_id}")
+        return table.to_pandas()
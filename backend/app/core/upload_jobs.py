@@ -0,0 +1,196 @@
+"""
+Background Upload Jobs
+Database-backed queue (the app's SQLite database by default) so uploads return
+a job id immediately and the pandas pipeline runs in a local worker pool
+"""
+
+import os
+import json
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+import logging
+
+from app.database import SessionLocal
+from app.core.transaction_processor import TransactionUploadProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJobQueue:
+    """Enqueue uploads and run them with TransactionUploadProcessor in worker threads
+
+    The upload_jobs table is the queue: a job is claimed by a conditional
+    UPDATE (queued -> running), so a job runs once even if submitted twice.
+    Jobs left queued or running by a previous process are resumed on startup.
+    """
+
+    MAX_WORKERS = int(os.getenv("UPLOAD_JOB_WORKERS", "2"))
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+
+    # ==================== EXECUTOR ====================
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS, thread_name_prefix="upload-job")
+            return cls._executor
+
+    @classmethod
+    def shutdown(cls, wait: bool = True):
+        """Stop the worker pool (queued jobs stay in the table and resume on next startup)"""
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    @classmethod
+    def submit(cls, job_id: str):
+        cls._get_executor().submit(cls._run_job, job_id)
+
+    # ==================== QUEUE OPERATIONS ====================
+    @classmethod
+    def enqueue(cls, db: Session, user_id: int, filename: str, content: bytes) -> Dict:
+        """
+        Store the upload as a queued job and hand it to the worker pool
+        Returns: job status dict
+        """
+        from app.models import UploadJob
+
+        job = UploadJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            filename=filename,
+            payload=content,
+            status="queued",
+            stages=json.dumps([]),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        cls.submit(job.id)
+        logger.info(f"Queued upload job {job.id} for user {user_id} ({filename}, {len(content)} bytes)")
+        return cls.job_to_dict(job)
+
+    @classmethod
+    def resume_pending(cls) -> int:
+        """
+        Requeue jobs interrupted by a restart and submit every queued job
+        Returns: number of jobs submitted
+        """
+        from app.models import UploadJob
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(UploadJob)
+                .where(UploadJob.status == "running")
+                .values(status="queued", current_stage=None, started_at=None)
+            )
+            db.commit()
+            job_ids = [row.id for row in db.query(UploadJob.id).filter(UploadJob.status == "queued").order_by(UploadJob.created_at)]
+        finally:
+            db.close()
+
+        for job_id in job_ids:
+            cls.submit(job_id)
+        if job_ids:
+            logger.info(f"Resumed {len(job_ids)} pending upload jobs")
+        return len(job_ids)
+
+    @staticmethod
+    def _claim(db: Session, job_id: str) -> bool:
+        """Atomically move a job from queued to running; False if another worker has it"""
+        from app.models import UploadJob
+
+        claimed = db.execute(
+            update(UploadJob)
+            .where(UploadJob.id == job_id, UploadJob.status == "queued")
+            .values(status="running", started_at=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        return claimed == 1
+
+    @staticmethod
+    def _run_job(job_id: str):
+        """Worker entry point: run the upload pipeline for one job and record the outcome"""
+        from app.models import UploadJob
+
+        db = SessionLocal()
+        try:
+            if not UploadJobQueue._claim(db, job_id):
+                logger.info(f"Upload job {job_id} already claimed, skipping")
+                return
+
+            job = db.get(UploadJob, job_id)
+            logger.info(f"Running upload job {job_id} for user {job.user_id}")
+
+            def record_stages(stages: List[Dict]):
+                # Called between pipeline stages, when the processor has nothing uncommitted
+                job.stages = json.dumps(stages)
+                job.current_stage = stages[-1]["stage"] if stages else None
+                db.commit()
+
+            try:
+                result = TransactionUploadProcessor.process_content(
+                    job.payload, job.filename, job.user_id, db,
+                    file_upload_id=job.id,
+                    on_stage=record_stages
+                )
+            except Exception as e:
+                logger.error(f"Upload job {job_id} crashed: {e}", exc_info=True)
+                db.rollback()
+                result = {"status": "error", "detail": f"Unexpected error: {str(e)}"}
+
+            job.status = "succeeded" if result.get("status") == "success" else "failed"
+            job.error = None if job.status == "succeeded" else result.get("detail")
+            job.stages = json.dumps(result.get("stages", json.loads(job.stages or "[]")))
+            job.result = json.dumps(result, default=str)
+            job.payload = None
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            logger.info(f"Upload job {job_id} {job.status}")
+
+        except Exception as e:
+            logger.error(f"Error running upload job {job_id}: {e}", exc_info=True)
+            db.rollback()
+        finally:
+            db.close()
+
+    # ==================== STATUS ====================
+    @staticmethod
+    def job_to_dict(job) -> Dict:
+        """Public view of a job (no payload)"""
+        return {
+            "job_id": job.id,
+            "filename": job.filename,
+            "status": job.status,
+            "current_stage": job.current_stage,
+            "stages": json.loads(job.stages) if job.stages else [],
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    @staticmethod
+    def get_job(db: Session, job_id: str, user_id: int) -> Optional[Dict]:
+        """
+        Job status for its owner
+        Returns: job status dict, or None if not found / not owned by user
+        """
+        from app.models import UploadJob
+
+        job = db.query(UploadJob).filter(
+            UploadJob.id == job_id,
+            UploadJob.user_id == user_id
+        ).first()
+        return UploadJobQueue.job_to_dict(job) if job else None
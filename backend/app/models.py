@@ -2,7 +2,7 @@
 SQLAlchemy ORM Models for Personal Finance App
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Enum, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Enum, ForeignKey, Text, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -68,6 +68,8 @@ class User(Base):
     raw_transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
     spending_patterns = relationship("SpendingPatternStats", back_populates="user", cascade="all, delete-orphan")
     leak_insights = relationship("LeakInsight", back_populates="user", cascade="all, delete-orphan")
+    upload_jobs = relationship("UploadJob", back_populates="user", cascade="all, delete-orphan")
+    upload_ledger = relationship("UploadLedger", back_populates="user", cascade="all, delete-orphan")
 
 # COMMENTED OUT - Category model (used by Transactions API)
 # class Category(Base):
@@ -256,6 +258,9 @@ class Transaction(Base):
     file_upload_id = Column(String(100), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Duplicate detection: SHA-256 of (user_id, txn_date, narration, withdrawal, deposit)
+    content_hash = Column(String(64), nullable=True, index=True)
+    
     # Relationships
     user = relationship("User", back_populates="raw_transactions")
 
@@ -296,6 +301,9 @@ class SpendingPatternStats(Base):
     dominant_level_3_tag = Column(String(50))
     level_3_confidence = Column(Float)
     
+    # Mergeable accumulators (JSON) so later uploads update stats without re-reading history
+    running_stats = Column(Text, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -303,9 +311,9 @@ class SpendingPatternStats(Base):
     user = relationship("User", back_populates="spending_patterns")
     leak_insights = relationship("LeakInsight", back_populates="pattern", cascade="all, delete-orphan")
     
-    # Unique constraint: one pattern per merchant per user
+    # Unique constraint: one pattern per merchant per user (upsert conflict target)
     __table_args__ = (
-        # UniqueConstraint would be added here, but SQLAlchemy handles via declarative
+        UniqueConstraint("user_id", "merchant_hint", name="uq_spending_pattern_user_merchant"),
     )
 
 
@@ -326,6 +334,9 @@ class LeakInsight(Base):
     actionable_step = Column(Text, nullable=False)  # What user should do
     estimated_annual_saving = Column(Float, nullable=False)  # Potential annual savings
     
+    # LeakAnalyzer.evidence_fingerprint of the evidence this was reasoned from; unchanged evidence reuses the insight
+    evidence_hash = Column(String(64), nullable=True)
+    
     # Metadata
     analysis_timestamp = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -339,3 +350,58 @@ class LeakInsight(Base):
     user = relationship("User", back_populates="leak_insights")
     pattern = relationship("SpendingPatternStats", back_populates="leak_insights")
 
+
+class UploadJob(Base):
+    """Queued transaction upload, processed in the background worker pool"""
+    __tablename__ = "upload_jobs"
+
+    id = Column(String(36), primary_key=True)  # UUID, also used as file_upload_id
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    
+    # Raw uploaded bytes; cleared once the job finishes
+    payload = Column(LargeBinary, nullable=True)
+    
+    # Queue state: 'queued' | 'running' | 'succeeded' | 'failed'
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    current_stage = Column(String(50), nullable=True)
+    stages = Column(Text, nullable=True)  # JSON list of {stage, status, rows, seconds}
+    result = Column(Text, nullable=True)  # JSON processor response
+    error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    user = relationship("User", back_populates="upload_jobs")
+
+
+class UploadLedger(Base):
+    """Files a user has already uploaded, keyed by SHA-256 of the raw bytes"""
+    __tablename__ = "upload_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False)
+    
+    # The upload that processed these bytes
+    file_upload_id = Column(String(100), nullable=False, index=True)
+    filename = Column(String(255), nullable=True)
+    
+    # Row counts of that upload
+    total_rows = Column(Integer, nullable=False, default=0)
+    clean_rows = Column(Integer, nullable=False, default=0)
+    transactions_stored = Column(Integer, nullable=False, default=0)
+    result = Column(Text, nullable=True)  # JSON processor response, returned for re-uploads
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    user = relationship("User", back_populates="upload_ledger")
+    
+    # One entry per file per user (lookup key)
+    __table_args__ = (
+        UniqueConstraint("user_id", "content_hash", name="uq_upload_ledger_user_hash"),
+    )
@@ -0,0 +1,792 @@
+"""
+Benchmark & parity script for the transaction upload pipeline
+Runs against synthetic_account_statement.csv (repeated to the requested row count)
+
+Usage: python benchmark_pipeline.py [benchmark] [rows]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import string
+import asyncio
+import logging
+import resource
+import tempfile
+import tracemalloc
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from app.core.executors import PipelineExecutors
+from app.core.keyword_matcher import CategoryMatcher
+from app.core.transaction_processor import (
+    DataNormalizer, EnrichmentConfig, FileParser, PatternAggregator, PatternConfig,
+    TransactionEnricher, TransactionUploadProcessor
+)
+from app.core.upload_archive import UploadArchive
+
+logging.basicConfig(level=logging.WARNING)
+
+SYNTHETIC_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "synthetic_account_statement.csv")
+
+
+def load_statement(rows: Optional[int] = None) -> pd.DataFrame:
+    """Load the synthetic statement, cleaned and repeated to `rows` rows"""
+    df = DataNormalizer.clean_dataframe(pd.read_csv(SYNTHETIC_CSV))
+    if rows is None:
+        return df
+    repeats = max(1, -(-rows // len(df)))
+    return pd.concat([df] * repeats, ignore_index=True).head(rows)
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# ==================== TAGGING ====================
+def tag_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """Level-1/2/3 tags one row at a time (pre-vectorization behaviour)"""
+    df = df.copy()
+    withdrawal_col, deposit_col = "Withdrawal Amt.", "Deposit Amt."
+    df["level_1_tag"] = df["Narration"].apply(TransactionEnricher.classify_level_1)
+    df["level_2_tag"] = df.apply(
+        lambda r: TransactionEnricher.classify_level_2(r["level_1_tag"], r.get(withdrawal_col), r.get(deposit_col)),
+        axis=1
+    )
+    df["level_3_tag"] = df.apply(
+        lambda r: TransactionEnricher.classify_level_3(r["Narration"], r["level_2_tag"]),
+        axis=1
+    )
+    return df
+
+
+def tag_vectorized(df: pd.DataFrame) -> pd.DataFrame:
+    """Level-1/2/3 tags via the column-wide tagging engine"""
+    df = TransactionEnricher.add_level_1_tag(df)
+    df = TransactionEnricher.add_level_2_tag(df)
+    return TransactionEnricher.add_level_3_tag(df)
+
+
+def check_tagging_parity():
+    """Row-wise and vectorized tagging must agree on every synthetic row"""
+    df = load_statement()
+    expected = tag_rowwise(df)
+    actual = tag_vectorized(df)
+    for col in ["level_1_tag", "level_2_tag", "level_3_tag"]:
+        mismatches = (expected[col] != actual[col]).sum()
+        if mismatches:
+            raise AssertionError(f"{col}: {mismatches} rows differ between row-wise and vectorized tagging")
+    print(f"✓ Tagging parity: {len(df)} rows identical across level_1/2/3")
+
+
+def bench_tagging(rows: int):
+    check_tagging_parity()
+    df = load_statement(rows)
+    _, before = timed(tag_rowwise, df)
+    _, after = timed(tag_vectorized, df)
+    print(f"Tagging {rows} rows: row-wise {rows / before:,.0f} rows/s, "
+          f"vectorized {rows / after:,.0f} rows/s ({before / after:.1f}x)")
+
+
+# ==================== KEYWORD MATCHING ====================
+def scaled_keywords(count: int) -> Dict[str, List[str]]:
+    """LEVEL_3_KEYWORDS padded with random merchant-like keywords up to `count`"""
+    rng = random.Random(count)
+    keywords = {category: list(kws) for category, kws in EnrichmentConfig.LEVEL_3_KEYWORDS.items()}
+    categories = list(keywords)
+    total = sum(len(kws) for kws in keywords.values())
+    while total < count:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        keywords[rng.choice(categories)].append(word)
+        total += 1
+    return keywords
+
+
+def match_nested_loops(text: str, keywords: Dict[str, List[str]]) -> str:
+    """Category lookup by scanning every keyword (pre-automaton behaviour)"""
+    for category, kws in keywords.items():
+        for kw in kws:
+            if kw in text:
+                return category
+    return "UNKNOWN"
+
+
+def bench_keywords(rows: int):
+    narrations = [str(n).lower() for n in load_statement(rows)["Narration"]]
+    for count in (50, 500, 2_000, 10_000):
+        keywords = scaled_keywords(count)
+        matcher, build = timed(CategoryMatcher, keywords)
+        expected, before = timed(lambda: [match_nested_loops(n, keywords) for n in narrations])
+        actual, after = timed(lambda: [matcher.match(n) for n in narrations])
+        if expected != actual:
+            raise AssertionError(f"Automaton disagrees with nested-loop scan at {count} keywords")
+        print(f"{count:>6} keywords x {len(narrations)} narrations: nested loops {before:.3f}s, "
+              f"automaton {after:.3f}s (build {build * 1000:.0f}ms, {before / after:.1f}x)")
+
+
+# ==================== AGGREGATION ====================
+def synthetic_enriched(rows: int, merchants: int) -> pd.DataFrame:
+    """Random enriched transactions spread over `merchants` merchant hints"""
+    rng = np.random.default_rng(42)
+    withdrawal = rng.integers(10, 5000, rows).astype(float)
+    is_debit = rng.random(rows) < 0.85
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D"),
+        "Narration": "UPI-SYNTHETIC",
+        "Withdrawal Amt.": np.where(is_debit, withdrawal, np.nan),
+        "Deposit Amt.": np.where(is_debit, np.nan, withdrawal),
+        "money_flow": np.where(is_debit, "OUTFLOW", "INFLOW"),
+        "level_1_tag": rng.choice(["UPI", "CARD", "ACH", "IMPS"], rows),
+        "level_2_tag": rng.choice(["EXPENSE", "EXPENSE", "EXPENSE", "INCOME"], rows),
+        "level_3_tag": rng.choice(["FOOD", "OTT", "RETAIL", "UNKNOWN"], rows),
+        "merchant_hint": rng.integers(0, merchants, rows).astype(str),
+    })
+
+
+def check_aggregation_parity(expected: list, actual: list):
+    """Dict-based and DataFrame aggregation must produce the same pattern dicts"""
+    if len(expected) != len(actual):
+        raise AssertionError(f"Pattern count differs: {len(expected)} vs {len(actual)}")
+    for before, after in zip(expected, actual):
+        for key, value in before.items():
+            other = after[key]
+            # Sums in a different order may differ in the last rounded cent
+            if value != other and not (isinstance(value, float) and abs(value - other) <= 0.011):
+                raise AssertionError(f"{before['merchant_hint']}.{key}: {value} vs {other}")
+
+
+def bench_aggregation(rows: int):
+    merchants = max(1, rows // 20)
+    df = synthetic_enriched(rows, merchants)
+    records, convert = timed(TransactionEnricher.convert_df_to_transaction_records, df, "benchmark")
+    expected, before = timed(PatternAggregator.aggregate_patterns, records)
+    actual, after = timed(PatternAggregator.aggregate_patterns_df, df)
+    check_aggregation_parity(expected, actual)
+    print(f"✓ Aggregation parity: {len(actual)} patterns identical")
+    print(f"Aggregating {rows} rows / {merchants} merchants: dict groups {before:.2f}s "
+          f"(+{convert:.2f}s record conversion), groupby {after:.2f}s ({before / after:.1f}x)")
+
+
+def bench_incremental(rows: int):
+    """Merging per-upload running stats must match re-aggregating the whole history"""
+    merchants = max(1, rows // 20)
+    df = synthetic_enriched(rows, merchants).sort_values("Date", kind="stable").reset_index(drop=True)
+    uploads = np.array_split(np.arange(len(df)), 4)
+    
+    running, merge = {}, 0.0
+    for positions in uploads:
+        batch, seconds = timed(PatternAggregator.compute_running_stats_df, df.iloc[positions])
+        merge += seconds
+        for merchant, stats in batch.items():
+            running[merchant] = PatternAggregator.merge_running_stats(running[merchant], stats) if merchant in running else stats
+    expected, full = timed(PatternAggregator.aggregate_patterns_df, df)
+    
+    actual = {
+        merchant: PatternAggregator.pattern_from_running_stats(merchant, stats)
+        for merchant, stats in running.items()
+        if stats["txn_count"] >= 2
+    }
+    check_aggregation_parity(expected, [actual[pattern["merchant_hint"]] for pattern in expected])
+    print(f"✓ Incremental parity: {len(expected)} patterns identical after {len(uploads)} merged uploads")
+    print(f"Last upload of {len(uploads[-1])} rows: running stats {seconds:.2f}s vs full re-aggregation of "
+          f"{rows} rows {full:.2f}s (all {len(uploads)} uploads {merge:.2f}s)")
+
+
+# ==================== CSV ENGINE ====================
+def parse_with_engine(engine: str, path: str) -> Dict:
+    """Parse + amount normalization with one CSV engine (run in a fresh process for clean RSS)"""
+    PatternConfig.CSV_ENGINE = engine
+    with open(path, "rb") as f:
+        content = f.read()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df, errors = FileParser.parse_content(content, path)
+    df = DataNormalizer.normalize_amount_columns(df, PatternConfig.AMOUNT_COLUMNS)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "rows": len(df),
+        "seconds": seconds,
+        "peak_mb": (peak - baseline) / 1024,  # ru_maxrss is in KiB on Linux
+        "amounts": df[PatternConfig.AMOUNT_COLUMNS].sum().round(2).tolist(),
+    }
+
+
+def bench_csv_engine(rows: int):
+    """pandas C engine vs pyarrow multithreaded reader on the same statement"""
+    df = load_statement(rows)
+    df["Date"] = df["Date"].dt.strftime("%d/%m/%y")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        df.to_csv(path, index=False)
+        size_mb = os.path.getsize(path) / 1e6
+        
+        results = {}
+        for engine in ("c", "pyarrow"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[engine] = pool.submit(parse_with_engine, engine, path).result()
+    
+    assert results["c"]["amounts"] == results["pyarrow"]["amounts"], "CSV engines disagree on amounts"
+    print(f"✓ CSV engine parity: {results['c']['rows']} rows, amount totals identical")
+    for engine, result in results.items():
+        print(f"Parsing {rows} rows ({size_mb:.0f} MB) with {engine}: {result['seconds']:.2f}s, "
+              f"peak RSS +{result['peak_mb']:.0f} MB")
+
+
+def write_xlsx(df: pd.DataFrame, path: str):
+    """Statement as a single-sheet workbook (write-only mode, so large sheets stay cheap to build)"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+def parse_excel(mode: str, path: str) -> Dict:
+    """Parse an .xlsx with pd.read_excel (DOM) or the read-only chunk reader (run in a fresh process)"""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "read_excel":
+        chunks = [pd.read_excel(path, sheet_name=0)]
+    else:
+        # Chunks are consumed one at a time, as the upload pipeline does
+        chunks = FileParser.iter_xlsx_chunks(path)
+    rows, amounts = 0, np.zeros(len(PatternConfig.AMOUNT_COLUMNS))
+    for df in chunks:
+        rows += len(df)
+        amounts += DataNormalizer.normalize_amount_columns(df, PatternConfig.AMOUNT_COLUMNS)[PatternConfig.AMOUNT_COLUMNS].sum().to_numpy()
+        del df
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "peak_mb": (peak - baseline) / 1024,
+        "amounts": amounts.round(2).tolist(),
+    }
+
+
+def bench_excel(rows: int):
+    """pd.read_excel vs the streaming read-only openpyxl reader"""
+    df = load_statement(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.xlsx")
+        write_xlsx(df, path)
+        size_mb = os.path.getsize(path) / 1e6
+        
+        results = {}
+        for mode in ("read_excel", "read_only"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[mode] = pool.submit(parse_excel, mode, path).result()
+    
+    assert results["read_excel"]["amounts"] == results["read_only"]["amounts"], "Excel readers disagree on amounts"
+    print(f"✓ Excel reader parity: {results['read_only']['rows']} rows, amount totals identical")
+    for mode, result in results.items():
+        print(f"Parsing {rows} rows ({size_mb:.0f} MB .xlsx) with {mode}: {result['seconds']:.2f}s, "
+              f"peak RSS +{result['peak_mb']:.0f} MB")
+
+
+# ==================== DATES ====================
+def bench_dates(rows: int):
+    """Per-element date guessing vs one inferred explicit format, on DD/MM/YY strings"""
+    rng = np.random.default_rng(7)
+    truth = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, rows), unit="D"))
+    df = pd.DataFrame({"Date": truth.dt.strftime("%d/%m/%y")})
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        legacy, before = timed(pd.to_datetime, df["Date"], errors="coerce")
+    DataNormalizer._date_format_cache.clear()
+    inferred, after = timed(DataNormalizer.normalize_date_column, df, "Date")
+    cached, again = timed(DataNormalizer.normalize_date_column, df, "Date")
+    
+    assert inferred["Date"].equals(truth.astype(inferred["Date"].dtype)), "Inferred-format dates differ from the source dates"
+    wrong = int((legacy != truth).sum())
+    print(f"✓ Date parity: {rows} dates parsed with {inferred.attrs['date_format']}, "
+          f"{inferred.attrs['unparseable_dates']['count']} unparseable")
+    print(f"Parsing {rows} dates: per-element guessing {before:.2f}s ({wrong} misread), "
+          f"inferred format {after:.2f}s ({before / after:.0f}x), cached format {again:.2f}s")
+
+
+# ==================== IN-PLACE PIPELINE ====================
+def clean_and_enrich_copying(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean + enrich with every stage copying the frame (pre in-place behaviour)"""
+    df = df.copy()
+    df = DataNormalizer.normalize_amount_columns(df, PatternConfig.AMOUNT_COLUMNS)
+    df = DataNormalizer.normalize_date_column(df, PatternConfig.DATE_COLUMN)
+    df = df.dropna(subset=[PatternConfig.DATE_COLUMN, PatternConfig.NARRATION_COLUMN])
+    df = df.copy()
+    df = TransactionEnricher.add_money_flow(df)
+    df = TransactionEnricher.add_level_1_tag(df)
+    df = TransactionEnricher.add_level_2_tag(df)
+    df = TransactionEnricher.add_level_3_tag(df)
+    return TransactionEnricher.add_merchant_hint(df)
+
+
+def clean_and_enrich_inplace(df: pd.DataFrame) -> pd.DataFrame:
+    df = DataNormalizer.clean_dataframe(df, inplace=True)
+    return TransactionEnricher.enrich_transactions(df, inplace=True)
+
+
+def run_pipeline_mode(mode: str, path: str) -> Dict:
+    """
+    Parse, then clean + enrich in one mode, in a fresh process: timed untraced, then
+    once more measuring the peak allocated on top of the parsed frame (tracemalloc
+    for numpy/Python objects plus a fresh pyarrow pool for Arrow-backed strings;
+    RSS high-water marks would include parsing's peak, which exceeds both modes)
+    """
+    import pyarrow as pa
+
+    def parse() -> pd.DataFrame:
+        with open(path, "rb") as f:
+            return FileParser.parse_content(f.read(), path)[0]
+
+    pipeline = clean_and_enrich_inplace if mode == "inplace" else clean_and_enrich_copying
+    _, seconds = timed(pipeline, parse())
+
+    df = parse()
+    default_pool = pa.default_memory_pool()
+    arrow_pool = pa.proxy_memory_pool(default_pool)
+    pa.set_memory_pool(arrow_pool)
+    tracemalloc.start()
+    result = pipeline(df)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    digest = int(pd.util.hash_pandas_object(result, index=False).sum())
+    # Buffers allocated from the proxy pool must be freed before it is
+    del df, result
+    pa.set_memory_pool(default_pool)
+    return {
+        "seconds": seconds,
+        "peak_mb": (python_peak + arrow_pool.max_memory()) / 1e6,
+        "digest": digest,
+    }
+
+
+def bench_inplace(rows: int):
+    """Copy-per-stage vs in-place clean/enrich; asserts identical output and a lower peak"""
+    raw = pd.read_csv(SYNTHETIC_CSV, dtype=str)
+    raw = pd.concat([raw] * (-(-rows // len(raw))), ignore_index=True).head(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        raw.to_csv(path, index=False)
+        
+        results = {}
+        for mode in ("copying", "inplace"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[mode] = pool.submit(run_pipeline_mode, mode, path).result()
+    
+    assert results["copying"]["digest"] == results["inplace"]["digest"], "In-place pipeline output differs"
+    assert results["inplace"]["peak_mb"] < results["copying"]["peak_mb"], "In-place pipeline did not lower peak memory"
+    print(f"✓ In-place parity: {rows} rows enriched identically")
+    for mode, result in results.items():
+        print(f"Clean + enrich {rows} rows, {mode}: {result['seconds']:.2f}s, peak allocated +{result['peak_mb']:.0f} MB")
+
+
+# ==================== CONCURRENCY ====================
+def concurrency_app(session_factory):
+    """Minimal app: /health plus the upload pipeline, either on the event loop or dispatched"""
+    from fastapi import FastAPI, UploadFile, File
+    
+    app = FastAPI()
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    @app.post("/upload-blocking")
+    async def upload_blocking(file: UploadFile = File(...)):
+        # Pre-executor behaviour: the whole pipeline runs inside the async handler
+        db = session_factory()
+        try:
+            return TransactionUploadProcessor.process_content(await file.read(), file.filename, 1, db)
+        finally:
+            db.close()
+    
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        db = session_factory()
+        try:
+            return await TransactionUploadProcessor.process_upload(file, 1, db)
+        finally:
+            db.close()
+    
+    return app
+
+
+async def measure_health_latency(app, endpoint: str, uploads: List[bytes]) -> Dict:
+    """Fire all uploads at once and ping /health every 20ms until they finish (latencies in ms)"""
+    import httpx
+    
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def upload(i: int, content: bytes):
+            response = await client.post(endpoint, files={"file": (f"upload_{i}.csv", content)})
+            assert response.json()["status"] == "success", response.text
+        
+        start = time.perf_counter()
+        tasks = asyncio.gather(*(upload(i, content) for i, content in enumerate(uploads)))
+        while not tasks.done():
+            # Latency from when the ping was due, so time the loop spent blocked counts
+            due = time.perf_counter() + 0.02
+            await asyncio.sleep(0.02)
+            await client.get("/health")
+            latencies.append(time.perf_counter() - due)
+        await tasks
+        elapsed = time.perf_counter() - start
+    
+    latencies = np.array(latencies) * 1000
+    return {
+        "seconds": elapsed,
+        "pings": len(latencies),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "max": float(latencies.max()),
+    }
+
+
+def bench_concurrency(rows: int, uploads: int = 4):
+    """`uploads` simultaneous uploads of `rows` rows each, measuring /health latency meanwhile"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models import Base, User
+    
+    statement = load_statement(rows)
+    contents = [
+        # Distinct narrations so every upload stores its own rows
+        statement.assign(Narration=statement["Narration"] + f" U{i}").to_csv(index=False).encode()
+        for i in range(uploads)
+    ]
+    
+    modes = [
+        ("blocking (on event loop)", "/upload-blocking", "inline"),
+        ("thread pool enrichment", "/upload", "thread"),
+        ("process pool enrichment", "/upload", "process"),
+    ]
+    for label, endpoint, cpu_executor in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False, "timeout": 120})
+            use_archive_dir(tmp)
+            Base.metadata.create_all(engine)
+            session_factory = sessionmaker(bind=engine)
+            db = session_factory()
+            db.add(User(id=1, email="bench@example.com"))
+            db.commit()
+            db.close()
+            
+            PipelineExecutors.configure(cpu_executor=cpu_executor)
+            result = asyncio.run(measure_health_latency(concurrency_app(session_factory), endpoint, contents))
+            PipelineExecutors.shutdown(wait=True)
+            engine.dispose()
+        
+        print(f"{uploads} x {rows} rows, {label}: {result['seconds']:.2f}s total, /health "
+              f"p50 {result['p50']:.1f}ms p95 {result['p95']:.1f}ms max {result['max']:.1f}ms ({result['pings']} pings)")
+
+
+# ==================== BATCH UPLOAD ====================
+def use_archive_dir(tmp: str):
+    """Write the Parquet upload archive under `tmp`, so phases never read each other's (or ./upload_archive's) files"""
+    UploadArchive.DATA_DIR = os.path.join(tmp, "upload_archive")
+
+
+def bench_session(tmp: str):
+    """Session on a fresh SQLite database (and upload archive) with the benchmark user"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models import Base, User
+
+    use_archive_dir(tmp)
+    engine = create_engine(f"sqlite:///{tmp}/bench.db")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="bench@example.com"))
+    db.commit()
+    return db
+
+
+def stored_snapshot(db) -> tuple:
+    """Stored transactions and pattern stats, order-independent"""
+    from app.models import SpendingPatternStats, Transaction
+
+    transactions = sorted(
+        (str(t.txn_date), t.narration, t.withdrawal_amount, t.deposit_amount, t.merchant_hint)
+        for t in db.query(Transaction)
+    )
+    patterns = sorted(
+        (p.merchant_hint, p.txn_count, round(p.total_amount, 2), p.avg_gap_days, p.dominant_level_3_tag)
+        for p in db.query(SpendingPatternStats)
+    )
+    return transactions, patterns
+
+
+def bench_batch(rows: int, files: int = 6):
+    """`files` overlapping statements uploaded one by one vs as one batch (ZIP); asserts identical stored data"""
+    import io
+    import zipfile
+
+    statement = load_statement(rows)
+    statement = statement.assign(
+        Date=statement["Date"].dt.strftime("%d/%m/%y"),
+        # Distinct narrations per repeat, so the repeats are not duplicates of each other
+        Narration=statement["Narration"] + " R" + (statement.index // 165).astype(str)
+    )
+    # Consecutive periods, each overlapping the previous one by 10%
+    step = len(statement) // files
+    parts = [
+        (f"statement_{i}.csv", statement.iloc[max(0, i * step - step // 10):(i + 1) * step].to_csv(index=False).encode())
+        for i in range(files)
+    ]
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for filename, content in parts:
+            zf.writestr(filename, content)
+
+    PipelineExecutors.configure(cpu_executor="inline")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = bench_session(tmp)
+        start = time.perf_counter()
+        for filename, content in parts:
+            assert TransactionUploadProcessor.process_content(content, filename, 1, db)["status"] == "success"
+        sequential = time.perf_counter() - start
+        expected = stored_snapshot(db)
+        db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = bench_session(tmp)
+        result, batch = timed(TransactionUploadProcessor.process_batch, [("statements.zip", archive.getvalue())], 1, db)
+        assert result["status"] == "success", result.get("detail")
+        assert result["statistics"]["files_processed"] == files
+        actual = stored_snapshot(db)
+
+        # A retry of a batch that failed after storing its rows (so before its ledger entries) adds nothing
+        from app.models import UploadLedger
+        db.query(UploadLedger).delete()
+        db.commit()
+        retry = TransactionUploadProcessor.process_batch([("statements.zip", archive.getvalue())], 1, db)
+        assert retry["status"] == "success", retry.get("detail")
+        assert retry["statistics"]["transactions_stored"] == 0, "retried batch stored its rows again"
+        assert stored_snapshot(db) == actual, "retried batch changed stored data"
+        db.close()
+    PipelineExecutors.shutdown(wait=True)
+
+    assert actual == expected, "batch upload stored different transactions or pattern stats"
+    print(f"{files} files, {rows} rows: one upload per file {sequential:.2f}s, one batch {batch:.2f}s "
+          f"({result['statistics']['duplicates_in_batch']} rows repeated across files)")
+
+
+class WorkerKilled(BaseException):
+    """Simulated process death: escapes the pipeline's error handling like a crash would"""
+
+
+def bench_resume(rows: int, chunks: int = 5):
+    """
+    Streamed upload interrupted after two committed chunks, then resumed with the same
+    file_upload_id (as UploadJobQueue.resume_pending does); asserts the same stored data
+    as an uninterrupted upload, and that rows repeated across chunks are all kept
+    """
+    from app.core.transaction_processor import TransactionPersistence
+
+    statement = load_statement(rows)
+    statement = statement.assign(Date=statement["Date"].dt.strftime("%d/%m/%y"))
+    # Repeats of the synthetic statement are in-file duplicates spanning chunks
+    repeated = statement.to_csv(index=False).encode()
+    distinct = statement.assign(
+        Narration=statement["Narration"] + " R" + (statement.index // 165).astype(str)
+    ).to_csv(index=False).encode()
+
+    def crash_after_two_chunks(stages: List[Dict]):
+        stored = next((stage for stage in stages if stage["stage"] == "store_transactions"), None)
+        if stored and stored["rows"] >= 2 * chunk_rows:
+            raise WorkerKilled()
+
+    chunk_rows = -(-len(statement) // chunks)
+    default_chunk_rows = PatternConfig.STREAM_CHUNK_ROWS
+    PatternConfig.STREAM_CHUNK_ROWS = chunk_rows
+    PipelineExecutors.configure(cpu_executor="inline")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = bench_session(tmp)
+            result = TransactionUploadProcessor.process_content(repeated, "statement.csv", 1, db)
+            assert result["statistics"]["transactions_stored"] == len(statement), "rows repeated across chunks were dropped"
+            db.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = bench_session(tmp)
+            assert TransactionUploadProcessor.process_content(distinct, "statement.csv", 1, db)["status"] == "success"
+            expected = stored_snapshot(db)
+            db.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = bench_session(tmp)
+            try:
+                TransactionUploadProcessor.process_content(
+                    distinct, "statement.csv", 1, db, file_upload_id="job-1", on_stage=crash_after_two_chunks
+                )
+                raise AssertionError("upload was not interrupted")
+            except WorkerKilled:
+                db.rollback()
+            interrupted = len(stored_snapshot(db)[0])
+            result = TransactionUploadProcessor.process_content(distinct, "statement.csv", 1, db, file_upload_id="job-1")
+            assert result["status"] == "success", result.get("detail")
+            resumed = stored_snapshot(db)
+            rebuilt = TransactionPersistence.rebuild_pattern_stats(db, 1)
+            assert rebuilt["source"] == "archive", "resumed upload was not archived from the database"
+            after_rebuild = stored_snapshot(db)
+            db.close()
+    finally:
+        PatternConfig.STREAM_CHUNK_ROWS = default_chunk_rows
+        PipelineExecutors.shutdown(wait=True)
+
+    assert resumed[0] == expected[0], f"resumed upload stored {len(resumed[0])} transactions, expected {len(expected[0])}"
+    assert resumed[1] == expected[1], "resumed upload left different pattern stats"
+    assert after_rebuild == expected, "archive rebuild after the resumed upload differs"
+    print(f"✓ Resume parity: {interrupted} rows committed before the interruption, "
+          f"{result['statistics']['transactions_stored']} stored on resume, {len(expected[0])} total, patterns identical")
+
+
+def bench_archive(rows: int, files: int = 4):
+    """Full-history pattern rebuild from the transactions table vs the Parquet upload archive; asserts identical patterns"""
+    from app.core.transaction_processor import TransactionPersistence
+
+    statement = load_statement(rows)
+    statement = statement.assign(
+        Date=statement["Date"].dt.strftime("%d/%m/%y"),
+        Narration=statement["Narration"] + " R" + (statement.index // 165).astype(str)
+    )
+    parts = np.array_split(np.arange(len(statement)), files)
+
+    PipelineExecutors.configure(cpu_executor="inline")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = bench_session(tmp)
+        for i, positions in enumerate(parts):
+            content = statement.iloc[positions].to_csv(index=False).encode()
+            result = TransactionUploadProcessor.process_content(content, f"statement_{i}.csv", 1, db)
+            assert result["status"] == "success", result.get("detail")
+        assert TransactionPersistence.archive_is_complete(db, 1), "an upload was not archived"
+        # A file whose rows are no longer in the database (e.g. removed by cleanup_duplicates.py) must be ignored
+        archived = UploadArchive.archived_uploads(1)
+        shutil.copy(UploadArchive.path(1, archived[0]), UploadArchive.path(1, "deleted-upload"))
+
+        UploadArchive.ENABLED = False
+        expected, from_database = timed(TransactionPersistence._merchant_history_running_stats, db, 1)
+        UploadArchive.ENABLED = True
+        actual, from_archive = timed(TransactionPersistence._merchant_history_running_stats, db, 1)
+        archive_bytes = sum(entry.stat().st_size for entry in os.scandir(UploadArchive.user_dir(1)))
+        db.close()
+    PipelineExecutors.shutdown(wait=True)
+
+    assert expected.keys() == actual.keys(), "archive and database histories hold different merchants"
+    merchants = sorted(merchant for merchant, stats in expected.items() if stats["txn_count"] >= 2)
+    check_aggregation_parity(
+        [PatternAggregator.pattern_from_running_stats(merchant, expected[merchant]) for merchant in merchants],
+        [PatternAggregator.pattern_from_running_stats(merchant, actual[merchant]) for merchant in merchants],
+    )
+    print(f"✓ Archive parity: {len(merchants)} patterns identical from {files} archived uploads "
+          f"({archive_bytes / 1e6:.1f} MB, one stale file ignored)")
+    print(f"Full rebuild over {rows} rows: transactions table {from_database:.2f}s, Parquet archive {from_archive:.2f}s")
+
+
+def bench_model_routing(rows: int, analyses: int = 12):
+    """
+    Leak analysis against fake_gemini_server.py with the primary model hanging:
+    its circuit must open and later analyses must skip it; with every model down, analysis must fail fast.
+    Needs the app environment (.env) since it imports the leaks API module.
+    """
+    from fake_gemini_server import FakeGeminiServer
+    from app.core.leak_analyzer import LeakAnalyzer
+    from app.core.model_router import ModelsUnavailableError
+
+    models = ["gemini-2.0-flash", "gemini-2.5-flash", "gemini-3-flash", "gemini-2.5-flash-lite"]
+    server = FakeGeminiServer(behaviours={
+        models[0]: {"latency": 5.0},
+        models[1]: {"latency": 0.3},
+        models[2]: {"latency": 0.1},
+        models[3]: {"latency": 0.2, "error_rate": 0.5},
+    }).start()
+    LeakAnalyzer.BASE_URL, LeakAnalyzer.REQUEST_TIMEOUT_SECONDS, LeakAnalyzer.RULE_SCORING = server.url, 1.0, False
+    os.environ["GEMINI_MODEL"] = models[0]
+    analyzer = LeakAnalyzer(api_key="fake")
+
+    enriched = synthetic_enriched(max(rows, 1000), 40)
+    patterns = [{**pattern, "id": i} for i, pattern in enumerate(PatternAggregator.aggregate_patterns_df(enriched))]
+
+    async def run():
+        latencies = []
+        for _ in range(analyses):
+            start = time.perf_counter()
+            result = await analyzer.analyze_patterns(patterns)
+            latencies.append(time.perf_counter() - start)
+            assert not result.unanalyzed_pattern_ids, "fake model answered, yet patterns were left unanalyzed"
+        hung_calls = server.calls.get(models[0], 0)
+        order = analyzer.router.candidates()
+
+        for model in models:
+            server.configure(model, status=503)
+        failures = 0
+        while True:
+            try:
+                await analyzer.analyze_patterns(patterns)
+            except ModelsUnavailableError:
+                break
+            except Exception:
+                failures += 1
+        start = time.perf_counter()
+        try:
+            await analyzer.analyze_patterns(patterns)
+            raise AssertionError("analysis succeeded with every model down")
+        except ModelsUnavailableError:
+            fail_fast = time.perf_counter() - start
+        await analyzer.aclose()
+        return latencies, hung_calls, order, failures, fail_fast
+
+    latencies, hung_calls, order, failures, fail_fast = asyncio.run(run())
+    server.stop()
+
+    assert hung_calls <= analyzer.router.MIN_CALLS, f"hanging model was called {hung_calls} times"
+    assert fail_fast < 0.05, f"all-circuits-open analysis took {fail_fast:.3f}s"
+    print(f"✓ Routing: hanging primary called {hung_calls}x in {analyses} analyses, then skipped; "
+          f"with every model down, {failures} failed analyses opened all circuits")
+    print(f"Analysis latency: first {latencies[0]:.2f}s, last {latencies[-1]:.2f}s "
+          f"(models now tried as {order}); "
+          f"rejected in {fail_fast * 1000:.1f}ms once all circuits are open")
+
+
+BENCHMARKS = {
+    "tagging": bench_tagging,
+    "keywords": bench_keywords,
+    "aggregation": bench_aggregation,
+    "incremental": bench_incremental,
+    "csv_engine": bench_csv_engine,
+    "excel": bench_excel,
+    "dates": bench_dates,
+    "inplace": bench_inplace,
+    "concurrency": bench_concurrency,
+    "batch": bench_batch,
+    "resume": bench_resume,
+    "archive": bench_archive,
+    "model_routing": bench_model_routing,
+}
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "all"
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+
+    if name != "all" and name not in BENCHMARKS:
+        print(f"Usage: python benchmark_pipeline.py [{'|'.join(['all', *BENCHMARKS])}] [rows]")
+        sys.exit(1)
+
+    for bench_name, bench in BENCHMARKS.items():
+        if name in ("all", bench_name):
+            bench(rows)
@@ -0,0 +1,155 @@
+"""
+Fake Gemini API server for testing leak analysis offline
+Answers generateContent with one insight per pattern in the prompt's EVIDENCE,
+with per-model latency, error rate, HTTP status and truncated-JSON behaviour
+
+Usage: python fake_gemini_server.py [--port 8765] [--model NAME:latency=0.3,error_rate=0.2,status=503,invalid_json=1 ...]
+Then run the backend with GEMINI_BASE_URL=http://127.0.0.1:8765 and any GEMINI_API_KEY.
+Behaviour can be changed at runtime: POST /control {"<model>": {"latency": 2.0}}
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_BEHAVIOUR = {"latency": 0.2, "error_rate": 0.0, "status": 200, "invalid_json": False}
+
+
+class FakeGeminiServer:
+    """Threaded HTTP server emulating POST /{version}/models/{model}:generateContent"""
+
+    def __init__(self, port: int = 0, behaviours: Optional[Dict[str, Dict]] = None):
+        self.behaviours: Dict[str, Dict] = {model: {**DEFAULT_BEHAVIOUR, **b} for model, b in (behaviours or {}).items()}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def configure(self, model: str, **behaviour):
+        with self._lock:
+            self.behaviours[model] = {**self.behaviours.get(model, DEFAULT_BEHAVIOUR), **behaviour}
+
+    # ==================== RESPONSES ====================
+    @staticmethod
+    def analysis_for(prompt: str) -> Dict:
+        """A LeakAnalysisResponse covering every pattern of the prompt's EVIDENCE block"""
+        evidence = prompt.split("EVIDENCE (aggregated from transactions):\n", 1)[1]
+        patterns = json.loads(evidence.split("\n\nIMPORTANT:", 1)[0])
+        leaks = [
+            {
+                "pattern_id": pattern["id"],
+                "merchant_hint": pattern["merchant"],
+                "leak_category": "discretionary_spending",
+                "leak_probability": 0.5,
+                "reasoning": f"Fake reasoning over {pattern['transaction_count']} transactions.",
+                "actionable_step": "Review this spending.",
+                "estimated_annual_saving": round(pattern["total_spent"] * 0.1, 2),
+            }
+            for pattern in patterns
+        ]
+        return {
+            "leaks": leaks,
+            "total_estimated_annual_saving": sum(leak["estimated_annual_saving"] for leak in leaks),
+            "analysis_timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "confidence_level": "medium",
+        }
+
+    def respond(self, model: str, request: Dict):
+        """(status, body) for one generateContent call"""
+        with self._lock:
+            behaviour = self.behaviours.get(model, DEFAULT_BEHAVIOUR)
+            self.calls[model] = self.calls.get(model, 0) + 1
+            fail = self._rng.random() < behaviour["error_rate"]
+        time.sleep(behaviour["latency"])
+
+        if behaviour["status"] != 200 or fail:
+            code = behaviour["status"] if behaviour["status"] != 200 else 500
+            return code, {"error": {"code": code, "message": f"Fake failure of {model}", "status": "UNAVAILABLE"}}
+
+        text = json.dumps(self.analysis_for(request["contents"][0]["parts"][0]["text"]))
+        if behaviour["invalid_json"]:
+            text = text[:len(text) // 2]
+        return 200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "modelVersion": model,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, body: Dict):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/control":
+                    for model, behaviour in body.items():
+                        server.configure(model, **behaviour)
+                    return self._send(200, server.behaviours)
+                if ":generateContent" not in self.path:
+                    return self._send(404, {"error": {"code": 404, "message": "Not found"}})
+                model = self.path.split("/models/", 1)[1].split(":", 1)[0]
+                code, response = server.respond(model, body)
+                self._send(code, response)
+
+            def do_GET(self):
+                self._send(200, {"behaviours": server.behaviours, "calls": server.calls})
+
+        return Handler
+
+
+def parse_model_spec(spec: str):
+    """'NAME:latency=0.3,status=503' -> ('NAME', {'latency': 0.3, 'status': 503})"""
+    name, _, options = spec.partition(":")
+    behaviour = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        behaviour[key] = type(DEFAULT_BEHAVIOUR[key])(float(value)) if key != "invalid_json" else value not in ("0", "false")
+    return name, behaviour
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", action="append", default=[], help="NAME:key=value,... (latency, error_rate, status, invalid_json)")
+    args = parser.parse_args()
+
+    try:
+        behaviours = dict(parse_model_spec(spec) for spec in args.model)
+    except (KeyError, ValueError) as e:
+        print(f"Invalid --model spec: {e}")
+        sys.exit(1)
+    server = FakeGeminiServer(args.port, behaviours).start()
+    print(f"Fake Gemini API on {server.url} (GEMINI_BASE_URL={server.url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
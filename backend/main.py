@@ -4,6 +4,7 @@ Detects forgotten subscriptions, hidden spending habits, and price creep
 """
 
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -17,17 +18,32 @@ from app.database import engine
 from app.api.auth import router as auth_router
 from app.api.email import router as email_router
 from app.api.transactions_new import router as transaction_router
-from app.core.leak_analyzer import router as leaks_router
+from app.core.leak_analyzer import router as leaks_router, leak_analyzer
+from app.core.upload_jobs import UploadJobQueue
+from app.core.executors import PipelineExecutors
 # from app.api.transactions import router as transaction_router
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# ==================== LIFESPAN ====================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up upload jobs queued or interrupted before the last shutdown
+    UploadJobQueue.resume_pending()
+    yield
+    UploadJobQueue.shutdown(wait=False)
+    # Release the pipeline thread pool and process pool workers (they exit after their current task)
+    PipelineExecutors.shutdown(wait=False)
+    if leak_analyzer:
+        await leak_analyzer.aclose()
+
 # ==================== FASTAPI APP ====================
 app = FastAPI(
     title="Financial Leak Detector API",
     description="Detect forgotten subscriptions, hidden spending habits, and price creep",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Middleware